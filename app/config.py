@@ -1,3 +1,8 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
 # Allowed CORS origins
 ALLOWED_ORIGINS = [
     "*",  # Disables all CORS protection
@@ -10,3 +15,177 @@ CORS_SETTINGS = {
     "allow_methods": ["*"],  # Allow all methods (GET, POST, etc...)
     "allow_headers": ["*"],  # Allow all headers
 }
+
+
+# Connection pool settings for the shared upstream HTTP clients.
+# One pool is kept per upstream (sensor-sim, pathfinding, api.smk.dk).
+HTTP_CLIENT_SETTINGS = {
+    "max_connections": int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    "keepalive_expiry": float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    "timeout": float(os.getenv("HTTP_TIMEOUT", "10")),
+    "http2": os.getenv("HTTP2", "false").lower() == "true",  # Requires the 'h2' package
+}
+
+
+# Optional Kafka consumer mode (requires the 'aiokafka' package).
+# Room and sensor change events from sensor-sim are applied to the snapshots as they arrive,
+# and once the consumer is running the snapshots are only reconciled over HTTP every
+# 'reconcile_interval' seconds.
+# Every gateway instance keeps its own snapshots and has to see every event, so by default no
+# consumer group is used. A 'group_id' must be unique per instance (and per worker).
+# Event values are JSON objects with the 'id' of the room or sensor and the changed fields
+# (or '"deleted": true'), or lists of such objects.
+KAFKA_SETTINGS = {
+    "enabled": os.getenv("KAFKA_CONSUMER", "false").lower() == "true",
+    "bootstrap_servers": os.getenv("KAFKA_BROKER", "kafka:9093"),
+    "group_id": os.getenv("KAFKA_GROUP_ID") or None,
+    "room_topic": os.getenv("KAFKA_ROOM_TOPIC", "rooms"),
+    "sensor_topic": os.getenv("KAFKA_SENSOR_TOPIC", "sensors"),
+    "reconcile_interval": float(os.getenv("KAFKA_RECONCILE_INTERVAL", "60")),
+    "max_batch": int(os.getenv("KAFKA_MAX_BATCH", "500")),
+}
+
+
+# Room and sensor snapshots from sensor-sim (seconds).
+# Snapshots are refreshed every 'ttl' seconds and served stale for up to 'max_stale' seconds.
+# While the Kafka consumer runs, the refresh is the periodic reconciliation: 'ttl' becomes the
+# reconcile interval and stale snapshots are served for the same 'max_stale' - 'ttl' seconds longer.
+SNAPSHOT_SETTINGS = {
+    "ttl": float(os.getenv("SNAPSHOT_TTL", "5")),
+    "max_stale": float(os.getenv("SNAPSHOT_MAX_STALE", "60")),
+    "background_refresh": os.getenv("SNAPSHOT_BACKGROUND_REFRESH", "true").lower() == "true",
+}
+
+# Static room geometry (borders, floor, area, ...) is validated once per room and kept for
+# 'GEOMETRY_TTL' seconds before it is re-validated from a full room download.
+GEOMETRY_TTL = float(os.getenv("GEOMETRY_TTL", "3600"))
+
+# Number of room snapshot versions kept for GET /rooms/changes. Clients further behind must resync.
+ROOM_CHANGES_HISTORY = int(os.getenv("ROOM_CHANGES_HISTORY", "120"))
+
+# Server-Sent Events push of room occupancy changes (GET /rooms/stream).
+# Each subscriber has a bounded queue. When it is full the backlog is replaced by one full
+# resync event, and subscribers overflowing more than 'max_overflows' times in a row are dropped.
+LIVE_UPDATES_SETTINGS = {
+    "queue_size": int(os.getenv("LIVE_UPDATES_QUEUE_SIZE", "16")),
+    "max_overflows": int(os.getenv("LIVE_UPDATES_MAX_OVERFLOWS", "3")),
+    "keepalive": float(os.getenv("LIVE_UPDATES_KEEPALIVE", "15")),
+}
+
+# Topology sessions with the pathfinding service. When enabled, the static topology (rooms and
+# sensors) is registered once per content hash and path requests only carry the topology id and
+# the room weights that changed since then. Requires support in the pathfinding service, the full
+# payload is sent when it refuses the registration or does not know the topology id.
+TOPOLOGY_SESSION_SETTINGS = {
+    "enabled": os.getenv("PATHFINDING_TOPOLOGY_SESSION", "false").lower() == "true",
+    "max_versions": int(os.getenv("PATHFINDING_TOPOLOGY_VERSIONS", "4")),
+    # Seconds to wait before registering again after the pathfinding service refused a registration
+    "retry_after": float(os.getenv("PATHFINDING_TOPOLOGY_RETRY_AFTER", "300")),
+}
+
+# Cache of /fastest-path results keyed by source and target ('max_size' 0 disables it).
+# A cached path is reused across room snapshot versions until the crowd factor of a room on the
+# path moves by more than 'epsilon', or the crowd factor of another room drops by more than it.
+PATH_CACHE_SETTINGS = {
+    "max_size": int(os.getenv("PATH_CACHE_SIZE", "1024")),
+    "epsilon": float(os.getenv("PATH_CACHE_EPSILON", "0.05")),
+}
+
+# Where /fastest-path is computed:
+# 'remote' asks the pathfinding service, 'local' runs Dijkstra over the sensor graph in the gateway,
+# 'fallback' asks the pathfinding service and computes the path locally when it is unavailable,
+# 'table' answers from an all-pairs table rebuilt in the background whenever the snapshots change.
+# Only 'remote' is authoritative. The other modes use the gateway's own cost model (door distance
+# times crowd factor plus vertical cost), which is not yet verified against the pathfinding service
+# and may choose different routes. Parity is checked against recorded service responses, see
+# app/test/e2e/pathfinding/test_record_pathfinding.py.
+PATHFINDING_SETTINGS = {
+    "mode": os.getenv("PATHFINDING_MODE", "remote").lower(),
+    # Extra cost, in meters of walking, for taking stairs or an elevator (a vertical sensor)
+    "vertical_cost": float(os.getenv("PATHFINDING_VERTICAL_COST", "10")),
+    # Lowest crowd factor a room is weighted with, so walking through empty rooms is not free
+    "min_crowd_factor": float(os.getenv("PATHFINDING_MIN_CROWD_FACTOR", "0.1")),
+    # Fraction of table answers checked against the pathfinding service in the background
+    "table_audit_rate": float(os.getenv("PATHFINDING_TABLE_AUDIT_RATE", "0.01")),
+}
+
+# Multi-point tours. With the optimizer enabled the gateway orders the targets itself, using
+# leg costs from the sensor graph, and only asks for the fastest path of each chosen leg. The
+# order follows the gateway's cost model (see PATHFINDING_SETTINGS), not the pathfinding service's.
+# Up to 'exact_limit' targets the order is exact (Held-Karp), beyond that 2-opt/Or-opt is used.
+# At most 'concurrency' legs of a tour are computed at a time. Without the optimizer the whole tour
+# is computed by the pathfinding service, which is given 'timeout' seconds for long tours.
+TOUR_SETTINGS = {
+    "optimizer": os.getenv("TOUR_OPTIMIZER", "false").lower() == "true",
+    "exact_limit": int(os.getenv("TOUR_EXACT_LIMIT", "10")),
+    "concurrency": int(os.getenv("TOUR_CONCURRENCY", "4")),
+    "timeout": float(os.getenv("TOUR_TIMEOUT", "120")),
+}
+
+# POST /fastest-path/batch: maximum number of paths per request and of concurrent
+# pathfinding calls per request.
+PATH_BATCH_SETTINGS = {
+    "max_paths": int(os.getenv("PATH_BATCH_MAX_PATHS", "100")),
+    "concurrency": int(os.getenv("PATH_BATCH_CONCURRENCY", "8")),
+}
+
+# POST /distance-matrix: maximum number of source and of target rooms per request.
+DISTANCE_MATRIX_MAX_ROOMS = int(os.getenv("DISTANCE_MATRIX_MAX_ROOMS", "500"))
+
+# POST /fastest-path/reroute: a visitor keeps the remaining route while no room on it has moved
+# its crowd factor by more than 'threshold' since the route was computed. Path tokens issued in
+# the X-Path-Token header of /fastest-path are signed with 'token_secret'; set the same secret on
+# every worker and replica, otherwise each process signs with its own random secret and only
+# accepts the tokens it issued itself.
+REROUTE_SETTINGS = {
+    "threshold": float(os.getenv("REROUTE_THRESHOLD", "0.05")),
+    "token_secret": os.getenv("PATH_TOKEN_SECRET") or None,
+}
+
+# Pre-warming of popular paths. Requested source/target pairs are counted in a top-K sketch of
+# 'capacity' pairs whose counts halve every 'half_life' seconds. After each rooms snapshot refresh
+# the 'pairs' most popular paths whose cached entry became stale are recomputed in the background,
+# at most 'concurrency' at a time ('pairs' 0 disables pre-warming).
+PATH_PREWARM_SETTINGS = {
+    "pairs": int(os.getenv("PATH_PREWARM_PAIRS", "20")),
+    "capacity": int(os.getenv("PATH_PREWARM_CAPACITY", "256")),
+    "half_life": float(os.getenv("PATH_PREWARM_HALF_LIFE", "900")),
+    "concurrency": int(os.getenv("PATH_PREWARM_CONCURRENCY", "4")),
+}
+
+# Local SQLite mirror of the on-display SMK artwork catalog. /artwork queries are answered from
+# it once a sync has completed (or a previous mirror was found on startup), with the live API as
+# a fallback. The catalog is downloaded again every 'sync_interval' seconds. Workers and replicas
+# sharing 'path' take turns through a lock file next to it, so one downloads and the others use its copy.
+ARTWORK_MIRROR_SETTINGS = {
+    "enabled": os.getenv("ARTWORK_MIRROR", "true").lower() == "true",
+    "path": os.getenv("ARTWORK_MIRROR_PATH", "data/artworks.sqlite3"),
+    "sync_interval": float(os.getenv("ARTWORK_MIRROR_SYNC_INTERVAL", "86400")),
+    "retry_interval": float(os.getenv("ARTWORK_MIRROR_RETRY_INTERVAL", "300")),
+}
+
+# Bulk harvesting of the SMK catalog (the artwork mirror and app/utils/facet_extraction.py):
+# rows per page, pages fetched at a time, and retries per page with exponential backoff
+# starting at 'backoff' seconds.
+ARTWORK_HARVEST_SETTINGS = {
+    "page_size": int(os.getenv("ARTWORK_HARVEST_PAGE_SIZE", "500")),
+    "concurrency": int(os.getenv("ARTWORK_HARVEST_CONCURRENCY", "8")),
+    "retries": int(os.getenv("ARTWORK_HARVEST_RETRIES", "5")),
+    "backoff": float(os.getenv("ARTWORK_HARVEST_BACKOFF", "0.5")),
+}
+
+# POST /filters/rooms without the artwork mirror's filter index: at most 'concurrency' SMK searches
+# run at a time across all requests of a worker, and the rooms found for each filter value are cached for 'room_ttl'
+# seconds ('room_cache_size' values at most).
+# GET /filters is served from a snapshot of the SMK facets, refreshed every 'catalog_ttl' seconds and
+# served stale for up to 'catalog_max_stale' seconds. The last good copy is kept at 'catalog_path'
+# so a restart can answer without waiting for the SMK API.
+FILTER_SETTINGS = {
+    "concurrency": int(os.getenv("FILTER_CONCURRENCY", "8")),
+    "room_ttl": float(os.getenv("FILTER_ROOM_TTL", "3600")),
+    "room_cache_size": int(os.getenv("FILTER_ROOM_CACHE_SIZE", "4096")),
+    "catalog_ttl": float(os.getenv("FILTER_CATALOG_TTL", "21600")),
+    "catalog_max_stale": float(os.getenv("FILTER_CATALOG_MAX_STALE", "604800")),
+    "catalog_path": os.getenv("FILTER_CATALOG_PATH", "data/filters.json"),
+}
@@ -1,11 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes.api_routes import router
-from app.config import CORS_SETTINGS
+from app.config import ARTWORK_MIRROR_SETTINGS, CORS_SETTINGS, KAFKA_SETTINGS, SNAPSHOT_SETTINGS
+from app.utils.http_clients import start_clients, close_clients
+from app.utils.room_sensor_fetch import snapshots
+from app.services.live_updates import room_broadcaster
+from app.services.artwork_mirror import artwork_mirror
+from app.services.filter_service import filters_snapshot, restore_filters
+from app.utils.snapshot_events import create_kafka_consumer, snapshot_event_consumer
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 
-app = FastAPI(title="Gateway")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared, pooled upstream HTTP clients for the lifetime of the application
+    start_clients()
+    # Keep the room and sensor snapshots fresh so requests are answered from memory
+    if SNAPSHOT_SETTINGS["background_refresh"]:
+        for snapshot in snapshots.values():
+            snapshot.start_refresher()
+    # Serve the filter list from the copy of the previous run until it is due for a refresh
+    restore_filters()
+    if SNAPSHOT_SETTINGS["background_refresh"]:
+        filters_snapshot.start_refresher()
+    # Optionally apply change events from Kafka, the refresher then only reconciles
+    event_consumer = None
+    if KAFKA_SETTINGS["enabled"]:
+        consumer = create_kafka_consumer()
+        if consumer is not None:
+            event_consumer = snapshot_event_consumer(consumer)
+            event_consumer.start()
+    # Reported by /health/cache
+    app.state.event_consumer = event_consumer
+    # Answer /artwork from a local copy of the on-display SMK catalog
+    if ARTWORK_MIRROR_SETTINGS["enabled"]:
+        artwork_mirror.start()
+    yield
+    await artwork_mirror.stop()
+    if event_consumer is not None:
+        await event_consumer.stop()
+    # End open event streams so the server can shut down
+    room_broadcaster.close()
+    for snapshot in snapshots.values():
+        await snapshot.stop_refresher()
+    await filters_snapshot.stop_refresher()
+    await close_clients()
+
+
+app = FastAPI(title="Gateway", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -1,12 +1,46 @@
-from fastapi import APIRouter, Depends
-from app.schemas.pathfinding_schema import FrontendPathFindingRequest, FrontendMultiPathRequest, FastestPathModel
-from app.services.pathfinding_service import calculate_fastest_path, calculate_fastest_multipoint_path
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from app.schemas.pathfinding_schema import (
+	DistanceMatrixModel,
+	DistanceMatrixRequest,
+	FastestPathBatchRequest,
+	FastestPathModel,
+	FrontendMultiPathRequest,
+	FrontendPathFindingRequest,
+	RerouteModel,
+	RerouteRequest,
+)
+from app.services.pathfinding_service import (
+	calculate_fastest_path,
+	calculate_fastest_multipoint_path,
+	calculate_distance_matrix,
+	fastest_path_batch,
+	load_path_snapshots,
+	path_cache,
+	path_prewarmer,
+	path_table,
+	path_tokens,
+	reroute_fastest_path,
+)
+from app.config import PATH_BATCH_SETTINGS
 from app.routes.room_routes import router as room_router
 from app.routes.sensor_routes import router as sensor_router
 from app.services.smk_api import search_artwork, query_artwork
+from app.services.artwork_mirror import artwork_mirror
+from app.services.filter_service import filters_snapshot, room_cache as filter_room_cache
 from app.schemas.smk_api_schemas import FilterParams, ArtworkResponse, artwork_response_example
 from app.routes.filter_routes import router as filter_router
-from app.utils.responses.pathfinding import multipoint_path_response
+from app.utils.responses.pathfinding import (
+	multipoint_path_response,
+	fastest_path_batch_responses,
+	distance_matrix_responses,
+	reroute_responses,
+	compact_path_responses,
+)
+from app.utils.responses.health import cache_stats_responses
+from app.utils.room_sensor_fetch import snapshots
+from app.utils.path_tokens import PATH_TOKEN_HEADER
+from app.utils.path_encoding import PathFormat, path_format, path_response
 
 router = APIRouter()
 
@@ -16,11 +50,55 @@ router.include_router(filter_router, prefix='/filters', tags=['filters'])
 
 
 @router.post('/fastest-path',
-      	description='Calculate the fastest path between two points.',
+      	description='Calculate the fastest path between two points. '
+	'Send format=compact or the compact Accept media type for a deduplicated room table.',
 			response_model=FastestPathModel,
+			responses=compact_path_responses,
       )
-async def get_fastest_path(request: FrontendPathFindingRequest):
-	return await calculate_fastest_path(request)
+async def get_fastest_path(
+	request: FrontendPathFindingRequest,
+	response: Response,
+	format: PathFormat = Depends(path_format),
+):
+	path = await calculate_fastest_path(request)
+	response.headers[PATH_TOKEN_HEADER] = path_tokens.issue(request.target, path)
+	return path_response(path, format, response)
+
+
+@router.post('/fastest-path/reroute',
+	description='Check whether a visitor should keep following a path from /fastest-path. '
+	'Send the X-Path-Token header of that response, or the path and its target, with the current room. '
+	"Answers 'unchanged' while the crowd on the rest of the path moved by at most the threshold, "
+	'otherwise the new path from the current room. The X-Path-Token response header refers to the path to follow.',
+	response_model=RerouteModel,
+	response_model_exclude_none=True,
+	summary='Re-route a visitor already on a path.',
+	responses=reroute_responses
+)
+async def reroute_fastest_path_endpoint(
+	request: RerouteRequest,
+	response: Response,
+	x_path_token: str | None = Header(default=None),
+):
+	result, token = await reroute_fastest_path(request, x_path_token)
+	response.headers[PATH_TOKEN_HEADER] = token
+	return result
+
+
+@router.post('/fastest-path/batch',
+	description='Calculate the fastest path for several source/target pairs against one consistent snapshot. '
+	'Results are streamed as NDJSON, one line per path in order of completion.',
+	response_class=StreamingResponse,
+	response_description='One JSON object per line with the index of the path and its result or error.',
+	summary='Calculate several fastest paths.',
+	responses=fastest_path_batch_responses
+)
+async def get_fastest_path_batch(request: FastestPathBatchRequest):
+	rooms, sensors = await load_path_snapshots()
+	return StreamingResponse(
+		fastest_path_batch(request.paths, rooms, sensors, PATH_BATCH_SETTINGS['concurrency']),
+		media_type='application/x-ndjson',
+	)
 
 
 @router.post('/multi-point-path',
@@ -30,8 +108,24 @@ async def get_fastest_path(request: FrontendPathFindingRequest):
 	summary='Calculate the fastest path between multiple points.',
 	responses=multipoint_path_response
 )
-async def get_fastest_multi_path(request: FrontendMultiPathRequest):
-	return await calculate_fastest_multipoint_path(request)
+async def get_fastest_multi_path(
+	request: FrontendMultiPathRequest,
+	response: Response,
+	format: PathFormat = Depends(path_format),
+):
+	return path_response(await calculate_fastest_multipoint_path(request), format, response)
+
+
+@router.post('/distance-matrix',
+	description='Calculate the crowd-weighted travel cost from every source room to every target room. '
+	"Costs come from the gateway's own sensor graph, not from the pathfinding service.",
+	response_model=DistanceMatrixModel,
+	response_description='Row-major cost matrix, null where a target cannot be reached.',
+	summary='Calculate a room distance matrix.',
+	responses=distance_matrix_responses
+)
+async def get_distance_matrix(request: DistanceMatrixRequest):
+	return await calculate_distance_matrix(request)
 
 # Health check route
 @router.get(
@@ -56,6 +150,29 @@ async def health_check():
 	return {'status': 'ok'}
 
 
+@router.get(
+	'/health/cache',
+	tags=['Health Check'],
+	description='Get age and hit ratio of the in-process caches.',
+	response_model=dict,
+	response_description='Returns statistics for each cache.',
+	summary='Cache statistics.',
+	responses=cache_stats_responses,
+)
+async def cache_stats(request: Request):
+	event_consumer = getattr(request.app.state, 'event_consumer', None)
+	return {
+		**{name: snapshot.stats() for name, snapshot in snapshots.items()},
+		'fastest_path': path_cache.stats(),
+		'path_table': path_table.stats(),
+		'prewarm': path_prewarmer.stats(),
+		'artworks': artwork_mirror.stats(),
+		'filters': filters_snapshot.stats(),
+		'filter_rooms': filter_room_cache.stats(),
+		'events': event_consumer.stats() if event_consumer is not None else None,
+	}
+
+
 @router.get(
 	path='/search-artwork',
 	tags=['SMK API'],
@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from app.schemas.filter_schemas import FilterResponse, FilterToRoomsRequest
 from app.utils.responses.filter import get_filters_responses, filter_to_rooms_responses
-from app.services.filter_service import get_filters as fetch_filters, filter_to_rooms
+from app.services.filter_service import filter_list_adapter, filters_snapshot, filter_to_rooms
+from app.utils.etag import etag_response, snapshot_body
 
 router = APIRouter()
 
@@ -14,12 +15,13 @@ router = APIRouter()
 	response_description='List of available filters.',
 	responses=get_filters_responses,
 )
-async def get_filters():
+async def get_filters(request: Request):
 	"""
-	Get a list of available filters.
+	Get a list of available filters, served from the cached filter catalog.
+	Answers 304 Not Modified when the client's If-None-Match matches the filter list.
 	"""
-	filters = fetch_filters()
-	return filters
+	snapshot = await filters_snapshot.get_snapshot()
+	return etag_response(request, snapshot_body(snapshot, filter_list_adapter))
 
 @router.post(
 	'/rooms',
@@ -33,5 +35,5 @@ async def filters_to_rooms(request: FilterToRoomsRequest):
 	"""
 	Get rooms needed to visit all artworks based on filters.
 	"""
-	rooms = filter_to_rooms(request)
+	rooms = await filter_to_rooms(request)
 	return rooms
\ No newline at end of file
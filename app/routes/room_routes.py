@@ -1,10 +1,41 @@
-from fastapi import APIRouter
-from app.schemas.room_response_schema import RoomModel, RoomListModel
-from app.services.rooms_controllers import get_all_rooms, get_room_by_id
-from app.utils.responses.rooms import get_room_by_id_responses, get_rooms_responses
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from app.schemas.room_response_schema import (
+	RoomModel,
+	RoomListModel,
+	RoomGeometryListModel,
+	RoomOccupancyListModel,
+	RoomBatchRequest,
+	RoomBatchResponse,
+	RoomChangesModel,
+)
+from app.services.rooms_controllers import (
+	get_rooms_snapshot,
+	get_room_by_id,
+	get_rooms_by_ids,
+	get_room_changes,
+	room_geometry_payload,
+	room_occupancy_payload,
+)
+from app.services.live_updates import room_update_events
+from app.utils.etag import etag_response, snapshot_body
+from app.utils.responses.rooms import (
+	get_room_by_id_responses,
+	get_rooms_responses,
+	get_room_geometry_responses,
+	get_room_occupancy_responses,
+	get_rooms_batch_responses,
+	get_room_changes_responses,
+	stream_room_updates_responses,
+)
 
 router = APIRouter()
 
+room_list_adapter = TypeAdapter(RoomListModel)
+room_geometry_adapter = TypeAdapter(RoomGeometryListModel)
+room_occupancy_adapter = TypeAdapter(RoomOccupancyListModel)
+
 
 @router.get(
 	'/',
@@ -14,11 +45,105 @@ router = APIRouter()
 	response_model=RoomListModel,
 	responses=get_rooms_responses
 )
-async def get_all_rooms_route():
+async def get_all_rooms_route(request: Request):
 	"""
 	Fetch all rooms from the database.
+	Answers 304 Not Modified when the client's If-None-Match matches the current snapshot.
+	"""
+	snapshot = await get_rooms_snapshot()
+	return etag_response(request, snapshot_body(snapshot, room_list_adapter))
+
+
+@router.get(
+	'/geometry',
+	summary='Get room geometry',
+	description='Fetch the static geometry (borders, floor, area, position and type) of all rooms.',
+	response_description='Geometry of all rooms.',
+	response_model=RoomGeometryListModel,
+	responses=get_room_geometry_responses
+)
+async def get_room_geometry_route(request: Request):
+	"""
+	Fetch the static geometry of all rooms.
+	"""
+	snapshot = await get_rooms_snapshot()
+	return etag_response(
+		request, snapshot_body(snapshot, room_geometry_adapter, 'geometry', room_geometry_payload)
+	)
+
+
+@router.get(
+	'/occupancy',
+	summary='Get room occupancy',
+	description='Fetch only the dynamic occupancy data (crowd factor, occupants, popularity) of all rooms.',
+	response_description='Occupancy of all rooms.',
+	response_model=RoomOccupancyListModel,
+	responses=get_room_occupancy_responses
+)
+async def get_room_occupancy_route(request: Request):
+	"""
+	Fetch the occupancy of all rooms.
+	"""
+	snapshot = await get_rooms_snapshot()
+	return etag_response(
+		request, snapshot_body(snapshot, room_occupancy_adapter, 'occupancy', room_occupancy_payload)
+	)
+
+
+@router.get(
+	'/changes',
+	summary='Get room occupancy changes',
+	description='Fetch the occupancy of rooms that changed since a snapshot version.',
+	response_description='Changed rooms and the new version to poll from.',
+	response_model=RoomChangesModel,
+	responses=get_room_changes_responses
+)
+async def get_room_changes_route(
+	since: str | None = Query(
+		default=None, title='Since', description='Version returned by the previous poll, omitted for a full list.'
+	),
+):
+	"""
+	Fetch the rooms whose occupancy changed since a version.
+	"""
+	return await get_room_changes(since)
+
+
+@router.get(
+	'/stream',
+	summary='Stream room occupancy',
+	description='Push room occupancy changes as Server-Sent Events. '
+	'The first event is a full resync, followed by a changes event for every new snapshot version.',
+	response_description='A text/event-stream of occupancy updates.',
+	response_class=StreamingResponse,
+	responses=stream_room_updates_responses
+)
+async def stream_room_updates_route(request: Request):
+	"""
+	Stream room occupancy changes to the client.
+	"""
+	# Loaded before the response starts, so sensor-sim errors get an error status
+	snapshot = await get_rooms_snapshot()
+	return StreamingResponse(
+		room_update_events(snapshot, request.is_disconnected),
+		media_type='text/event-stream',
+		headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+	)
+
+
+@router.post(
+	'/batch',
+	summary='Get rooms by IDs',
+	description='Fetch several rooms in one request, optionally projected onto a subset of fields.',
+	response_description='The rooms found and the IDs that were not found.',
+	response_model=RoomBatchResponse,
+	responses=get_rooms_batch_responses
+)
+async def get_rooms_batch_route(request: RoomBatchRequest):
+	"""
+	Fetch several rooms by their IDs.
 	"""
-	return await get_all_rooms()
+	return await get_rooms_by_ids(request.ids, request.fields)
 
 
 @router.get(
@@ -1,10 +1,23 @@
-from fastapi import APIRouter
-from app.schemas.sensor_response_schema import SensorModel, SensorListModel
-from app.services.sensor_controllers import get_all_sensors, get_sensor_by_id
-from app.utils.responses.sensors import get_sensors_responses, get_sensor_by_id_responses
+from fastapi import APIRouter, Request
+from pydantic import TypeAdapter
+from app.schemas.sensor_response_schema import (
+	SensorModel,
+	SensorListModel,
+	SensorBatchRequest,
+	SensorBatchResponse,
+)
+from app.services.sensor_controllers import get_sensors_snapshot, get_sensor_by_id, get_sensors_by_ids
+from app.utils.etag import etag_response, snapshot_body
+from app.utils.responses.sensors import (
+	get_sensors_responses,
+	get_sensor_by_id_responses,
+	get_sensors_batch_responses,
+)
 
 router = APIRouter()
 
+sensor_list_adapter = TypeAdapter(SensorListModel)
+
 
 @router.get(
 	'/',
@@ -14,11 +27,28 @@ router = APIRouter()
 	response_model=SensorListModel,
 	responses=get_sensors_responses
 )
-async def get_all_sensors_route():
+async def get_all_sensors_route(request: Request):
 	"""
 	Fetch all sensors from the database.
+	Answers 304 Not Modified when the client's If-None-Match matches the current snapshot.
+	"""
+	snapshot = await get_sensors_snapshot()
+	return etag_response(request, snapshot_body(snapshot, sensor_list_adapter))
+
+@router.post(
+	'/batch',
+	summary='Get sensors by IDs',
+	description='Fetch several sensors in one request, optionally projected onto a subset of fields.',
+	response_description='The sensors found and the IDs that were not found.',
+	response_model=SensorBatchResponse,
+	responses=get_sensors_batch_responses
+)
+async def get_sensors_batch_route(request: SensorBatchRequest):
 	"""
-	return await get_all_sensors()
+	Fetch several sensors by their IDs.
+	"""
+	return await get_sensors_by_ids(request.ids, request.fields)
+
 
 @router.get(
 	'/{sensor_id}',
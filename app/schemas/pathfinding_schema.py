@@ -1,6 +1,8 @@
-from pydantic import BaseModel, field_validator, ValidationInfo
-from typing import List
+from pydantic import BaseModel, Field, field_validator, ValidationInfo
+from typing import List, Literal, Optional
+from app.schemas.room_response_schema import RoomFromPathfindingModel
 from app.schemas.sensor_response_schema import SensorWithRoomsModel
+from app.config import DISTANCE_MATRIX_MAX_ROOMS, PATH_BATCH_SETTINGS, REROUTE_SETTINGS
 
 
 class FrontendPathFindingRequest(BaseModel):
@@ -34,3 +36,76 @@ class FrontendMultiPathRequest(BaseModel):
 class FastestPathModel(BaseModel):
     fastest_path: List[SensorWithRoomsModel]
     distance: float
+
+
+class CompactSensorModel(BaseModel):
+	id: str
+	# Indices into the room table of the path
+	rooms: List[int]
+	is_vertical: bool
+
+
+class CompactPathModel(BaseModel):
+	# Every room on the path once, in order of first appearance
+	rooms: List[RoomFromPathfindingModel]
+	sensors: List[CompactSensorModel]
+	# [latitude, longitude] of each sensor, or the same points as an encoded polyline (precision 6)
+	coordinates: Optional[List[List[float]]] = None
+	polyline: Optional[str] = None
+	distance: float
+
+
+class FastestPathBatchRequest(BaseModel):
+	paths: List[FrontendPathFindingRequest]
+
+	@field_validator('paths')
+	def check_paths(cls, value: List[FrontendPathFindingRequest], info: ValidationInfo) -> List[FrontendPathFindingRequest]:
+		if not value:
+			raise ValueError(f"Field '{info.field_name}' must be a non-empty list of paths.")
+		if len(value) > PATH_BATCH_SETTINGS['max_paths']:
+			raise ValueError(f"Field '{info.field_name}' must not contain more than {PATH_BATCH_SETTINGS['max_paths']} paths.")
+		return value
+
+
+class DistanceMatrixRequest(BaseModel):
+	sources: List[str]
+	targets: List[str]
+
+	@field_validator('sources', 'targets')
+	def check_rooms(cls, value: List[str], info: ValidationInfo) -> List[str]:
+		if not value:
+			raise ValueError(f"Field '{info.field_name}' must be a non-empty list of room ids.")
+		if len(value) > DISTANCE_MATRIX_MAX_ROOMS:
+			raise ValueError(f"Field '{info.field_name}' must not contain more than {DISTANCE_MATRIX_MAX_ROOMS} rooms.")
+		return value
+
+
+class DistanceMatrixModel(BaseModel):
+	sources: List[str]
+	targets: List[str]
+	# costs[i][j] is the crowd-weighted cost from sources[i] to targets[j], None when unreachable
+	costs: List[List[Optional[float]]]
+
+
+class RerouteRequest(BaseModel):
+	# Room the visitor is in now
+	position: str
+	# The previous path and its target room, needed unless the X-Path-Token header is sent
+	path: Optional[FastestPathModel] = None
+	target: Optional[str] = None
+	threshold: float = Field(default_factory=lambda: REROUTE_SETTINGS['threshold'], ge=0)
+
+	@field_validator('position', 'target', mode='before')
+	def check_rooms(cls, value, info: ValidationInfo):
+		if value is None and info.field_name == 'target':
+			return value
+		if not isinstance(value, str) or not value.strip():
+			raise ValueError(f"Field '{info.field_name}' must be a non-empty string.")
+		return value
+
+
+class RerouteModel(BaseModel):
+	# 'unchanged': keep following the remaining path; 'rerouted': follow the new path from the current position
+	status: Literal['unchanged', 'rerouted']
+	fastest_path: Optional[List[SensorWithRoomsModel]] = None
+	distance: Optional[float] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, field_validator, ValidationInfo
+from typing import Any, Dict, List, Optional
 
 
 class RoomModel(BaseModel):
@@ -28,3 +28,59 @@ class RoomFromPathfindingModel(BaseModel):
 
 class RoomListModel(BaseModel):
 	rooms: List[RoomModel]
+
+
+class RoomGeometryModel(BaseModel):
+	id: str
+	name: str
+	type: str
+	area: float
+	longitude: float
+	latitude: float
+	floor: int
+	borders: List[List[float]]
+
+
+class RoomGeometryListModel(BaseModel):
+	rooms: List[RoomGeometryModel]
+
+
+class RoomOccupancyModel(BaseModel):
+	id: str
+	crowd_factor: float
+	popularity_factor: float
+	occupants: int
+
+
+class RoomOccupancyListModel(BaseModel):
+	rooms: List[RoomOccupancyModel]
+
+
+class RoomChangesModel(BaseModel):
+	version: str
+	resync: bool
+	rooms: List[RoomOccupancyModel]
+	removed: List[str]
+
+
+class RoomBatchRequest(BaseModel):
+	ids: List[str]
+	fields: Optional[List[str]] = None
+
+	@field_validator('ids')
+	def check_ids(cls, value: List[str], info: ValidationInfo) -> List[str]:
+		if not value:
+			raise ValueError(f"Field '{info.field_name}' must be a non-empty list of ids.")
+		return value
+
+	@field_validator('fields')
+	def check_fields(cls, value: Optional[List[str]], info: ValidationInfo) -> Optional[List[str]]:
+		invalid = [field for field in value or [] if field not in RoomModel.model_fields]
+		if invalid:
+			raise ValueError(f"Unknown room fields: {', '.join(invalid)}.")
+		return value
+
+
+class RoomBatchResponse(BaseModel):
+	rooms: List[Dict[str, Any]]
+	missing: List[str]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, field_validator, ValidationInfo
+from typing import Any, Dict, List, Optional
 from app.schemas.room_response_schema import RoomFromPathfindingModel
 
 
@@ -21,3 +21,26 @@ class SensorWithRoomsModel(BaseModel):
     
 class SensorListModel(BaseModel):
   sensors: List[SensorModel]
+
+
+class SensorBatchRequest(BaseModel):
+	ids: List[str]
+	fields: Optional[List[str]] = None
+
+	@field_validator('ids')
+	def check_ids(cls, value: List[str], info: ValidationInfo) -> List[str]:
+		if not value:
+			raise ValueError(f"Field '{info.field_name}' must be a non-empty list of ids.")
+		return value
+
+	@field_validator('fields')
+	def check_fields(cls, value: Optional[List[str]], info: ValidationInfo) -> Optional[List[str]]:
+		invalid = [field for field in value or [] if field not in SensorModel.model_fields]
+		if invalid:
+			raise ValueError(f"Unknown sensor fields: {', '.join(invalid)}.")
+		return value
+
+
+class SensorBatchResponse(BaseModel):
+	sensors: List[Dict[str, Any]]
+	missing: List[str]
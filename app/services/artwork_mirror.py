@@ -0,0 +1,336 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Iterable
+from app.config import ARTWORK_HARVEST_SETTINGS, ARTWORK_MIRROR_SETTINGS
+from app.schemas.smk_api_schemas import Artwork
+from app.utils.artwork_harvester import ArtworkHarvester, read_ndjson
+
+try:
+	import fcntl
+except ImportError:  # pragma: no cover
+	# Windows: syncs of processes sharing a mirror are not serialized, run a single worker there
+	fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Rows the SMK API returns when no limit is given, and the most it returns per call.
+DEFAULT_ROWS = 10
+MAX_ROWS = 2000
+
+_SCHEMA = """
+CREATE TABLE artworks (
+	position INTEGER PRIMARY KEY,
+	location TEXT,
+	search_text TEXT NOT NULL,
+	part_of INTEGER NOT NULL,
+	item TEXT NOT NULL
+);
+CREATE INDEX artworks_location ON artworks (location, position);
+CREATE TABLE filter_rooms (
+	type TEXT NOT NULL,
+	value TEXT NOT NULL,
+	location TEXT NOT NULL,
+	PRIMARY KEY (type, value, location)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# The values of each filter type (see GET /filters) an artwork has, as in the SMK API facets.
+FILTER_FIELDS: dict[str, Callable[[dict], Iterable[str]]] = {
+	'creator': lambda item: (production.get('creator') for production in item.get('production') or []),
+	'materials': lambda item: item.get('materials') or [],
+}
+
+
+def search_text(item: dict) -> str:
+	"""The text '/artwork' keys are matched against: titles, creators and tags, lower case."""
+	words = [title.get('title') or '' for title in item.get('titles') or []]
+	words += item.get('artist') or []
+	words += [production.get('creator') or '' for production in item.get('production') or []]
+	words += item.get('tags') or []
+	return ' '.join(str(word) for word in words).lower()
+
+
+def stored_item(item: dict) -> str:
+	"""Keep only the fields the artwork response returns."""
+	return json.dumps({field: item[field] for field in Artwork.model_fields if item.get(field) is not None})
+
+
+def write_mirror(path: str, items: Iterable[dict], synced_at: float) -> int:
+	"""
+	Write a complete mirror to a new file and move it into place, so readers never see a partial one.
+	An artwork listed more than once (the catalog can shift between pages of a harvest) is kept once.
+	Returns the number of artworks written.
+	"""
+	temporary = f'{path}.tmp'
+	if os.path.exists(temporary):
+		os.remove(temporary)
+	filter_rooms: set[tuple[str, str, str]] = set()
+	object_numbers: set[str] = set()
+
+	def rows() -> Iterable[tuple]:
+		for position, item in enumerate(items):
+			object_number = item.get('object_number')
+			if object_number is not None:
+				if object_number in object_numbers:
+					continue
+				object_numbers.add(object_number)
+			location = item.get('current_location_name')
+			if location:
+				for type, values in FILTER_FIELDS.items():
+					filter_rooms.update((type, value, location) for value in values(item) if value)
+			yield position, location, search_text(item), item.get('part_of') is not None, stored_item(item)
+
+	connection = sqlite3.connect(temporary)
+	try:
+		connection.executescript(_SCHEMA)
+		connection.executemany(
+			'INSERT INTO artworks (position, location, search_text, part_of, item) VALUES (?, ?, ?, ?, ?)', rows()
+		)
+		connection.executemany('INSERT INTO filter_rooms (type, value, location) VALUES (?, ?, ?)', filter_rooms)
+		(count,) = connection.execute('SELECT COUNT(*) FROM artworks').fetchone()
+		connection.executemany(
+			'INSERT INTO meta (key, value) VALUES (?, ?)', [('synced_at', str(synced_at)), ('count', str(count))]
+		)
+		connection.commit()
+	finally:
+		connection.close()
+	os.replace(temporary, path)
+	return count
+
+
+def search_mirror(path: str, keys: str | None, location: str | None, rows: int, offset: int) -> dict:
+	"""
+	Answer an artwork search from a mirror, shaped like an SMK API response.
+	Every word of `keys` must occur in the titles, creators or tags ('*' matches everything).
+	"""
+	conditions = []
+	parameters: list[Any] = []
+	if location is not None:
+		conditions.append('location = ?')
+		parameters.append(location)
+	for word in (keys or '').lower().split():
+		if word == '*':
+			continue
+		conditions.append("search_text LIKE ? ESCAPE '\\'")
+		escaped = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+		parameters.append(f'%{escaped}%')
+	where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+	connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+	try:
+		(found,) = connection.execute(f'SELECT COUNT(*) FROM artworks {where}', parameters).fetchone()
+		page = connection.execute(
+			f'SELECT item, part_of FROM artworks {where} ORDER BY position LIMIT ? OFFSET ?', [*parameters, rows, offset]
+		).fetchall()
+	finally:
+		connection.close()
+	# Parts of other artworks count as found but are left out, like the live API answers are filtered
+	items = [json.loads(item) for item, part_of in page if not part_of]
+	return {'items': items, 'found': found, 'offset': offset, 'rows': rows}
+
+
+def read_filter_index(path: str) -> dict[str, dict[str, frozenset[str]]]:
+	"""The rooms holding artworks with each filter value: filter type -> value -> room names."""
+	index: dict[str, dict[str, set[str]]] = {type: {} for type in FILTER_FIELDS}
+	connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+	try:
+		for type, value, location in connection.execute('SELECT type, value, location FROM filter_rooms'):
+			index.setdefault(type, {}).setdefault(value, set()).add(location)
+	finally:
+		connection.close()
+	return {type: {value: frozenset(rooms) for value, rooms in values.items()} for type, values in index.items()}
+
+
+def read_meta(path: str) -> dict[str, str] | None:
+	"""When an existing mirror was synced and how many artworks it has, or None if there is no usable mirror."""
+	if not os.path.exists(path):
+		return None
+	try:
+		connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+		try:
+			meta = dict(connection.execute('SELECT key, value FROM meta').fetchall())
+		finally:
+			connection.close()
+	except sqlite3.Error:
+		logger.warning('Ignoring unreadable artwork mirror at %s', path)
+		return None
+	return meta if 'synced_at' in meta else None
+
+
+def try_lock(path: str) -> int | None:
+	"""
+	Take an exclusive lock on a file without waiting. Returns the open file holding the lock (closing
+	it releases the lock, as does the exit of the process), or None when another process holds it.
+	"""
+	lock = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+	if fcntl is None:  # pragma: no cover
+		return lock
+	try:
+		fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+	except BlockingIOError:
+		os.close(lock)
+		return None
+	return lock
+
+
+class ArtworkMirror:
+	"""
+	A local copy of the on-display SMK catalog in SQLite, refreshed by a background task.
+	Searches return None until the first sync (or a mirror from a previous run) is available,
+	and whenever the mirror cannot be read, so callers fall back to the live API.
+	"""
+
+	def __init__(self, path: str, page_size: int, sync_interval: float, retry_interval: float):
+		self.path = path
+		self.page_size = page_size
+		self.sync_interval = sync_interval
+		self.retry_interval = retry_interval
+		self.synced_at: float | None = None
+		self.artworks = 0
+		# Filter type -> value -> rooms, answering POST /filters/rooms without the SMK API
+		self.filter_index: dict[str, dict[str, frozenset[str]]] | None = None
+		self._task: asyncio.Task | None = None
+		self.syncs = 0
+		self.sync_errors = 0
+		self.queries = 0
+		self.fallbacks = 0
+
+	@property
+	def ready(self) -> bool:
+		return self.synced_at is not None
+
+	async def sync(self) -> bool:
+		"""
+		Download the catalog and replace the mirror with it. An interrupted download resumes on the next sync.
+		Workers and replicas sharing the mirror path take turns through a lock file: while another
+		process holds it nothing is done and False is returned, and a mirror another process wrote
+		less than `sync_interval` seconds ago is used instead of downloading the catalog again.
+		"""
+		directory = os.path.dirname(self.path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		lock = try_lock(f'{self.path}.lock')
+		if lock is None:
+			return False
+		try:
+			meta = await asyncio.to_thread(read_meta, self.path)
+			if (
+				meta is not None
+				and float(meta['synced_at']) != self.synced_at
+				and time.time() - float(meta['synced_at']) < self.sync_interval
+				and await self._load(meta)
+			):
+				logger.info('Using the artwork mirror written by another process to %s', self.path)
+				return True
+			harvest = f'{self.path}.ndjson'
+			result = await ArtworkHarvester(harvest, page_size=self.page_size, max_age=self.sync_interval).run()
+			if not result['items']:
+				raise ValueError('The SMK API returned no on-display artworks')
+			synced_at = time.time()
+			self.artworks = await asyncio.to_thread(write_mirror, self.path, read_ndjson(harvest), synced_at)
+			os.remove(harvest)
+			self.filter_index = await asyncio.to_thread(read_filter_index, self.path)
+		finally:
+			os.close(lock)
+		self.synced_at = synced_at
+		self.syncs += 1
+		logger.info('Mirrored %s on-display artworks to %s', self.artworks, self.path)
+		return True
+
+	async def _load(self, meta: dict) -> bool:
+		"""Serve an existing mirror. Returns False if it has to be downloaded again."""
+		try:
+			self.filter_index = await asyncio.to_thread(read_filter_index, self.path)
+		except sqlite3.Error:
+			# Mirrors written before the filter index existed are downloaded again
+			logger.info('Artwork mirror at %s has no filter index, syncing it again', self.path)
+			return False
+		self.synced_at = float(meta['synced_at'])
+		self.artworks = int(meta['count'])
+		return True
+
+	async def search(self, keys: str | None, location: str | None, rows: int | None, offset: int | None) -> dict | None:
+		"""Search the mirror like the SMK API, or return None if the live API has to answer."""
+		if not self.ready:
+			self.fallbacks += 1
+			return None
+		rows = min(rows, MAX_ROWS) if rows else DEFAULT_ROWS
+		try:
+			result = await asyncio.to_thread(search_mirror, self.path, keys, location, rows, offset or 0)
+		except sqlite3.Error:
+			logger.exception('Failed to search the artwork mirror, using the SMK API')
+			self.fallbacks += 1
+			return None
+		self.queries += 1
+		return result
+
+	async def _run(self) -> None:
+		meta = await asyncio.to_thread(read_meta, self.path)
+		if meta is not None:
+			await self._load(meta)
+		while True:
+			age = time.time() - self.synced_at if self.synced_at is not None else None
+			if age is None or age >= self.sync_interval:
+				try:
+					synced = await self.sync()
+				except asyncio.CancelledError:
+					raise
+				except Exception:
+					self.sync_errors += 1
+					logger.exception('Failed to mirror the SMK artwork catalog, retrying in %s seconds', self.retry_interval)
+					await asyncio.sleep(self.retry_interval)
+					continue
+				if not synced:
+					logger.info('Another process is syncing the artwork mirror, checking again in %s seconds', self.retry_interval)
+					await asyncio.sleep(self.retry_interval)
+					continue
+				age = time.time() - self.synced_at
+			await asyncio.sleep(self.sync_interval - age)
+
+	def start(self) -> None:
+		"""Start the background sync. Called from the application lifespan."""
+		if self._task is None or self._task.done():
+			self._task = asyncio.get_running_loop().create_task(self._run())
+
+	async def stop(self) -> None:
+		if self._task is not None and not self._task.done():
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+		self._task = None
+
+	def clear(self) -> None:
+		self.synced_at = None
+		self.artworks = 0
+		self.filter_index = None
+		self.syncs = 0
+		self.sync_errors = 0
+		self.queries = 0
+		self.fallbacks = 0
+
+	def stats(self) -> dict:
+		return {
+			'ready': self.ready,
+			'artworks': self.artworks,
+			'filter_values': sum(map(len, self.filter_index.values())) if self.filter_index else 0,
+			'age': round(time.time() - self.synced_at, 3) if self.synced_at is not None else None,
+			'syncs': self.syncs,
+			'sync_errors': self.sync_errors,
+			'queries': self.queries,
+			'fallbacks': self.fallbacks,
+		}
+
+
+artwork_mirror = ArtworkMirror(
+	path=ARTWORK_MIRROR_SETTINGS['path'],
+	page_size=ARTWORK_HARVEST_SETTINGS['page_size'],
+	sync_interval=ARTWORK_MIRROR_SETTINGS['sync_interval'],
+	retry_interval=ARTWORK_MIRROR_SETTINGS['retry_interval'],
+)
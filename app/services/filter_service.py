@@ -1,46 +1,122 @@
+import asyncio
+import json
+import logging
+import os
+import time
 from fastapi import HTTPException
-import requests
-from app.schemas.filter_schemas import FilterToRoomsRequest
+from pydantic import TypeAdapter
+from app.config import FILTER_SETTINGS
+from app.schemas.filter_schemas import FilterResponse, FilterToRoomsRequest
+from app.services.artwork_mirror import artwork_mirror
+from app.utils.artwork_harvester import SMK_SEARCH_URL
+from app.utils.http_clients import upstream_client
+from app.utils.snapshot_cache import SnapshotCache
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 filter_types = [
 	'creator',
 	'materials',
 ]
 
-def get_filters() -> list[dict]:
-	"""Fetch all artworks from the SMK API."""
-	base_url = 'https://api.smk.dk/api/v1/art/search'
-	page_size = 10
+filter_list_adapter = TypeAdapter(list[FilterResponse])
 
-	response = requests.get(
-		base_url,
-		params={
-			'keys': '*',
-			'offset': 0,
-			'rows': page_size,
-			'filters': '[on_display:true]',
-			'facets': filter_types,
-		},
-	)
+# (filter type, value) -> rooms with artworks having that value, from the SMK API
+room_cache = TTLCache(max_size=FILTER_SETTINGS['room_cache_size'], ttl=FILTER_SETTINGS['room_ttl'])
+
+# Shared by all requests, so concurrent requests together stay within the limit
+room_lookups = asyncio.Semaphore(FILTER_SETTINGS['concurrency'])
+
+
+async def search_smk(params: dict) -> dict:
+	"""Search the SMK API without blocking the event loop."""
+	async with upstream_client(SMK_SEARCH_URL) as client:
+		response = await client.get(SMK_SEARCH_URL, params=params)
 	if response.status_code != 200:
 		raise HTTPException(
 			status_code=response.status_code,
 			detail=f'Failed to fetch data: {response.text}'
 		)
-	data = response.json()
+	return response.json()
+
+
+async def get_filters() -> list[dict]:
+	"""Fetch all artworks from the SMK API."""
+	page_size = 10
+
+	data = await search_smk({
+		'keys': '*',
+		'offset': 0,
+		'rows': page_size,
+		'filters': '[on_display:true]',
+		'facets': filter_types,
+	})
 	filters = data.get('facets', [])
 	if not filters:
 		raise HTTPException(
 			status_code=500,
 			detail='No filters found in the response.'
 		)
-  
+
 	result = get_facet_count(filters)
 	return result
 
-  
-	
-  
+
+def save_filter_catalog(path: str, filters: list[dict], fetched_at: float) -> None:
+	"""Persist a filter list, replacing the previous copy in one step."""
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	temporary = f'{path}.tmp'
+	with open(temporary, 'w', encoding='utf-8') as file:
+		json.dump({'fetched_at': fetched_at, 'filters': filters}, file, ensure_ascii=False)
+	os.replace(temporary, path)
+
+
+def read_filter_catalog(path: str) -> tuple[list[dict], float] | None:
+	"""A persisted filter list and when it was fetched, or None if there is no usable copy."""
+	try:
+		with open(path, encoding='utf-8') as file:
+			catalog = json.load(file)
+		filters = catalog['filters']
+		filter_list_adapter.validate_python(filters)
+		return filters, float(catalog['fetched_at'])
+	except FileNotFoundError:
+		return None
+	except (OSError, ValueError, KeyError, TypeError):
+		logger.warning('Ignoring unreadable filter catalog at %s', path)
+		return None
+
+
+async def load_filters() -> list[dict]:
+	"""Fetch the filter list and keep a copy on disk for the next start."""
+	filters = await get_filters()
+	try:
+		await asyncio.to_thread(save_filter_catalog, FILTER_SETTINGS['catalog_path'], filters, time.time())
+	except OSError:
+		logger.exception('Failed to persist the filter catalog to %s', FILTER_SETTINGS['catalog_path'])
+	return filters
+
+
+# The filter list changes rarely, so GET /filters is answered from memory
+filters_snapshot = SnapshotCache(
+	'filters',
+	load_filters,
+	ttl=FILTER_SETTINGS['catalog_ttl'],
+	max_stale=FILTER_SETTINGS['catalog_max_stale'],
+)
+
+
+def restore_filters() -> bool:
+	"""Serve the filter list persisted by a previous run until it is refreshed. Called from the application lifespan."""
+	catalog = read_filter_catalog(FILTER_SETTINGS['catalog_path'])
+	if catalog is None:
+		return False
+	filters, fetched_at = catalog
+	return filters_snapshot.restore(filters, time.time() - fetched_at) is not None
+
+
 def get_facet_count(facets: dict) -> list[dict]:
 	"""Get the creators of the artworks and their counts."""
 	result = []
@@ -57,40 +133,50 @@ def get_facet_count(facets: dict) -> list[dict]:
 
 	return result
 
-def filter_to_rooms(request: FilterToRoomsRequest) -> list[str]:
-	"""Return the rooms needed to find all artworks based on the filters."""
-	rooms = []
+async def filter_to_rooms(request: FilterToRoomsRequest) -> list[str]:
+	"""
+	Return the rooms needed to find all artworks based on the filters, each room once, sorted.
+	Answered from the filter index of the artwork mirror when it is available. Otherwise (and for
+	filter types it does not index) every distinct filter value is looked up in the SMK API,
+	concurrently up to the configured limit for the whole gateway, with the rooms of each value cached for a while.
+	"""
+	index = artwork_mirror.filter_index
+	rooms: set[str] = set()
+	lookups: dict[tuple[str, str], None] = {}
 	for type in request.filters:
+		values = index.get(type.type) if index is not None else None
 		for filter in type.keys:
-			rooms.extend(get_rooms(type.type, filter))
-	return rooms
+			if values is not None:
+				rooms |= values.get(filter, frozenset())
+			else:
+				lookups[(type.type, filter)] = None
 
+	async def lookup(filter_name: str, value: str) -> list[str]:
+		async with room_lookups:
+			return await get_rooms(filter_name, value)
 
-def get_rooms(filter_name: str, value: str) -> list[str]:
-	"""Get the rooms based on the filter name and value."""
-	result = requests.get(
-		'https://api.smk.dk/api/v1/art/search',
-		params={
-			'keys': '*',
-			'offset': 0,
-			'rows': 10,
-			'filters': f'[{filter_name}:{value}]',
-			'facets': ['current_location_name'],
-		},
+	results = await asyncio.gather(
+		*(room_cache.get(key, lambda key=key: lookup(*key)) for key in lookups)
 	)
- 
-	if result.status_code != 200:
-		raise HTTPException(
-			status_code=result.status_code,
-			detail=f'Failed to fetch data: {result.text}'
-		)
-  
-	data = result.json()
- 
+	for found in results:
+		rooms.update(found)
+	return sorted(rooms)
+
+
+async def get_rooms(filter_name: str, value: str) -> list[str]:
+	"""Get the rooms based on the filter name and value."""
+	data = await search_smk({
+		'keys': '*',
+		'offset': 0,
+		'rows': 10,
+		'filters': f'[{filter_name}:{value}]',
+		'facets': ['current_location_name'],
+	})
+
 	rooms = data.get('facets', {}).get('current_location_name', [])
 	if not rooms:
 		return []
 	rooms = [rooms[i] for i in range(0, len(rooms), 2)]
 
-	
-	return rooms
\ No newline at end of file
+
+	return rooms
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable
+from app.config import LIVE_UPDATES_SETTINGS
+from app.utils.broadcaster import Broadcaster
+from app.utils.room_changes import room_changes
+from app.utils.room_sensor_fetch import rooms_snapshot
+from app.utils.snapshot_cache import Snapshot
+
+room_broadcaster = Broadcaster(
+	queue_size=LIVE_UPDATES_SETTINGS['queue_size'],
+	max_overflows=LIVE_UPDATES_SETTINGS['max_overflows'],
+)
+
+
+def format_event(event: str, data: dict) -> str:
+	"""Format a Server-Sent Event."""
+	return f'event: {event}\nid: {data["version"]}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def resync_event(snapshot: Snapshot) -> str:
+	"""The full occupancy of every room, serialized once per snapshot version."""
+	return snapshot.memo('resync_event', lambda value: format_event('resync', room_changes.changes(None, snapshot)))
+
+
+def publish_room_changes(previous: Snapshot | None, current: Snapshot) -> None:
+	"""Snapshot listener pushing the rooms changed in a new version to every subscriber."""
+	if previous is None or room_broadcaster.subscriber_count() == 0:
+		return
+	changes = room_changes.changes(previous.version, current)
+	if changes['resync']:
+		room_broadcaster.publish(resync_event(current), lambda: resync_event(current))
+		return
+	if not changes['rooms'] and not changes['removed']:
+		return
+	# Serialized once and shared by every subscriber
+	room_broadcaster.publish(format_event('changes', changes), lambda: resync_event(current))
+
+
+# Driven by the shared rooms snapshot refresher, so upstream load does not grow with subscribers.
+rooms_snapshot.subscribe(publish_room_changes)
+
+
+async def room_update_events(
+	snapshot: Snapshot,
+	is_disconnected: Callable[[], Awaitable[bool]],
+	keepalive: float = LIVE_UPDATES_SETTINGS['keepalive'],
+) -> AsyncIterator[str]:
+	"""
+	Stream room occupancy as Server-Sent Events.
+	The first event is a full resync, followed by a 'changes' event for every new snapshot version.
+	`snapshot` is loaded by the caller before the response starts, so a failing upstream is
+	answered with an error status instead of an empty stream.
+	"""
+	subscription = room_broadcaster.subscribe()
+	try:
+		# Versions published after `snapshot` was loaded reach the subscription only from now on
+		latest = rooms_snapshot.peek()
+		yield resync_event(latest if latest is not None and latest.version > snapshot.version else snapshot)
+		while not await is_disconnected():
+			try:
+				message = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+			except asyncio.TimeoutError:
+				yield ': keep-alive\n\n'
+				continue
+			if message is None:
+				break
+			yield message
+	finally:
+		room_broadcaster.unsubscribe(subscription)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+from app.utils.popularity import DecayingTopK
+from app.utils.snapshot_cache import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class PathPrewarmer:
+	"""
+	Recomputes the most requested paths in the background after each rooms snapshot refresh, so the
+	first request for a popular pair after a crowd change is answered from the cache.
+	At most one run is in progress; refreshes during a run trigger one more run afterwards.
+	"""
+
+	def __init__(
+		self,
+		popularity: DecayingTopK,
+		sensors: Callable[[], Snapshot | None],
+		warm: Callable[[Hashable, Snapshot, Snapshot], Awaitable[bool]],
+		pairs: int,
+		concurrency: int,
+	):
+		self.popularity = popularity
+		self._sensors = sensors
+		self._warm = warm
+		self.pairs = pairs
+		self.concurrency = concurrency
+		self._task: asyncio.Task | None = None
+		self._rooms: Snapshot | None = None
+		self.runs = 0
+		self.warmed = 0
+		self.errors = 0
+
+	def record(self, key: Hashable) -> None:
+		"""Count a request for a path."""
+		if self.pairs > 0:
+			self.popularity.record(key)
+
+	def schedule(self, previous: Snapshot | None, current: Snapshot) -> None:
+		"""Warm the popular paths for a new rooms snapshot. Has the signature of a snapshot listener."""
+		if self.pairs <= 0 or previous is None or not len(self.popularity):
+			return
+		self._rooms = current
+		if self._task is not None and not self._task.done():
+			return
+		try:
+			loop = asyncio.get_running_loop()
+		except RuntimeError:
+			return
+		self._task = loop.create_task(self._run())
+
+	async def _run(self) -> None:
+		while self._rooms is not None:
+			rooms, self._rooms = self._rooms, None
+			sensors = self._sensors()
+			if sensors is None:
+				return
+			self.runs += 1
+			limit = asyncio.Semaphore(self.concurrency)
+			await asyncio.gather(*(self._warm_one(key, rooms, sensors, limit) for key, _ in self.popularity.top(self.pairs)))
+
+	async def _warm_one(self, key: Hashable, rooms: Snapshot, sensors: Snapshot, limit: asyncio.Semaphore) -> None:
+		async with limit:
+			try:
+				if await self._warm(key, rooms, sensors):
+					self.warmed += 1
+			except Exception as e:
+				# Invalid pairs are requested too, and their errors already reached the client
+				self.errors += 1
+				logger.debug('Failed to pre-warm path %s: %s', key, e)
+
+	async def wait(self) -> None:
+		"""Wait for a scheduled run to finish."""
+		if self._task is not None:
+			await self._task
+
+	def clear(self) -> None:
+		self.popularity.clear()
+		self._rooms = None
+		self.runs = 0
+		self.warmed = 0
+		self.errors = 0
+
+	def stats(self) -> dict:
+		return {
+			'tracked_pairs': len(self.popularity),
+			'top': [
+				{'source': source, 'target': target, 'count': round(count, 2)}
+				for (source, target), count in self.popularity.top(min(self.pairs, 5))
+			],
+			'runs': self.runs,
+			'warmed': self.warmed,
+			'errors': self.errors,
+		}
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+import numpy as np
+from fastapi import HTTPException
+from app.schemas.pathfinding_schema import FastestPathModel
+from app.utils.snapshot_cache import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class PathTable:
+	"""
+	All-pairs fastest paths between rooms, precomputed from a sensor graph with Floyd-Warshall.
+
+	Every room gets a start node with edges to its doors and an end node with edges from its
+	doors. Start nodes have no incoming and end nodes no outgoing edges, so paths never pass
+	through them, and the start-to-end block of the matrix is the room-to-room table.
+	The next-hop matrix reconstructs a path in O(path length).
+	"""
+
+	def __init__(self, graph: Any, topology: str, rooms_version: int, sensors_version: int):
+		self.graph = graph
+		self.topology = topology
+		self.rooms_version = rooms_version
+		self.sensors_version = sensors_version
+		self.doors = list(graph.sensors)
+		door_index = {door: index for index, door in enumerate(self.doors)}
+		room_ids = [room_id for room_id in graph.rooms if graph.doors.get(room_id)]
+		self.room_index = {room_id: index for index, room_id in enumerate(room_ids)}
+
+		doors, rooms = len(self.doors), len(room_ids)
+		size = doors + 2 * rooms
+		cost = np.full((size, size), np.inf)
+		length = np.zeros((size, size))
+		hop = np.full((size, size), -1, dtype=np.int32)
+		diagonal = np.arange(size)
+		cost[diagonal, diagonal] = 0.0
+		hop[diagonal, diagonal] = diagonal
+
+		for door, edges in graph.adjacency.items():
+			i = door_index[door]
+			for neighbour, edge_cost, edge_distance in edges:
+				j = door_index[neighbour]
+				if edge_cost < cost[i, j]:
+					cost[i, j] = edge_cost
+					length[i, j] = edge_distance
+					hop[i, j] = j
+		for room_id, index in self.room_index.items():
+			start, end = doors + index, doors + rooms + index
+			for door in graph.doors[room_id]:
+				j = door_index[door['id']]
+				cost[start, j] = cost[j, end] = 0.0
+				hop[start, j] = j
+				hop[j, end] = end
+
+		# Only doors can be intermediate nodes. Each step only touches the nodes that reach k
+		# and the nodes k reaches, and updates the matrices in place.
+		for k in range(doors):
+			rows = np.flatnonzero(np.isfinite(cost[:, k]))
+			columns = np.flatnonzero(np.isfinite(cost[k, :]))
+			via = cost[rows, k, None] + cost[k, columns]
+			better_rows, better_columns = np.nonzero(via < cost[np.ix_(rows, columns)])
+			if better_rows.size:
+				i, j = rows[better_rows], columns[better_columns]
+				cost[i, j] = via[better_rows, better_columns]
+				length[i, j] = length[i, k] + length[k, j]
+				hop[i, j] = hop[i, k]
+
+		self._doors = doors
+		self._rooms = rooms
+		self._cost = cost
+		self._length = length
+		self._hop = hop
+
+	def room_costs(self) -> np.ndarray:
+		"""Crowd-weighted cost from every room (rows) to every room (columns), in `room_index` order."""
+		start = self._doors
+		end = self._doors + self._rooms
+		return self._cost[start:end, end:]
+
+	def room_distances(self) -> np.ndarray:
+		"""Walking distance in meters along the fastest path between every pair of rooms."""
+		start = self._doors
+		end = self._doors + self._rooms
+		return self._length[start:end, end:]
+
+	def fastest_path(self, source: str, target: str) -> FastestPathModel | None:
+		"""Look up the fastest path between two rooms, or None if a room is not in the table."""
+		source_index = self.room_index.get(source)
+		target_index = self.room_index.get(target)
+		if source_index is None or target_index is None:
+			return None
+		if source == target:
+			return {'fastest_path': [], 'distance': 0.0}
+		start = self._doors + source_index
+		end = self._doors + self._rooms + target_index
+		if not np.isfinite(self._cost[start, end]):
+			raise HTTPException(status_code=404, detail=f"No path found from room '{source}' to room '{target}'.")
+
+		path = []
+		node = self._hop[start, end]
+		while node != end:
+			path.append(self.graph.sensor_with_rooms(self.graph.sensors[self.doors[node]]))
+			node = self._hop[node, end]
+		return {'fastest_path': path, 'distance': float(self._length[start, end])}
+
+
+class PathTableBuilder:
+	"""
+	Keeps a PathTable for the latest snapshots, rebuilt in a worker thread when they change.
+	At most one build runs at a time; changes during a build trigger one more build afterwards.
+	"""
+
+	def __init__(
+		self,
+		snapshots: Callable[[], tuple[Snapshot | None, Snapshot | None]],
+		build: Callable[[Snapshot, Snapshot], Callable[[], PathTable]],
+	):
+		self._snapshots = snapshots
+		self._build = build
+		self._task: asyncio.Task | None = None
+		self._dirty = False
+		self.table: PathTable | None = None
+		self.builds = 0
+		self.build_errors = 0
+		self.build_seconds: float | None = None
+		self.audits = 0
+		self.audit_mismatches = 0
+
+	def schedule(self, previous: Snapshot | None = None, current: Snapshot | None = None) -> None:
+		"""Rebuild the table soon. Has the signature of a snapshot listener."""
+		self._dirty = True
+		if self._task is not None and not self._task.done():
+			return
+		try:
+			loop = asyncio.get_running_loop()
+		except RuntimeError:
+			return
+		self._task = loop.create_task(self._run())
+
+	async def _run(self) -> None:
+		while self._dirty:
+			self._dirty = False
+			rooms, sensors = self._snapshots()
+			if rooms is None or sensors is None:
+				return
+			try:
+				started = time.perf_counter()
+				# The graph is prepared on the event loop, the matrix work runs in a thread
+				self.table = await asyncio.to_thread(self._build(rooms, sensors))
+				self.build_seconds = round(time.perf_counter() - started, 4)
+				self.builds += 1
+			except Exception:
+				self.build_errors += 1
+				logger.exception('Failed to build the path table')
+
+	async def wait(self) -> None:
+		"""Wait for a scheduled build to finish."""
+		if self._task is not None:
+			await self._task
+
+	def clear(self) -> None:
+		self.table = None
+		self._dirty = False
+		self.builds = 0
+		self.build_errors = 0
+		self.build_seconds = None
+		self.audits = 0
+		self.audit_mismatches = 0
+
+	def stats(self) -> dict:
+		table = self.table
+		return {
+			'rooms_version': table.rooms_version if table else None,
+			'sensors_version': table.sensors_version if table else None,
+			'rooms': len(table.room_index) if table else 0,
+			'builds': self.builds,
+			'build_errors': self.build_errors,
+			'build_seconds': self.build_seconds,
+			'audits': self.audits,
+			'audit_mismatches': self.audit_mismatches,
+		}
@@ -1,12 +1,48 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import random
+import secrets
+import httpx
+import numpy as np
 from fastapi import HTTPException
 from app.utils.forwarder import forward_request
-from app.schemas.pathfinding_schema import FrontendPathFindingRequest, FastestPathModel, FrontendMultiPathRequest
-from app.schemas.room_response_schema import RoomListModel
-from app.schemas.sensor_response_schema import SensorListModel
-from app.utils.room_sensor_fetch import fetch_and_validate
+from app.schemas.pathfinding_schema import (
+	DistanceMatrixModel,
+	DistanceMatrixRequest,
+	FastestPathModel,
+	FrontendMultiPathRequest,
+	FrontendPathFindingRequest,
+	RerouteModel,
+	RerouteRequest,
+)
+from app.schemas.room_response_schema import RoomFromPathfindingModel
+from app.utils.room_sensor_fetch import rooms_snapshot, sensors_snapshot, index_by
+from app.utils.snapshot_cache import Snapshot
+from app.utils.path_cache import PathCache, crowd_factors
+from app.utils.path_tokens import PathTokens
+from app.utils.popularity import DecayingTopK
+from app.services.path_prewarmer import PathPrewarmer
+from app.services.path_table import PathTable, PathTableBuilder
+from app.services.topology_session import TopologySession, UNKNOWN_TOPOLOGY, full_body, topology_id
+from app.services.tour_optimizer import is_reachable, optimize_tour
+from app.utils.http_clients import upstream_client
+from app.config import (
+	PATH_CACHE_SETTINGS,
+	PATH_PREWARM_SETTINGS,
+	PATHFINDING_SETTINGS,
+	REROUTE_SETTINGS,
+	TOPOLOGY_SESSION_SETTINGS,
+	TOUR_SETTINGS,
+)
 import os
 from dotenv import load_dotenv
-import requests
+from typing import Any, AsyncIterator, Callable
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -14,57 +50,565 @@ PATHFINDING_PATH = os.getenv('PATHFINDING', 'http://localhost:8001')
 if PATHFINDING_PATH is None:
 	raise RuntimeError('PATHFINDING not found in environment variables')
 
+topology_session = TopologySession(
+	PATHFINDING_PATH,
+	max_versions=TOPOLOGY_SESSION_SETTINGS['max_versions'],
+	retry_after=TOPOLOGY_SESSION_SETTINGS['retry_after'],
+)
+
+
+def route_rooms(path: dict) -> list[str]:
+	"""Ids of the rooms a path goes through. Malformed responses have no rooms."""
+	if not isinstance(path, dict):
+		return []
+	return [
+		room.get('id') for sensor in path.get('fastest_path') or [] for room in sensor.get('rooms') or []
+	]
+
+
+path_cache = PathCache(
+	max_size=PATH_CACHE_SETTINGS['max_size'],
+	epsilon=PATH_CACHE_SETTINGS['epsilon'],
+	route=route_rooms,
+)
+
+path_tokens = PathTokens(
+	REROUTE_SETTINGS['token_secret'].encode() if REROUTE_SETTINGS['token_secret'] else secrets.token_bytes(32)
+)
+
+
+async def pathfinding_body(fields: dict, rooms: Snapshot, sensors: Snapshot) -> dict:
+	"""Build a pathfinding request, referring to a registered topology when topology sessions are enabled."""
+	if TOPOLOGY_SESSION_SETTINGS['enabled']:
+		return await topology_session.body(fields, rooms, sensors)
+	return full_body(fields, rooms, sensors)
+
+
 async def calculate_fastest_path(request: FrontendPathFindingRequest) -> FastestPathModel:
-	room_data = await fetch_and_validate(RoomListModel, 'rooms')
-	sensor_data = await fetch_and_validate(SensorListModel, 'sensors')
+	rooms = await rooms_snapshot.get_snapshot()
+	sensors = await sensors_snapshot.get_snapshot()
+	path = await fastest_path_for(request, rooms, sensors)
+	# Only pairs that have a path are worth pre-warming
+	path_prewarmer.record((request.source, request.target))
+	return path
+
+
+async def fastest_path_for(
+	request: FrontendPathFindingRequest,
+	rooms: Snapshot,
+	sensors: Snapshot,
+	limit: asyncio.Semaphore | None = None,
+) -> FastestPathModel:
+	"""
+	Get the fastest path for a pair of snapshots.
+	Popular source/target pairs are answered from the cache while the crowd stays similar,
+	and `limit` bounds the concurrent computations of a caller (cache hits are not limited).
+	"""
+
+	async def compute() -> FastestPathModel:
+		if limit is None:
+			return await request_fastest_path(request, rooms, sensors)
+		async with limit:
+			return await request_fastest_path(request, rooms, sensors)
+
+	return await path_cache.get((request.source, request.target), rooms, topology_id(rooms, sensors), compute)
+
+
+async def load_path_snapshots() -> tuple[Snapshot, Snapshot]:
+	"""The current room and sensor snapshots, for callers that have to fail before responding."""
+	rooms = await rooms_snapshot.get_snapshot()
+	sensors = await sensors_snapshot.get_snapshot()
+	return rooms, sensors
+
+
+async def fastest_path_batch(
+	requests: list[FrontendPathFindingRequest], rooms: Snapshot, sensors: Snapshot, concurrency: int
+) -> AsyncIterator[str]:
+	"""
+	Compute several paths against one consistent pair of snapshots and yield one NDJSON line per
+	path as soon as it is ready, so a slow path does not hold back the others.
+	Each line carries the index of the request; failed paths carry an error instead of a result.
+	The snapshots are loaded by the caller (see `load_path_snapshots`) before the response starts,
+	so a failing sensor-sim is answered with an error status rather than an empty stream.
+	"""
+	limit = asyncio.Semaphore(concurrency)
+
+	async def compute(index: int, request: FrontendPathFindingRequest) -> dict:
+		line: dict = {'index': index, 'source': request.source, 'target': request.target}
+		try:
+			line['result'] = await fastest_path_for(request, rooms, sensors, limit)
+			path_prewarmer.record((request.source, request.target))
+		except HTTPException as e:
+			line['error'] = {'status_code': e.status_code, 'detail': e.detail}
+		except Exception:
+			logger.exception('Failed to compute path %s -> %s', request.source, request.target)
+			line['error'] = {'status_code': 500, 'detail': 'Failed to compute path'}
+		return line
+
+	tasks = [asyncio.ensure_future(compute(index, request)) for index, request in enumerate(requests)]
+	try:
+		for done in asyncio.as_completed(tasks):
+			yield json.dumps(await done, separators=(',', ':'), default=str) + '\n'
+	finally:
+		# The client went away, stop the remaining computations
+		for task in tasks:
+			task.cancel()
+
+
+async def warm_path(key: tuple[str, str], rooms: Snapshot, sensors: Snapshot) -> bool:
+	"""Compute and cache the path of a source/target pair unless its cached path is still valid."""
+	source, target = key
+	request = FrontendPathFindingRequest(source=source, target=target)
+	return await path_cache.warm(key, rooms, topology_id(rooms, sensors), lambda: request_fastest_path(request, rooms, sensors))
+
 
+path_prewarmer = PathPrewarmer(
+	DecayingTopK(capacity=PATH_PREWARM_SETTINGS['capacity'], half_life=PATH_PREWARM_SETTINGS['half_life']),
+	sensors=lambda: sensors_snapshot.peek(),
+	warm=warm_path,
+	# Warmed paths are only useful while they can be cached
+	pairs=PATH_PREWARM_SETTINGS['pairs'] if PATH_CACHE_SETTINGS['max_size'] > 0 else 0,
+	concurrency=PATH_PREWARM_SETTINGS['concurrency'],
+)
+rooms_snapshot.subscribe(path_prewarmer.schedule)
+
+
+def remaining_path(path: list[dict], position: str, target: str) -> list[dict] | None:
+	"""
+	The part of a path still ahead of a visitor in room `position`: from the door leaving that
+	room to the target. Empty once the target is reached, None when the visitor left the path.
+	"""
+	if position == target:
+		return []
+	for index in range(len(path) - 1, -1, -1):
+		if any(room.get('id') == position for room in path[index].get('rooms') or []):
+			return path[index:]
+	return None
+
+
+def crowd_change(path: list[dict], rooms: Snapshot, sensors: Snapshot) -> float:
+	"""
+	Largest change of the crowd factor of a room on a path since the path was computed, read from
+	the rooms embedded in the path. Infinite when a door or room of the path no longer exists.
+	"""
+	current = crowd_factors(rooms)
+	doors = index_by(sensors, 'sensors', 'id')
+	change = 0.0
+	for sensor in path:
+		if sensor['id'] not in doors:
+			return math.inf
+		for room in sensor.get('rooms') or []:
+			now = current.get(room.get('id'))
+			before = room.get('crowd_factor')
+			if now is None or before is None:
+				return math.inf
+			change = max(change, abs(now - before))
+	return change
+
+
+async def reroute_fastest_path(request: RerouteRequest, token: str | None = None) -> tuple[RerouteModel, str]:
+	"""
+	Check whether a visitor on a previous path should keep following it.
+	While the crowd on the remaining part of the path moved by at most the threshold, the answer is
+	'unchanged' without computing anything; otherwise only the path from the current position to the
+	target is computed. Returns the answer and the token of the path to follow.
+	"""
+	if token is not None:
+		entry = path_tokens.get(token)
+		if entry is None:
+			raise HTTPException(status_code=404, detail='Invalid path token, send the path and target instead.')
+		target, path = entry
+	elif request.path is not None and request.target is not None:
+		target, path = request.target, request.path.model_dump()
+	else:
+		raise HTTPException(status_code=400, detail='Either an X-Path-Token header or a path and a target are required.')
+
+	rooms = await rooms_snapshot.get_snapshot()
+	sensors = await sensors_snapshot.get_snapshot()
+	remaining = remaining_path(path['fastest_path'], request.position, target)
+	if remaining is not None and crowd_change(remaining, rooms, sensors) <= request.threshold:
+		return {'status': 'unchanged'}, token or path_tokens.issue(target, path)
+
+	path = await fastest_path_for(FrontendPathFindingRequest(source=request.position, target=target), rooms, sensors)
+	return {'status': 'rerouted', **path}, path_tokens.issue(target, path)
+
+
+async def request_fastest_path(request: FrontendPathFindingRequest, rooms: Snapshot, sensors: Snapshot) -> FastestPathModel:
+	mode = PATHFINDING_SETTINGS['mode']
+	if mode == 'local':
+		return local_fastest_path(request.source, request.target, rooms, sensors)
+	if mode == 'table':
+		return table_fastest_path(request, rooms, sensors)
+	try:
+		return await remote_fastest_path(request, rooms, sensors)
+	except (HTTPException, httpx.HTTPError) as e:
+		# Only fall back when the pathfinding service is unavailable, not for invalid requests
+		if mode != 'fallback' or (isinstance(e, HTTPException) and e.status_code < 500):
+			raise
+		logger.warning("Pathfinding service unavailable, computing the path with the gateway's cost model: %s", e)
+		return local_fastest_path(request.source, request.target, rooms, sensors)
+
+
+async def remote_fastest_path(request: FrontendPathFindingRequest, rooms: Snapshot, sensors: Snapshot) -> FastestPathModel:
 	# Prepare payload for the pathfinding service.
-	payload = {
+	fields = {
 		'source_room': request.source,
 		'target_room': request.target,
-		'rooms': room_data['rooms'], # type: ignore
-		'sensors': sensor_data['sensors'], # type: ignore
 	}
+	payload = await pathfinding_body(fields, rooms, sensors)
 
 	# Send POST request to the pathfinding service.
 	pathfinding_url = f'{PATHFINDING_PATH}/pathfinding/fastest-path'
 
-	path_response, _ = await forward_request(pathfinding_url, 'POST', body=payload)
+	try:
+		path_response, _ = await forward_request(pathfinding_url, 'POST', body=payload)
+	except HTTPException as e:
+		# The pathfinding service lost the topology (e.g. it restarted), send it in full
+		if e.status_code != UNKNOWN_TOPOLOGY or not topology_session.forget(payload):
+			raise
+		path_response, _ = await forward_request(pathfinding_url, 'POST', body=full_body(fields, rooms, sensors))
 
 	return path_response
 
+
+EARTH_RADIUS = 6_371_000.0
+
+
+def haversine(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+	"""Great-circle distance between two points in meters."""
+	phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+	dphi = phi2 - phi1
+	dlambda = math.radians(longitude2 - longitude1)
+	a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+	return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def doors_by_room(sensors: Snapshot) -> dict[str, list[dict]]:
+	"""The sensors (doors) of every room, computed once per sensors version."""
+
+	def compute(value: dict) -> dict[str, list[dict]]:
+		doors: dict[str, list[dict]] = {}
+		for sensor in value['sensors']:
+			for room_id in sensor['rooms']:
+				doors.setdefault(room_id, []).append(sensor)
+		return doors
+
+	return sensors.memo('doors_by_room', compute)
+
+
+def door_distances(sensors: Snapshot) -> dict[str, list[tuple[str, str, float]]]:
+	"""
+	For every room, each pair of its doors with the walking distance between them.
+	The geometry only changes with the sensors, so this is computed once per sensors version.
+	"""
+	return sensors.memo(
+		'door_distances',
+		lambda _: {
+			room_id: [
+				(a['id'], b['id'], haversine(a['latitude'], a['longitude'], b['latitude'], b['longitude']))
+				for a, b in itertools.combinations(doors, 2)
+			]
+			for room_id, doors in doors_by_room(sensors).items()
+		},
+	)
+
+
+class SensorGraph:
+	"""
+	Graph of sensors (doors) connected through the rooms they share.
+	Walking through a room costs the distance between its two doors times the room's crowd factor,
+	at least `min_crowd`, so distance still counts in empty rooms. Stepping onto a vertical sensor
+	(stairs or elevator) adds `vertical_cost`.
+	"""
+
+	def __init__(self, rooms: Snapshot, sensors: Snapshot, vertical_cost: float, min_crowd: float):
+		self.rooms = index_by(rooms, 'rooms', 'id')
+		self.sensors = index_by(sensors, 'sensors', 'id')
+		self.doors = doors_by_room(sensors)
+		# Sensor id -> (neighbour id, cost, distance in meters)
+		self.adjacency: dict[str, list[tuple[str, float, float]]] = {}
+		self._costs_from: dict[str, dict[str, float]] = {}
+		for room_id, pairs in door_distances(sensors).items():
+			room = self.rooms.get(room_id)
+			if room is None:
+				continue
+			crowd = max(room['crowd_factor'], min_crowd)
+			for a, b, distance in pairs:
+				for start, end in ((a, b), (b, a)):
+					cost = distance * crowd + (vertical_cost if self.sensors[end]['is_vertical'] else 0.0)
+					self.adjacency.setdefault(start, []).append((end, cost, distance))
+
+	def shortest_path(self, source: str, target: str) -> FastestPathModel:
+		"""Find the cheapest sequence of doors from any door of the source room to any door of the target room."""
+		for room_id in (source, target):
+			if room_id not in self.rooms:
+				raise HTTPException(status_code=400, detail=f"Room '{room_id}' is not valid.")
+		if source == target:
+			return {'fastest_path': [], 'distance': 0.0}
+
+		goals = {door['id'] for door in self.doors.get(target, [])}
+		costs: dict[str, float] = {}
+		previous: dict[str, str | None] = {}
+		distances: dict[str, float] = {}
+		# The counter breaks ties between equal costs, so the other fields are never compared
+		order = itertools.count()
+		queue = [(0.0, next(order), door['id'], None, 0.0) for door in self.doors.get(source, [])]
+		while queue:
+			cost, _, sensor_id, parent, distance = heapq.heappop(queue)
+			if sensor_id in costs:
+				continue
+			costs[sensor_id] = cost
+			previous[sensor_id] = parent
+			distances[sensor_id] = distance
+			if sensor_id in goals:
+				return {'fastest_path': self._path(sensor_id, previous), 'distance': distance}
+			for neighbour, edge_cost, edge_distance in self.adjacency.get(sensor_id, []):
+				if neighbour not in costs:
+					heapq.heappush(queue, (cost + edge_cost, next(order), neighbour, sensor_id, distance + edge_distance))
+
+		raise HTTPException(status_code=404, detail=f"No path found from room '{source}' to room '{target}'.")
+
+	def costs_from(self, source: str) -> dict[str, float]:
+		"""
+		Cost of the fastest path from a room to every reachable room.
+		Memoized, and the graph itself is built once per snapshot pair, so tours share their legs.
+		"""
+		if source in self._costs_from:
+			return self._costs_from[source]
+		door_costs: dict[str, float] = {}
+		queue = [(0.0, door['id']) for door in self.doors.get(source, [])]
+		heapq.heapify(queue)
+		while queue:
+			cost, sensor_id = heapq.heappop(queue)
+			if sensor_id in door_costs:
+				continue
+			door_costs[sensor_id] = cost
+			for neighbour, edge_cost, _ in self.adjacency.get(sensor_id, []):
+				if neighbour not in door_costs:
+					heapq.heappush(queue, (cost + edge_cost, neighbour))
+
+		room_costs = {
+			room_id: min(door_costs[door['id']] for door in doors if door['id'] in door_costs)
+			for room_id, doors in self.doors.items()
+			if any(door['id'] in door_costs for door in doors)
+		}
+		room_costs[source] = 0.0
+		self._costs_from[source] = room_costs
+		return room_costs
+
+	def _path(self, sensor_id: str | None, previous: dict[str, str | None]) -> list[dict]:
+		path = []
+		while sensor_id is not None:
+			path.append(self.sensor_with_rooms(self.sensors[sensor_id]))
+			sensor_id = previous[sensor_id]
+		path.reverse()
+		return path
+
+	def sensor_with_rooms(self, sensor: dict) -> dict:
+		return {
+			'id': sensor['id'],
+			'rooms': [
+				{field: self.rooms[room_id][field] for field in RoomFromPathfindingModel.model_fields}
+				for room_id in sensor['rooms']
+				if room_id in self.rooms
+			],
+			'latitude': sensor['latitude'],
+			'longitude': sensor['longitude'],
+			'is_vertical': sensor['is_vertical'],
+		}
+
+
+def sensor_graph(rooms: Snapshot, sensors: Snapshot) -> SensorGraph:
+	"""The sensor graph of a pair of snapshots, built once per pair of versions."""
+	return rooms.memo(
+		f'sensor_graph:{sensors.version}',
+		lambda _: SensorGraph(rooms, sensors, PATHFINDING_SETTINGS['vertical_cost'], PATHFINDING_SETTINGS['min_crowd_factor']),
+	)
+
+
+def local_fastest_path(source: str, target: str, rooms: Snapshot, sensors: Snapshot) -> FastestPathModel:
+	"""Compute the fastest path in the gateway instead of asking the pathfinding service."""
+	return sensor_graph(rooms, sensors).shortest_path(source, target)
+
+
+def build_path_table(rooms: Snapshot, sensors: Snapshot) -> Callable[[], PathTable]:
+	graph = sensor_graph(rooms, sensors)
+	topology = topology_id(rooms, sensors)
+	return lambda: PathTable(graph, topology, rooms.version, sensors.version)
+
+
+path_table = PathTableBuilder(lambda: (rooms_snapshot.peek(), sensors_snapshot.peek()), build_path_table)
+
+if PATHFINDING_SETTINGS['mode'] == 'table':
+	rooms_snapshot.subscribe(path_table.schedule)
+	sensors_snapshot.subscribe(path_table.schedule)
+
+# Running audits, referenced until they finish
+_audits: set[asyncio.Task] = set()
+
+
+def table_fastest_path(request: FrontendPathFindingRequest, rooms: Snapshot, sensors: Snapshot) -> FastestPathModel:
+	"""
+	Answer from the precomputed path table. The table may lag the newest crowd snapshot by one
+	rebuild, so it is used as long as the topology matches; otherwise the path is computed locally.
+	"""
+	table = path_table.table
+	if table is None or table.topology != topology_id(rooms, sensors):
+		path_table.schedule()
+		return local_fastest_path(request.source, request.target, rooms, sensors)
+	result = table.fastest_path(request.source, request.target)
+	if result is None:
+		# Unknown or isolated room, the local engine raises the matching error
+		return local_fastest_path(request.source, request.target, rooms, sensors)
+	if random.random() < PATHFINDING_SETTINGS['table_audit_rate']:
+		audit = asyncio.get_running_loop().create_task(audit_table_path(request, result, rooms, sensors))
+		_audits.add(audit)
+		audit.add_done_callback(_audits.discard)
+	return result
+
+
+async def calculate_distance_matrix(request: DistanceMatrixRequest) -> DistanceMatrixModel:
+	"""
+	Crowd-weighted travel cost between every source and target room, without building paths.
+	Sliced from the path table when it is current, otherwise computed with one Dijkstra per
+	distinct source over the cached sensor graph (memoized per snapshot).
+	"""
+	rooms = await rooms_snapshot.get_snapshot()
+	sensors = await sensors_snapshot.get_snapshot()
+	graph = sensor_graph(rooms, sensors)
+	unknown = [room_id for room_id in dict.fromkeys([*request.sources, *request.targets]) if room_id not in graph.rooms]
+	if unknown:
+		raise HTTPException(status_code=400, detail=f"Unknown rooms: {', '.join(unknown)}.")
+
+	table = path_table.table
+	if (
+		table is not None
+		and table.rooms_version == rooms.version
+		and table.sensors_version == sensors.version
+		and all(room_id in table.room_index for room_id in itertools.chain(request.sources, request.targets))
+	):
+		rows = [table.room_index[room_id] for room_id in request.sources]
+		columns = [table.room_index[room_id] for room_id in request.targets]
+		matrix = table.room_costs()[np.ix_(rows, columns)]
+	else:
+		matrix = np.array(
+			[[graph.costs_from(source).get(target, np.inf) for target in request.targets] for source in request.sources]
+		)
+
+	costs = np.round(matrix, 3).tolist()
+	return {
+		'sources': request.sources,
+		'targets': request.targets,
+		'costs': [[cost if math.isfinite(cost) else None for cost in row] for row in costs],
+	}
+
+
+async def audit_table_path(
+	request: FrontendPathFindingRequest, result: FastestPathModel, rooms: Snapshot, sensors: Snapshot
+) -> None:
+	"""Compare a table answer with the pathfinding service, which stays the authority."""
+	try:
+		expected = await remote_fastest_path(request, rooms, sensors)
+	except Exception:
+		logger.warning('Could not audit path table answer for %s -> %s', request.source, request.target)
+		return
+	path_table.audits += 1
+	if route_rooms(expected) != route_rooms(result):
+		path_table.audit_mismatches += 1
+		logger.warning('Path table disagrees with the pathfinding service for %s -> %s', request.source, request.target)
+
+
+def multipoint_error(status_code: int, error: Any, payload: dict) -> HTTPException:
+	return HTTPException(
+		status_code=status_code,
+		detail={
+			'error': error,
+			'body': payload if len(payload.__str__()) < 1000 else 'Body too large to display',
+			'method': 'POST',
+			'url': f'{PATHFINDING_PATH}/pathfinding/fastest-multipoint-path',
+		},
+	)
+
+
+async def post_to_pathfinding(url: str, payload: dict) -> httpx.Response:
+	"""
+	POST a tour to the pathfinding service on the shared async client, without blocking the event loop.
+	Long tours get their own timeout; a timeout is answered with 504 and other connection errors with 502.
+	"""
+	try:
+		async with upstream_client(url) as client:
+			return await client.post(url, json=payload, timeout=TOUR_SETTINGS['timeout'])
+	except httpx.TimeoutException as e:
+		raise multipoint_error(504, f"Pathfinding service did not answer within {TOUR_SETTINGS['timeout']:g} seconds", payload) from e
+	except httpx.TransportError as e:
+		raise multipoint_error(502, f'Pathfinding service unavailable: {e}', payload) from e
+
+
 async def calculate_fastest_multipoint_path(request: FrontendMultiPathRequest) -> FastestPathModel:
-	room_data = await fetch_and_validate(RoomListModel, 'rooms')
-	sensor_data = await fetch_and_validate(SensorListModel, 'sensors')
+	room_snapshot = await rooms_snapshot.get_snapshot()
+	sensor_snapshot = await sensors_snapshot.get_snapshot()
  
-	targets = [room['id'] for room in room_data['rooms'] if room['name'] in request.targets] # type: ignore
+	rooms_by_name = index_by(room_snapshot, 'rooms', 'name')
+	targets = list(dict.fromkeys(
+		rooms_by_name[name]['id'] for name in request.targets if name in rooms_by_name
+	))
 	if not targets:
 		raise HTTPException(
 			status_code=400,
 			detail='No valid target rooms found in the request.',
 		)
+
+	if TOUR_SETTINGS['optimizer']:
+		return await optimized_tour(request.source, targets, room_snapshot, sensor_snapshot)
   
-	payload = {
+	fields = {
 		'source_room': request.source,
 		'target_rooms': targets,
-		'rooms': room_data['rooms'], # type: ignore
-		'sensors': sensor_data['sensors'], # type: ignore
 	}
+	payload = await pathfinding_body(fields, room_snapshot, sensor_snapshot)
+	url = f'{PATHFINDING_PATH}/pathfinding/multiple-points'
  
-	res = requests.post(
-		f'{PATHFINDING_PATH}/pathfinding/multiple-points',
-		json=payload,
-	)
+	res = await post_to_pathfinding(url, payload)
+	if res.status_code == UNKNOWN_TOPOLOGY and topology_session.forget(payload):
+		payload = full_body(fields, room_snapshot, sensor_snapshot)
+		res = await post_to_pathfinding(url, payload)
 	
 	if res.status_code != 200:
-		raise HTTPException(
-			status_code=res.status_code,
-			detail={
-				'error': res.json(),
-				'body': payload if len(payload.__str__()) < 1000 else 'Body too large to display',
-				'method': 'POST',
-				'url': f'{PATHFINDING_PATH}/pathfinding/fastest-multipoint-path',
-			},
-		)
+		raise multipoint_error(res.status_code, res.json(), payload)
   
-	return res.json()
\ No newline at end of file
+	return res.json()
+
+
+async def optimized_tour(source: str, targets: list[str], rooms: Snapshot, sensors: Snapshot) -> FastestPathModel:
+	"""
+	Order the targets in the gateway and join the fastest path of each leg.
+	Leg costs come from the sensor graph, memoized per snapshot, and only the legs of the chosen
+	order are requested (through the path cache, so repeated legs are shared between tours).
+	The legs use the same snapshots as the ordering, at most `TOUR_SETTINGS['concurrency']` at a
+	time, and are not counted as popular pairs since no visitor asked for them.
+	"""
+	graph = sensor_graph(rooms, sensors)
+	stops = [source, *targets]
+	for room_id in stops:
+		if room_id not in graph.rooms:
+			raise HTTPException(status_code=400, detail=f"Room '{room_id}' in the tour is not valid.")
+
+	costs = [[graph.costs_from(a).get(b, math.inf) for b in stops] for a in stops]
+	order = optimize_tour(costs, TOUR_SETTINGS['exact_limit'])
+	if not is_reachable(costs, order):
+		raise HTTPException(status_code=404, detail='No tour found that visits every target room.')
+
+	tour = [source, *(stops[index] for index in order)]
+	limit = asyncio.Semaphore(TOUR_SETTINGS['concurrency'])
+	legs = await asyncio.gather(*(
+		fastest_path_for(FrontendPathFindingRequest(source=a, target=b), rooms, sensors, limit)
+		for a, b in itertools.pairwise(tour)
+	))
+
+	path: list[dict] = []
+	for leg in legs:
+		for sensor in leg['fastest_path']:
+			# Consecutive legs can meet at the same door
+			if not path or path[-1]['id'] != sensor['id']:
+				path.append(sensor)
+	return {'fastest_path': path, 'distance': sum(leg['distance'] for leg in legs)}
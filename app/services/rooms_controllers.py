@@ -1,7 +1,18 @@
 import os
 from dotenv import load_dotenv
 from app.utils.forwarder import forward_request
-from app.schemas.room_response_schema import RoomModel, RoomListModel
+from app.utils.room_sensor_fetch import SensorSimError, rooms_snapshot, index_by, batch_lookup
+from app.utils.snapshot_cache import Snapshot
+from app.utils.room_geometry import geometry, occupancy
+from app.utils.room_changes import room_changes
+from app.schemas.room_response_schema import (
+	RoomModel,
+	RoomListModel,
+	RoomGeometryListModel,
+	RoomOccupancyListModel,
+	RoomBatchResponse,
+	RoomChangesModel,
+)
 from fastapi import HTTPException
 
 load_dotenv()
@@ -15,18 +26,43 @@ if PATHFINDING_PATH is None:
 
 
 async def get_all_rooms() -> RoomListModel:
-	res, status = await forward_request(SENSOR_SIM_PATH + '/rooms', 'GET')
+	"""Get all rooms, served from the snapshot cache refreshed in the background."""
+	return (await get_rooms_snapshot()).value
+
+
+async def get_rooms_snapshot() -> Snapshot:
+	"""Get the current versioned rooms snapshot. Errors of sensor-sim are passed on with their status."""
 	try:
-		RoomListModel.model_validate(res, strict=True)
-		return res
-	except Exception:
-		raise HTTPException(
-			status_code=status,
-			detail=res.get('detail', 'Invalid room data received from sensor simulation service'),
-		)
+		return await rooms_snapshot.get_snapshot()
+	except SensorSimError as e:
+		raise e.passthrough() from e
+
+
+def room_geometry_payload(rooms: RoomListModel) -> RoomGeometryListModel:
+	return {'rooms': [geometry(room) for room in rooms['rooms']]}
+
+
+def room_occupancy_payload(rooms: RoomListModel) -> RoomOccupancyListModel:
+	return {'rooms': [occupancy(room) for room in rooms['rooms']]}
+
+
+async def get_room_changes(since: str | None) -> RoomChangesModel:
+	"""
+	Get the occupancy of the rooms that changed after the version `since` returned by a previous call.
+	If the version is too old or unknown, `resync` is set and every room is returned.
+	"""
+	snapshot = await get_rooms_snapshot()
+	return room_changes.since(since, snapshot)
 
 
 async def get_room_by_id(room_id: str) -> RoomModel:
+	"""Get a room from the in-memory snapshot index, asking sensor-sim only on a miss."""
+	snapshot = rooms_snapshot.peek()
+	if snapshot is not None:
+		room = index_by(snapshot, 'rooms', 'id').get(room_id)
+		if room is not None:
+			return room
+
 	res, status = await forward_request(SENSOR_SIM_PATH + f'/rooms/{room_id}', 'GET')
 
 	try:
@@ -37,3 +73,13 @@ async def get_room_by_id(room_id: str) -> RoomModel:
 			status_code=status,
 			detail=res.get('detail', 'Invalid room data received from sensor simulation service'),
 		)
+
+
+async def get_rooms_by_ids(ids: list[str], fields: list[str] | None = None) -> RoomBatchResponse:
+	"""
+	Get several rooms at once from the snapshot.
+	At most one upstream call is made, to load the snapshot if it is not cached.
+	"""
+	snapshot = await get_rooms_snapshot()
+	rooms, missing = batch_lookup(snapshot, 'rooms', ids, fields)
+	return {'rooms': rooms, 'missing': missing}
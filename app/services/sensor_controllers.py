@@ -1,7 +1,9 @@
 import os
 from dotenv import load_dotenv
 from app.utils.forwarder import forward_request
-from app.schemas.sensor_response_schema import SensorModel, SensorListModel
+from app.utils.room_sensor_fetch import SensorSimError, sensors_snapshot, index_by, batch_lookup
+from app.utils.snapshot_cache import Snapshot
+from app.schemas.sensor_response_schema import SensorModel, SensorListModel, SensorBatchResponse
 from fastapi import HTTPException
 
 load_dotenv()
@@ -15,18 +17,26 @@ if PATHFINDING_PATH is None:
 
 
 async def get_all_sensors() -> SensorListModel:
-	res, status = await forward_request(SENSOR_SIM_PATH + '/sensors', 'GET')
+	"""Get all sensors, served from the snapshot cache refreshed in the background."""
+	return (await get_sensors_snapshot()).value
+
+
+async def get_sensors_snapshot() -> Snapshot:
+	"""Get the current versioned sensors snapshot. Errors of sensor-sim are passed on with their status."""
 	try:
-		SensorListModel.model_validate(res, strict=True)
-		return res
-	except Exception:
-		raise HTTPException(
-			status_code=status,
-			detail=res.get('detail', 'Invalid room data received from sensor simulation service'),
-		)
+		return await sensors_snapshot.get_snapshot()
+	except SensorSimError as e:
+		raise e.passthrough() from e
 
 
 async def get_sensor_by_id(sensor_id: str) -> SensorModel:
+	"""Get a sensor from the in-memory snapshot index, asking sensor-sim only on a miss."""
+	snapshot = sensors_snapshot.peek()
+	if snapshot is not None:
+		sensor = index_by(snapshot, 'sensors', 'id').get(sensor_id)
+		if sensor is not None:
+			return sensor
+
 	res, status = await forward_request(SENSOR_SIM_PATH + f'/sensors/{sensor_id}', 'GET')
 
 	try:
@@ -37,3 +47,13 @@ async def get_sensor_by_id(sensor_id: str) -> SensorModel:
 			status_code=status,
 			detail=res.get('detail', 'Invalid room data received from sensor simulation service'),
 		)
+
+
+async def get_sensors_by_ids(ids: list[str], fields: list[str] | None = None) -> SensorBatchResponse:
+	"""
+	Get several sensors at once from the snapshot.
+	At most one upstream call is made, to load the snapshot if it is not cached.
+	"""
+	snapshot = await get_sensors_snapshot()
+	sensors, missing = batch_lookup(snapshot, 'sensors', ids, fields)
+	return {'sensors': sensors, 'missing': missing}
@@ -1,9 +1,11 @@
-import httpx
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
 from app.utils.forwarder import forward_request
+from app.utils.http_clients import upstream_client
+from app.services.artwork_mirror import artwork_mirror
+from app.utils.artwork_harvester import SMK_SEARCH_URL
 import math
 from app.schemas.smk_api_schemas import FilterParams, ArtworkResponse
 
@@ -33,8 +35,8 @@ async def search_artwork(keys: str):
 	}
 
 	try:
-		async with httpx.AsyncClient(timeout=10.0) as client:
-			response = await client.get('https://api.smk.dk/api/v1/art/search', params=params)
+		async with upstream_client('https://api.smk.dk') as client:
+			response = await client.get('https://api.smk.dk/api/v1/art/search', params=params, timeout=10.0)
 			response.raise_for_status()
 			data = response.json()
 			filtered_data = data.get('autocomplete')
@@ -56,18 +58,15 @@ async def query_artwork(query_obj: FilterParams=Depends()) -> ArtworkResponse:
 		if not status == 200 or not room:
 			raise HTTPException(status_code=status, detail=room['detail'])
 
- 
-	artworks, _ = await forward_request(
-		'https://api.smk.dk/api/v1/art/search',
-		'GET',
-		params={
-			'keys': query.get('keys') if query.get('keys') else '*',
-			'filters': f'[current_location_name:{room.get("name", "")}]' if room else "[on_display:true]",
-			'rows': min(query.get('limit', math.inf), 2000) if query.get('limit') else None,
-			'offset': query.get('offset', None) if query.get('offset') else None,
-			'qfields': 'titles,creator,tags',
-		}
+
+	artworks = await artwork_mirror.search(
+		keys=query.get('keys'),
+		location=room.get('name', '') if room else None,
+		rows=query.get('limit'),
+		offset=query.get('offset'),
 	)
+	if artworks is None:
+		artworks = await query_live_artwork(query, room)
  
 	filtered = list(filter(lambda x: x.get('part_of') is None, artworks['items']))
  
@@ -79,4 +78,20 @@ async def query_artwork(query_obj: FilterParams=Depends()) -> ArtworkResponse:
 		rows=artworks['rows'],
 	)
  
-	return res
\ No newline at end of file
+	return res
+
+
+async def query_live_artwork(query: dict, room: dict | None) -> dict:
+	"""Search the SMK API itself, when the local mirror is not available."""
+	artworks, _ = await forward_request(
+		SMK_SEARCH_URL,
+		'GET',
+		params={
+			'keys': query.get('keys') if query.get('keys') else '*',
+			'filters': f'[current_location_name:{room.get("name", "")}]' if room else "[on_display:true]",
+			'rows': min(query.get('limit', math.inf), 2000) if query.get('limit') else None,
+			'offset': query.get('offset', None) if query.get('offset') else None,
+			'qfields': 'titles,creator,tags',
+		}
+	)
+	return artworks
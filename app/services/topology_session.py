@@ -0,0 +1,133 @@
+import hashlib
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+from app.utils.forwarder import forward_request
+from app.utils.room_geometry import geometry, occupancy
+from app.utils.single_flight import SingleFlight
+from app.utils.snapshot_cache import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# Status the pathfinding service answers with when a request refers to a topology id it does not know.
+UNKNOWN_TOPOLOGY = 409
+
+
+def topology_id(rooms: Snapshot, sensors: Snapshot) -> str:
+	"""
+	Content hash of the static topology: the room geometry and the sensors.
+	Computed once per pair of snapshot versions.
+	"""
+
+	def compute(value: dict) -> str:
+		topology = {
+			'rooms': [geometry(room) for room in value['rooms']],
+			'sensors': sensors.value['sensors'],
+		}
+		content = json.dumps(topology, sort_keys=True, separators=(',', ':')).encode()
+		return hashlib.sha256(content).hexdigest()[:32]
+
+	return rooms.memo(f'topology_id:{sensors.version}', compute)
+
+
+def full_body(fields: dict, rooms: Snapshot, sensors: Snapshot) -> dict:
+	"""A pathfinding request carrying the whole topology."""
+	return {**fields, 'rooms': rooms.value['rooms'], 'sensors': sensors.value['sensors']}
+
+
+class TopologySession:
+	"""
+	Registers the static topology with the pathfinding service once per content hash.
+	Path requests then only carry the topology id and the weights of the rooms whose occupancy
+	changed since the registration, instead of every room with its borders and every sensor.
+	"""
+
+	def __init__(self, base_url: str, max_versions: int, retry_after: float):
+		self.base_url = base_url
+		self.max_versions = max_versions
+		self.retry_after = retry_after
+		# Topology id -> (registration number, occupancy of each room when it was registered)
+		self._registered: OrderedDict[str, tuple[int, dict[str, dict]]] = OrderedDict()
+		self._flight = SingleFlight()
+		# Never reset, so weights memoized on a snapshot are never reused for a newer registration
+		self._numbers = itertools.count(1)
+		self._refused_until = 0.0
+		self.registrations = 0
+		self.compact_requests = 0
+		self.fallbacks = 0
+
+	async def body(self, fields: dict, rooms: Snapshot, sensors: Snapshot) -> dict:
+		"""Get the request body for the pathfinding service, compact when the topology is registered."""
+		compact = await self._compact_fields(rooms, sensors)
+		if compact is None:
+			self.fallbacks += 1
+			return full_body(fields, rooms, sensors)
+		self.compact_requests += 1
+		return {**fields, **compact}
+
+	async def _compact_fields(self, rooms: Snapshot, sensors: Snapshot) -> dict | None:
+		if time.monotonic() < self._refused_until:
+			return None
+		key = topology_id(rooms, sensors)
+		registration = self._registered.get(key)
+		if registration is None:
+			registration = await self._flight.do(key, lambda: self._register(key, rooms, sensors))
+			if registration is None:
+				return None
+		else:
+			self._registered.move_to_end(key)
+		number, baseline = registration
+		weights = rooms.memo(
+			f'topology_weights:{key}:{number}',
+			lambda value: [weight for weight in map(occupancy, value['rooms']) if weight != baseline.get(weight['id'])],
+		)
+		return {'topology_id': key, 'weights': weights}
+
+	async def _register(self, key: str, rooms: Snapshot, sensors: Snapshot) -> tuple[int, dict[str, dict]] | None:
+		try:
+			await forward_request(
+				f'{self.base_url}/pathfinding/topology',
+				'POST',
+				body=full_body({'topology_id': key}, rooms, sensors),
+			)
+		except Exception:
+			logger.warning(
+				'Pathfinding service refused topology %s, sending full payloads for %s seconds', key, self.retry_after
+			)
+			self._refused_until = time.monotonic() + self.retry_after
+			return None
+		self.registrations += 1
+		registration = (next(self._numbers), {room['id']: occupancy(room) for room in rooms.value['rooms']})
+		self._registered[key] = registration
+		while len(self._registered) > self.max_versions:
+			self._registered.popitem(last=False)
+		return registration
+
+	def forget(self, body: dict) -> bool:
+		"""
+		Forget the topology a compact request body referred to, e.g. after the pathfinding service restarted.
+		Returns False for full request bodies, which cannot be retried.
+		"""
+		key = body.get('topology_id')
+		if key is None:
+			return False
+		self._registered.pop(key, None)
+		return True
+
+	def clear(self) -> None:
+		self._registered.clear()
+		self._refused_until = 0.0
+		self.registrations = 0
+		self.compact_requests = 0
+		self.fallbacks = 0
+
+	def stats(self) -> dict[str, Any]:
+		return {
+			'registered': list(self._registered),
+			'registrations': self.registrations,
+			'compact_requests': self.compact_requests,
+			'fallbacks': self.fallbacks,
+		}
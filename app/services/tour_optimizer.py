@@ -0,0 +1,124 @@
+import itertools
+import math
+
+# Minimum improvement for a move to count, so rounding errors cannot make the search cycle.
+EPSILON = 1e-9
+
+
+def tour_cost(costs: list[list[float]], order: list[int]) -> float:
+	"""Cost of an open tour starting at node 0 and visiting `order` in sequence."""
+	return sum(costs[a][b] for a, b in itertools.pairwise([0, *order]))
+
+
+def held_karp(costs: list[list[float]]) -> list[int]:
+	"""
+	Exact cheapest open tour from node 0 through every other node, in O(2^n * n^2).
+	Costs may be asymmetric. Returns the visiting order of nodes 1..n-1.
+	"""
+	nodes = range(1, len(costs))
+	if not nodes:
+		return []
+	# (visited set as a bit mask, last node) -> (cost, previous node)
+	best: dict[tuple[int, int], tuple[float, int]] = {(1 << j, j): (costs[0][j], 0) for j in nodes}
+	for size in range(2, len(costs)):
+		for subset in itertools.combinations(nodes, size):
+			mask = sum(1 << j for j in subset)
+			for last in subset:
+				previous_mask = mask & ~(1 << last)
+				best[(mask, last)] = min(
+					(best[(previous_mask, k)][0] + costs[k][last], k) for k in subset if k != last
+				)
+
+	mask = sum(1 << j for j in nodes)
+	_, last = min((best[(mask, j)][0], j) for j in nodes)
+	order = []
+	while last != 0:
+		order.append(last)
+		previous = best[(mask, last)][1]
+		mask &= ~(1 << last)
+		last = previous
+	order.reverse()
+	return order
+
+
+def nearest_neighbour(costs: list[list[float]]) -> list[int]:
+	"""Greedy tour from node 0, always moving to the cheapest unvisited node."""
+	unvisited = set(range(1, len(costs)))
+	order = []
+	current = 0
+	while unvisited:
+		current = min(unvisited, key=lambda node: (costs[current][node], node))
+		unvisited.remove(current)
+		order.append(current)
+	return order
+
+
+def improve(costs: list[list[float]], order: list[int]) -> list[int]:
+	"""
+	Improve a tour with 2-opt (reversing a segment) and Or-opt (moving a segment of up to three
+	nodes elsewhere) until neither finds a cheaper tour. Costs may be asymmetric, so reversed
+	segments are priced with prefix sums of the backward costs. Every move is priced in O(1).
+	"""
+	tour = [0, *order]
+	while True:
+		candidate = _two_opt(costs, tour) or _or_opt(costs, tour)
+		if candidate is None:
+			return tour[1:]
+		tour = candidate
+
+
+def _two_opt(costs: list[list[float]], tour: list[int]) -> list[int] | None:
+	last = len(tour) - 1
+	forward = [0.0]
+	backward = [0.0]
+	for a, b in itertools.pairwise(tour):
+		forward.append(forward[-1] + costs[a][b])
+		backward.append(backward[-1] + costs[b][a])
+	for i in range(1, last):
+		for j in range(i + 1, last + 1):
+			before = costs[tour[i - 1]][tour[i]] + forward[j] - forward[i]
+			after = costs[tour[i - 1]][tour[j]] + backward[j] - backward[i]
+			if j < last:
+				before += costs[tour[j]][tour[j + 1]]
+				after += costs[tour[i]][tour[j + 1]]
+			if after < before - EPSILON:
+				return tour[:i] + tour[i : j + 1][::-1] + tour[j + 1 :]
+	return None
+
+
+def _or_opt(costs: list[list[float]], tour: list[int]) -> list[int] | None:
+	last = len(tour) - 1
+	for length in (1, 2, 3):
+		for i in range(1, last - length + 2):
+			k = i + length - 1
+			first, end = tour[i], tour[k]
+			previous = tour[i - 1]
+			following = tour[k + 1] if k < last else None
+			removed = costs[previous][first]
+			if following is not None:
+				removed += costs[end][following] - costs[previous][following]
+			for p in itertools.chain(range(i - 1), range(k + 1, last + 1)):
+				a = tour[p]
+				b = tour[p + 1] if p < last else None
+				inserted = costs[a][first]
+				if b is not None:
+					inserted += costs[end][b] - costs[a][b]
+				if inserted < removed - EPSILON:
+					rest = tour[:i] + tour[k + 1 :]
+					position = p + 1 if p < i else p - length + 1
+					return rest[:position] + tour[i : k + 1] + rest[position:]
+	return None
+
+
+def optimize_tour(costs: list[list[float]], exact_limit: int) -> list[int]:
+	"""
+	Find a cheap visiting order for nodes 1..n-1 starting at node 0.
+	Exact for up to `exact_limit` targets, heuristic (nearest neighbour, 2-opt and Or-opt) beyond.
+	"""
+	if len(costs) - 1 <= exact_limit:
+		return held_karp(costs)
+	return improve(costs, nearest_neighbour(costs))
+
+
+def is_reachable(costs: list[list[float]], order: list[int]) -> bool:
+	return math.isfinite(tour_cost(costs, order))
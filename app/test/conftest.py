@@ -0,0 +1,60 @@
+import json
+import time
+import pytest
+from pathlib import Path
+from app.utils.room_sensor_fetch import snapshots
+from app.utils.room_geometry import room_geometry
+from app.utils.room_changes import room_changes
+from app.services.artwork_mirror import artwork_mirror
+from app.services import filter_service, pathfinding_service
+from app.services.filter_service import filters_snapshot, room_cache
+from app.services.pathfinding_service import path_cache, path_prewarmer, path_table, path_tokens
+from app.utils.snapshot_cache import Snapshot
+
+PATHFINDING_FIXTURE = Path(__file__).parent / 'fixtures' / 'pathfinding' / 'crowded_and_quiet_hall.json'
+
+
+@pytest.fixture(autouse=True)
+def clear_snapshots():
+	"""Start every test without cached snapshots, room geometry, change log, paths, path tokens, popularity, artwork mirror or filters."""
+	for snapshot in snapshots.values():
+		snapshot.clear()
+	room_geometry.clear()
+	room_changes.clear()
+	path_cache.clear()
+	path_table.clear()
+	path_tokens.clear()
+	path_prewarmer.clear()
+	artwork_mirror.clear()
+	room_cache.clear()
+	filters_snapshot.clear()
+	yield
+	for snapshot in snapshots.values():
+		snapshot.clear()
+	room_geometry.clear()
+	room_changes.clear()
+	path_cache.clear()
+	path_table.clear()
+	path_tokens.clear()
+	path_prewarmer.clear()
+	artwork_mirror.clear()
+	room_cache.clear()
+	filters_snapshot.clear()
+
+
+@pytest.fixture(autouse=True)
+def filter_catalog_path(monkeypatch, tmp_path):
+	"""Keep the filter catalog persisted by tests out of the working directory."""
+	path = tmp_path / 'filters.json'
+	monkeypatch.setitem(filter_service.FILTER_SETTINGS, 'catalog_path', str(path))
+	return path
+
+
+@pytest.fixture
+def topology(monkeypatch):
+	"""The hand-built pathfinding fixture with its rooms and sensors snapshots, using its vertical cost."""
+	fixture = json.loads(PATHFINDING_FIXTURE.read_text())
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'vertical_cost', fixture['vertical_cost'])
+	rooms = Snapshot({'rooms': fixture['rooms']}, 1, time.monotonic())
+	sensors = Snapshot({'sensors': fixture['sensors']}, 1, time.monotonic())
+	return fixture, rooms, sensors
@@ -0,0 +1,52 @@
+import json
+import os
+import time
+import pytest
+import requests
+
+BASE_URL = 'http://gateway:8000'
+PATHFINDING_URL = 'http://pathfinding:8001'
+
+# Directory to write the recording to, app/test/fixtures/pathfinding/recorded in the repository
+RECORD_DIR = os.getenv('RECORD_PATHFINDING_FIXTURES')
+# Number of source/target pairs to record
+PAIRS = int(os.getenv('RECORD_PATHFINDING_PAIRS', '25'))
+
+
+@pytest.mark.skipif(not RECORD_DIR, reason='Set RECORD_PATHFINDING_FIXTURES to record pathfinding responses')
+def test_record_pathfinding_responses():
+	"""
+	Record answers of the pathfinding service for the current topology, in the fixture format the
+	gateway's parity test (app/test/services/test_local_pathfinding.py) replays against its own engine.
+	"""
+	rooms = requests.get(BASE_URL + '/rooms').json()['rooms']
+	sensors = requests.get(BASE_URL + '/sensors').json()['sensors']
+	assert len(rooms) > 1
+
+	# Pairs spread over the room list, in both directions
+	step = max(len(rooms) * (len(rooms) - 1) // PAIRS, 1)
+	pairs = [(source, target) for source in rooms for target in rooms if source['id'] != target['id']][::step][:PAIRS]
+
+	recorded = []
+	for source, target in pairs:
+		body = {'source_room': source['id'], 'target_room': target['id'], 'rooms': rooms, 'sensors': sensors}
+		response = requests.post(PATHFINDING_URL + '/pathfinding/fastest-path', json=body)
+		if response.status_code != 200:
+			continue
+		data = response.json()
+		recorded.append({
+			'source': source['id'],
+			'target': target['id'],
+			'response': {'fastest_path': [sensor['id'] for sensor in data['fastest_path']], 'distance': data['distance']},
+		})
+	assert recorded
+
+	os.makedirs(RECORD_DIR, exist_ok=True)
+	path = os.path.join(RECORD_DIR, f'e2e_{time.strftime("%Y%m%d_%H%M%S")}.json')
+	with open(path, 'w', encoding='utf-8') as file:
+		json.dump({
+			'description': 'Responses recorded from the pathfinding service of the e2e stack.',
+			'rooms': rooms,
+			'sensors': sensors,
+			'requests': recorded,
+		}, file, indent='\t')
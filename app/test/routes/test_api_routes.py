@@ -15,6 +15,13 @@ def test_health_check():
 	response = client.get('/health')
 	assert response.status_code == 200
 	assert response.json() == {'status': 'ok'}
+
+
+def test_cache_stats():
+	response = client.get('/health/cache')
+	assert response.status_code == 200
+	assert set(response.json()) == {'rooms', 'sensors', 'fastest_path', 'path_table', 'prewarm', 'artworks', 'filters', 'filter_rooms', 'events'}
+	assert response.json()['rooms']['version'] is None
  
  
 def test_search_artwork_valid():
@@ -22,16 +22,22 @@ def test_get_filters_route_success():
 		},
 	]
 
-	with patch('app.routes.filter_routes.fetch_filters', return_value=mock_filters):
+	with patch('app.services.filter_service.get_filters', return_value=mock_filters) as get_filters_mock:
 		response = client.get('/filters')
 		assert response.status_code == status.HTTP_200_OK
 		assert isinstance(response.json(), list)
 		assert response.json()[0]['type'] == 'creator'
 
+		etag = response.headers['etag']
+		response = client.get('/filters', headers={'If-None-Match': etag})
+		assert response.status_code == status.HTTP_304_NOT_MODIFIED
+	# Served from the cached catalog after the first request
+	get_filters_mock.assert_called_once()
+
 
 def test_get_filters_route_error():
 	with patch(
-		'app.routes.filter_routes.fetch_filters', side_effect=HTTPException(status_code=500, detail='Internal Server Error')
+		'app.services.filter_service.get_filters', side_effect=HTTPException(status_code=500, detail='Internal Server Error')
 	):
 		response = client.get('/filters')
 		assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+import httpx
 import importlib
 import pytest
+from contextlib import asynccontextmanager
 
 # Import the router from the new structure.
 from app.routes.api_routes import router
@@ -232,11 +234,11 @@ def test_success(monkeypatch, valid_room_data, valid_sensor_data, valid_fastest_
 		else:
 			raise Exception(f'Unexpected API call with count {call_count}')
 
-	def fake_requests_post(url, json=None, **kwargs):
+	async def fake_post_to_pathfinding(url, payload):
 		return MockResponse(valid_fastest_path_response, 200)
 
 	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
-	monkeypatch.setattr('app.services.pathfinding_service.requests.post', fake_requests_post)
+	monkeypatch.setattr('app.services.pathfinding_service.post_to_pathfinding', fake_post_to_pathfinding)
 
 	if len(valid_room_data.get("rooms", [])) < 2:
 		pytest.skip("Not enough rooms in valid_room_data for this test")
@@ -270,3 +272,90 @@ def test_missing_sensor_sim(monkeypatch):
 	)
 	with pytest.raises(RuntimeError, match='SENSOR_SIM not found'):
 		importlib.reload(room_sensor_fetch)
+
+
+# Test: Target names are resolved through the room name index, deduplicated and in request order.
+def test_targets_resolved_by_name(monkeypatch, valid_sensor_data, valid_fastest_path_response):
+	rooms = [RoomFactory(id=f'67e52c913161b5df7189df1{i}', name=f'Room {i}').to_dict() for i in range(5)]
+	sent_payloads = []
+
+	async def fake_forward_request(url, method, body=None, params=None):
+		return ({'rooms': rooms}, 200) if url.endswith('/rooms') else (valid_sensor_data, 200)
+
+	async def fake_post_to_pathfinding(url, payload):
+		sent_payloads.append(payload)
+		return MockResponse(valid_fastest_path_response, 200)
+
+	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
+	monkeypatch.setattr('app.services.pathfinding_service.post_to_pathfinding', fake_post_to_pathfinding)
+
+	payload = {'source': rooms[0]['id'], 'targets': ['Room 3', 'Unknown', 'Room 1', 'Room 3']}
+	response = client.post('/multi-point-path', json=payload)
+
+	assert response.status_code == 200
+	assert sent_payloads[0]['target_rooms'] == [rooms[3]['id'], rooms[1]['id']]
+
+
+# Test: Errors from the pathfinding service are passed on with the original response body.
+def test_pathfinding_error_is_forwarded(monkeypatch, valid_sensor_data):
+	rooms = [RoomFactory(id=f'67e52c913161b5df7189df1{i}', name=f'Room {i}').to_dict() for i in range(2)]
+
+	async def fake_forward_request(url, method, body=None, params=None):
+		return ({'rooms': rooms}, 200) if url.endswith('/rooms') else (valid_sensor_data, 200)
+
+	async def fake_post_to_pathfinding(url, payload):
+		return MockResponse({'detail': "Room 'invalid_source' in the tour is not valid."}, 400)
+
+	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
+	monkeypatch.setattr('app.services.pathfinding_service.post_to_pathfinding', fake_post_to_pathfinding)
+
+	response = client.post('/multi-point-path', json={'source': 'invalid_source', 'targets': ['Room 1']})
+
+	assert response.status_code == 400
+	assert response.json()['detail']['error'] == {'detail': "Room 'invalid_source' in the tour is not valid."}
+
+
+def test_compact_multi_point_path(mocker, valid_fastest_path_response):
+	mocker.patch('app.routes.api_routes.calculate_fastest_multipoint_path', return_value=valid_fastest_path_response)
+
+	response = client.post(
+		'/multi-point-path',
+		json={'source': 'RoomA', 'targets': ['RoomB', 'RoomC']},
+		params={'format': 'compact', 'coordinates': 'polyline'},
+	)
+
+	assert response.status_code == 200
+	assert response.headers['content-type'] == 'application/vnd.path.compact+json'
+	assert set(response.json()) == {'rooms', 'sensors', 'polyline', 'distance'}
+
+
+# Test: Long tours get their own timeout, and connection errors are answered in the usual error shape.
+@pytest.mark.parametrize(
+	'error, status_code',
+	[(httpx.ReadTimeout('timed out'), 504), (httpx.ConnectError('connection refused'), 502)],
+)
+def test_pathfinding_connection_errors(monkeypatch, valid_sensor_data, error, status_code):
+	rooms = [RoomFactory(id=f'67e52c913161b5df7189df1{i}', name=f'Room {i}').to_dict() for i in range(2)]
+	timeouts = []
+
+	async def fake_forward_request(url, method, body=None, params=None):
+		return ({'rooms': rooms}, 200) if url.endswith('/rooms') else (valid_sensor_data, 200)
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		timeouts.append(request.extensions['timeout']['read'])
+		raise error
+
+	@asynccontextmanager
+	async def fake_upstream_client(url):
+		async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+			yield client
+
+	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
+	monkeypatch.setattr('app.services.pathfinding_service.upstream_client', fake_upstream_client)
+	monkeypatch.setitem(pathfinding_service.TOUR_SETTINGS, 'timeout', 90)
+
+	response = client.post('/multi-point-path', json={'source': rooms[0]['id'], 'targets': ['Room 1']})
+
+	assert response.status_code == status_code
+	assert timeouts == [90]
+	assert set(response.json()['detail']) == {'error', 'body', 'method', 'url'}
@@ -1,6 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.testclient import TestClient
+import asyncio
 import importlib
+import json
+import time
 import pytest
 
 # Import the router from the new structure.
@@ -9,6 +12,8 @@ from app.services import pathfinding_service
 from app.utils import room_sensor_fetch
 from app.test.factories.sensor_factory import SensorFactory
 from app.test.factories.room_factory import RoomFactory
+from app.schemas.pathfinding_schema import FrontendPathFindingRequest
+from app.utils.snapshot_cache import Snapshot
 
 
 app = FastAPI()
@@ -240,6 +245,109 @@ def test_success(monkeypatch, valid_room_data, valid_sensor_data, valid_fastest_
 	assert 'distance' in json_response
 
 
+# Test: A repeated path request is answered from the path cache.
+def test_repeated_path_is_cached(monkeypatch, valid_room_data, valid_sensor_data, valid_fastest_path_response):
+	path_calls = 0
+
+	async def fake_forward_request(url, method, body=None, params=None):
+		return (valid_room_data if url.endswith('rooms') else valid_sensor_data), 200
+
+	async def fake_forward_request_path(url, method, body=None, params=None):
+		nonlocal path_calls
+		path_calls += 1
+		return valid_fastest_path_response, 200
+
+	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
+	monkeypatch.setattr('app.services.pathfinding_service.forward_request', fake_forward_request_path)
+
+	payload = {'source': 'RoomA', 'target': 'RoomB'}
+	first = client.post('/fastest-path', json=payload)
+	second = client.post('/fastest-path', json=payload)
+
+	assert first.json() == second.json()
+	assert path_calls == 1
+	assert client.get('/health/cache').json()['fastest_path']['hits'] == 1
+
+
+
+# Test: Batch paths are computed against one snapshot and streamed as NDJSON.
+def test_batch(monkeypatch, valid_room_data, valid_sensor_data, valid_fastest_path_response):
+	snapshot_calls = []
+
+	async def fake_forward_request(url, method, body=None, params=None):
+		snapshot_calls.append(url)
+		return (valid_room_data if url.endswith('rooms') else valid_sensor_data), 200
+
+	async def fake_forward_request_path(url, method, body=None, params=None):
+		if body['target_room'] == 'Unknown':
+			raise HTTPException(status_code=400, detail="Room 'Unknown' is not valid.")
+		return valid_fastest_path_response, 200
+
+	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
+	monkeypatch.setattr('app.services.pathfinding_service.forward_request', fake_forward_request_path)
+
+	payload = {
+		'paths': [
+			{'source': 'RoomA', 'target': 'RoomB'},
+			{'source': 'RoomA', 'target': 'Unknown'},
+			{'source': 'RoomB', 'target': 'RoomA'},
+		]
+	}
+	response = client.post('/fastest-path/batch', json=payload)
+
+	assert response.status_code == 200
+	assert response.headers['content-type'] == 'application/x-ndjson'
+	lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line['index'])
+	assert [line['index'] for line in lines] == [0, 1, 2]
+	assert lines[0]['result'] == valid_fastest_path_response
+	assert lines[1]['error'] == {'status_code': 400, 'detail': "Room 'Unknown' is not valid."}
+	assert lines[2]['target'] == 'RoomA'
+	assert len(snapshot_calls) == 2
+
+
+# Test: A failing sensor service is answered with an error status, not an empty stream.
+def test_batch_sensor_failure(monkeypatch, valid_room_data):
+	async def fake_forward_request(url, method, body=None, params=None):
+		if url.endswith('sensors'):
+			raise Exception('Sensor service down')
+		return valid_room_data, 200
+
+	monkeypatch.setattr('app.utils.room_sensor_fetch.forward_request', fake_forward_request)
+
+	response = client.post('/fastest-path/batch', json={'paths': [{'source': 'RoomA', 'target': 'RoomB'}]})
+
+	assert response.status_code == 500
+	assert 'Failed to retrieve sensor data' in response.json()['detail']
+
+
+def test_batch_requires_paths():
+	assert client.post('/fastest-path/batch', json={'paths': []}).status_code == 422
+
+
+# Test: Pathfinding calls of one batch are bounded by the concurrency limit.
+@pytest.mark.asyncio
+async def test_batch_concurrency_is_bounded(mocker, valid_fastest_path_response):
+	running = 0
+	peak = 0
+
+	async def fake_request_fastest_path(request, rooms, sensors):
+		nonlocal running, peak
+		running += 1
+		peak = max(peak, running)
+		await asyncio.sleep(0.01)
+		running -= 1
+		return valid_fastest_path_response
+
+	snapshot = Snapshot({'rooms': [], 'sensors': []}, 1, time.monotonic())
+	mocker.patch('app.services.pathfinding_service.request_fastest_path', side_effect=fake_request_fastest_path)
+	requests = [FrontendPathFindingRequest(source='RoomA', target=f'Room{i}') for i in range(10)]
+
+	lines = [line async for line in pathfinding_service.fastest_path_batch(requests, snapshot, snapshot, concurrency=3)]
+
+	assert len(lines) == 10
+	assert peak == 3
+
+
 def test_missing_pathfinding(monkeypatch):
 	monkeypatch.setattr(
 		'app.services.pathfinding_service.os.getenv',
@@ -256,3 +364,87 @@ def test_missing_sensor_sim(monkeypatch):
 	)
 	with pytest.raises(RuntimeError, match='SENSOR_SIM not found'):
 		importlib.reload(room_sensor_fetch)
+
+
+def test_distance_matrix_route(mocker):
+	matrix = {'sources': ['RoomA'], 'targets': ['RoomB', 'RoomC'], 'costs': [[1.5, None]]}
+	mocker.patch('app.routes.api_routes.calculate_distance_matrix', return_value=matrix)
+
+	response = client.post('/distance-matrix', json={'sources': ['RoomA'], 'targets': ['RoomB', 'RoomC']})
+
+	assert response.status_code == 200
+	assert response.json() == matrix
+
+
+@pytest.mark.parametrize('payload', [{'sources': [], 'targets': ['RoomA']}, {'sources': ['RoomA']}])
+def test_distance_matrix_validation(payload):
+	assert client.post('/distance-matrix', json=payload).status_code == 422
+
+
+# Test: /fastest-path issues a path token that the reroute endpoint accepts.
+def test_reroute_with_path_token(mocker, valid_fastest_path_response):
+	mocker.patch('app.routes.api_routes.calculate_fastest_path', return_value=valid_fastest_path_response)
+	reroute = mocker.patch(
+		'app.services.pathfinding_service.fastest_path_for', return_value=valid_fastest_path_response
+	)
+	snapshot = Snapshot({'rooms': [], 'sensors': []}, 1, time.monotonic())
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'get_snapshot', return_value=snapshot)
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'get_snapshot', return_value=snapshot)
+
+	token = client.post('/fastest-path', json={'source': 'RoomA', 'target': 'RoomB'}).headers['X-Path-Token']
+	response = client.post('/fastest-path/reroute', json={'position': 'RoomC'}, headers={'X-Path-Token': token})
+
+	assert response.status_code == 200
+	assert response.json() == {'status': 'rerouted', **valid_fastest_path_response}
+	assert reroute.call_args.args[0].target == 'RoomB'
+	assert pathfinding_service.path_tokens.get(response.headers['X-Path-Token'])[0] == 'RoomB'
+
+
+# Test: Malformed tokens are answered like any other invalid token.
+@pytest.mark.parametrize('token', ['abc.\xe9', 'abc.def', '\xe9'])
+def test_reroute_with_malformed_path_token(token):
+	response = client.post('/fastest-path/reroute', json={'position': 'RoomC'}, headers={'X-Path-Token': token.encode('latin-1')})
+
+	assert response.status_code == 404
+	assert response.json() == {'detail': 'Invalid path token, send the path and target instead.'}
+
+
+def test_reroute_validation():
+	assert client.post('/fastest-path/reroute', json={'position': ''}).status_code == 422
+	assert client.post('/fastest-path/reroute', json={'position': 'RoomA', 'threshold': -1}).status_code == 422
+	assert client.post('/fastest-path/reroute', json={'position': 'RoomA'}).status_code == 400
+
+
+# Test: Compact paths are opt-in through the query or the Accept header.
+@pytest.mark.parametrize(
+	'params, headers',
+	[({'format': 'compact'}, {}), ({}, {'Accept': 'application/vnd.path.compact+json'})],
+)
+def test_compact_fastest_path(mocker, valid_fastest_path_response, params, headers):
+	mocker.patch('app.routes.api_routes.calculate_fastest_path', return_value=valid_fastest_path_response)
+
+	response = client.post('/fastest-path', json={'source': 'RoomA', 'target': 'RoomB'}, params=params, headers=headers)
+
+	assert response.status_code == 200
+	assert response.headers['content-type'] == 'application/vnd.path.compact+json'
+	assert response.headers['vary'] == 'Accept'
+	assert 'x-path-token' in response.headers
+	body = response.json()
+	assert len(body['rooms']) == len({room['id'] for sensor in valid_fastest_path_response['fastest_path'] for room in sensor['rooms']})
+	assert [sensor['id'] for sensor in body['sensors']] == [sensor['id'] for sensor in valid_fastest_path_response['fastest_path']]
+	assert 'polyline' not in body
+
+
+def test_fastest_path_defaults_to_full_schema(mocker, valid_fastest_path_response):
+	mocker.patch('app.routes.api_routes.calculate_fastest_path', return_value=valid_fastest_path_response)
+
+	response = client.post('/fastest-path', json={'source': 'RoomA', 'target': 'RoomB'})
+
+	assert response.headers['content-type'] == 'application/json'
+	assert response.json() == valid_fastest_path_response
+
+
+def test_compact_fastest_path_rejects_unknown_format():
+	response = client.post('/fastest-path', json={'source': 'RoomA', 'target': 'RoomB'}, params={'format': 'xml'})
+
+	assert response.status_code == 422
@@ -1,13 +1,24 @@
+import bson
 import pytest
+import time
 from fastapi.testclient import TestClient
 from app.routes.api_routes import router
-from fastapi import HTTPException
+from fastapi import FastAPI, HTTPException
+from fastapi.exceptions import RequestValidationError
 from app.test.factories.room_factory import RoomFactory
+from app.utils.snapshot_cache import Snapshot
 
 
 @pytest.fixture
-def mock_get_all_rooms(mocker):
-	return mocker.patch('app.routes.room_routes.get_all_rooms')
+def rooms():
+	return {'rooms': [RoomFactory(id=str(bson.ObjectId()), name=f'Room {i}').to_dict() for i in range(10)]}
+
+
+@pytest.fixture
+def mock_get_rooms_snapshot(mocker, rooms):
+	return mocker.patch(
+		'app.routes.room_routes.get_rooms_snapshot', return_value=Snapshot(rooms, 1, time.monotonic())
+	)
 
 
 @pytest.fixture
@@ -22,15 +33,129 @@ def client():
 
 
 @pytest.mark.asyncio
-async def test_get_all_rooms_route(client, mock_get_all_rooms):
-	mock_response = {'rooms': [room.to_dict() for room in [RoomFactory() for _ in range(10)]]}
-	mock_get_all_rooms.return_value = mock_response
-
+async def test_get_all_rooms_route(client, mock_get_rooms_snapshot, rooms):
 	response = client.get('/rooms/')
 
+	assert response.status_code == 200
+	assert response.json() == rooms
+	assert response.headers['etag']
+	mock_get_rooms_snapshot.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_all_rooms_route_not_modified(client, mock_get_rooms_snapshot):
+	etag = client.get('/rooms/').headers['etag']
+
+	response = client.get('/rooms/', headers={'If-None-Match': etag})
+
+	assert response.status_code == 304
+	assert response.content == b''
+	assert response.headers['etag'] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_all_rooms_route_etag_changes_with_content(client, mocker, mock_get_rooms_snapshot, rooms):
+	etag = client.get('/rooms/').headers['etag']
+	changed = {'rooms': [{**rooms['rooms'][0], 'occupants': 99}, *rooms['rooms'][1:]]}
+	mock_get_rooms_snapshot.return_value = Snapshot(changed, 2, time.monotonic())
+
+	response = client.get('/rooms/', headers={'If-None-Match': etag})
+
+	assert response.status_code == 200
+	assert response.headers['etag'] != etag
+	assert response.json()['rooms'][0]['occupants'] == 99
+
+
+@pytest.mark.asyncio
+async def test_get_room_geometry_route(client, mock_get_rooms_snapshot, mock_get_room_by_id, rooms):
+	response = client.get('/rooms/geometry')
+
+	assert response.status_code == 200
+	assert [room['id'] for room in response.json()['rooms']] == [room['id'] for room in rooms['rooms']]
+	assert response.json()['rooms'][0]['borders'] == rooms['rooms'][0]['borders']
+	assert 'occupants' not in response.json()['rooms'][0]
+	mock_get_room_by_id.assert_not_called()
+
+
+# Test: The geometry describes the snapshot it is served for, including rooms changed by events.
+@pytest.mark.asyncio
+async def test_get_room_geometry_route_follows_snapshot(client, mock_get_rooms_snapshot, rooms):
+	etag = client.get('/rooms/geometry').headers['etag']
+	added = RoomFactory(id=str(bson.ObjectId()), name='New room').to_dict()
+	moved = {**rooms['rooms'][0], 'borders': [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]}
+	mock_get_rooms_snapshot.return_value = Snapshot({'rooms': [moved, *rooms['rooms'][1:], added]}, 2, time.monotonic())
+
+	response = client.get('/rooms/geometry', headers={'If-None-Match': etag})
+
+	assert response.status_code == 200
+	assert response.json()['rooms'][0]['borders'] == moved['borders']
+	assert response.json()['rooms'][-1]['id'] == added['id']
+
+
+@pytest.mark.asyncio
+async def test_get_room_occupancy_route(client, mock_get_rooms_snapshot, mock_get_room_by_id, rooms):
+	response = client.get('/rooms/occupancy')
+
+	assert response.status_code == 200
+	assert response.json()['rooms'][0] == {
+		'id': rooms['rooms'][0]['id'],
+		'crowd_factor': rooms['rooms'][0]['crowd_factor'],
+		'popularity_factor': rooms['rooms'][0]['popularity_factor'],
+		'occupants': rooms['rooms'][0]['occupants'],
+	}
+	etag = response.headers['etag']
+	assert client.get('/rooms/occupancy', headers={'If-None-Match': etag}).status_code == 304
+	mock_get_room_by_id.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_room_changes_route(client, mocker, mock_get_room_by_id):
+	mock_response = {'version': '5f0c9e2a:4', 'resync': False, 'rooms': [], 'removed': []}
+	mock_get_room_changes = mocker.patch('app.routes.room_routes.get_room_changes', return_value=mock_response)
+
+	response = client.get('/rooms/changes', params={'since': '5f0c9e2a:3'})
+
 	assert response.status_code == 200
 	assert response.json() == mock_response
-	mock_get_all_rooms.assert_called_once()
+	mock_get_room_changes.assert_called_once_with('5f0c9e2a:3')
+	mock_get_room_by_id.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_room_updates_route_upstream_error(mocker):
+	mocker.patch('app.utils.room_sensor_fetch.forward_request', side_effect=Exception('sensor-sim down'))
+	app = FastAPI()
+	app.include_router(router)
+
+	response = TestClient(app).get('/rooms/stream')
+
+	assert response.status_code == 500
+	assert response.json()['detail'] == 'Failed to retrieve room data from sensor simulation service'
+
+
+@pytest.mark.asyncio
+async def test_get_rooms_batch_route(client, mocker):
+	mock_response = {'rooms': [{'id': '123', 'name': 'Room 1'}], 'missing': ['124']}
+	mock_get_rooms_by_ids = mocker.patch('app.routes.room_routes.get_rooms_by_ids', return_value=mock_response)
+
+	response = client.post('/rooms/batch', json={'ids': ['123', '124'], 'fields': ['name']})
+
+	assert response.status_code == 200
+	assert response.json() == mock_response
+	mock_get_rooms_by_ids.assert_called_once_with(['123', '124'], ['name'])
+
+
+@pytest.mark.asyncio
+async def test_get_rooms_batch_route_invalid_request(client, mocker):
+	mock_get_rooms_by_ids = mocker.patch('app.routes.room_routes.get_rooms_by_ids')
+
+	with pytest.raises(RequestValidationError):
+		client.post('/rooms/batch', json={'ids': []})
+	with pytest.raises(RequestValidationError) as exc:
+		client.post('/rooms/batch', json={'ids': ['123'], 'fields': ['capacity']})
+
+	assert 'Unknown room fields: capacity.' in exc.value.errors()[0]['msg']
+	mock_get_rooms_by_ids.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -1,13 +1,23 @@
 import pytest
+import time
 from fastapi.testclient import TestClient
 from app.routes.api_routes import router
 from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
 from app.test.factories.sensor_factory import SensorFactory
+from app.utils.snapshot_cache import Snapshot
 
 
 @pytest.fixture
-def mock_get_all_sensors(mocker):
-	return mocker.patch('app.routes.sensor_routes.get_all_sensors')
+def sensors():
+	return {'sensors': [sensor.to_dict() for sensor in [SensorFactory() for _ in range(10)]]}
+
+
+@pytest.fixture
+def mock_get_sensors_snapshot(mocker, sensors):
+	return mocker.patch(
+		'app.routes.sensor_routes.get_sensors_snapshot', return_value=Snapshot(sensors, 1, time.monotonic())
+	)
 
 
 @pytest.fixture
@@ -22,15 +32,38 @@ def client():
 
 
 @pytest.mark.asyncio
-async def test_get_all_sensors_route(client, mock_get_all_sensors):
-	mock_response = {'sensors': [sensor.to_dict() for sensor in [SensorFactory() for _ in range(10)]]}
-	mock_get_all_sensors.return_value = mock_response
-
+async def test_get_all_sensors_route(client, mock_get_sensors_snapshot, sensors):
 	response = client.get('/sensors/')  # Assuming the endpoint is '/sensors/'
 
+	assert response.status_code == 200
+	assert response.json() == sensors
+	assert response.headers['etag']
+	mock_get_sensors_snapshot.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_all_sensors_route_not_modified(client, mock_get_sensors_snapshot):
+	etag = client.get('/sensors/').headers['etag']
+
+	response = client.get('/sensors/', headers={'If-None-Match': f'"other", W/{etag}'})
+
+	assert response.status_code == 304
+	assert response.headers['etag'] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_sensors_batch_route(client, mocker):
+	mock_response = {'sensors': [{'id': '123', 'is_vertical': True}], 'missing': []}
+	mock_get_sensors_by_ids = mocker.patch('app.routes.sensor_routes.get_sensors_by_ids', return_value=mock_response)
+
+	response = client.post('/sensors/batch', json={'ids': ['123'], 'fields': ['is_vertical']})
+
 	assert response.status_code == 200
 	assert response.json() == mock_response
-	mock_get_all_sensors.assert_called_once()
+	mock_get_sensors_by_ids.assert_called_once_with(['123'], ['is_vertical'])
+
+	with pytest.raises(RequestValidationError):
+		client.post('/sensors/batch', json={'ids': ['123'], 'fields': ['name']})
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import httpx
+import os
+import pytest
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routes.api_routes import router
+from app.utils import artwork_harvester
+from app.services.artwork_mirror import ArtworkMirror, artwork_mirror, read_meta, search_mirror, try_lock, write_mirror
+
+FIXTURE = Path(__file__).parent.parent / 'fixtures' / 'smk' / 'on_display.json'
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+
+@pytest.fixture
+def smk_api(monkeypatch):
+	"""Replay the on-display catalog pages of the fixture in place of the SMK API."""
+	pages = {page['request']['offset']: page['response'] for page in json.loads(FIXTURE.read_text())['pages']}
+	requests = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		requests.append(dict(request.url.params))
+		return httpx.Response(200, json=pages[int(request.url.params['offset'])])
+
+	@asynccontextmanager
+	async def fake_upstream_client(url):
+		async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+			yield client
+
+	monkeypatch.setattr(artwork_harvester, 'upstream_client', fake_upstream_client)
+	return requests
+
+
+@pytest.fixture
+def mirror(tmp_path):
+	return ArtworkMirror(str(tmp_path / 'artworks.sqlite3'), page_size=3, sync_interval=3600, retry_interval=60)
+
+
+@pytest.mark.asyncio
+async def test_sync_pages_through_catalog(smk_api, mirror):
+	await mirror.sync()
+
+	assert [request['offset'] for request in smk_api] == ['0', '3']
+	assert all(request['filters'] == '[on_display:true]' for request in smk_api)
+	assert mirror.stats()['artworks'] == 5
+	assert read_meta(mirror.path)['count'] == '5'
+
+
+@pytest.mark.asyncio
+async def test_search(smk_api, mirror):
+	assert await mirror.search('*', None, None, None) is None
+	await mirror.sync()
+
+	everything = await mirror.search(None, None, None, None)
+	assert everything['found'] == 5
+	assert everything['rows'] == 10
+	# Parts of other artworks are found but not returned, like with the live API
+	assert len(everything['items']) == 4
+
+	by_creator = await mirror.search('købke', None, None, None)
+	assert [item['titles'][0]['title'] for item in by_creator['items']] == ['Udsigt fra Dosseringen']
+	assert by_creator['found'] == 2
+
+	by_tag_and_room = await mirror.search('Landskab', 'Sal 218', None, None)
+	assert [item['artist'] for item in by_tag_and_room['items']] == [['J.Th. Lundbye']]
+
+	assert (await mirror.search('landskab ved', None, None, None))['found'] == 1
+	assert (await mirror.search('100%', None, None, None))['found'] == 0
+
+	page = await mirror.search('*', 'Sal 217', 1, 1)
+	assert page['found'] == 3
+	assert page['offset'] == 1
+	assert [item['frontend_url'] for item in page['items']] == ['https://open.smk.dk/artwork/image/KMS2']
+
+
+@pytest.mark.asyncio
+async def test_mirror_of_previous_run_is_used_on_start(smk_api, mirror):
+	await mirror.sync()
+	restarted = ArtworkMirror(mirror.path, page_size=3, sync_interval=3600, retry_interval=60)
+
+	restarted.start()
+	await asyncio.sleep(0.05)
+	await restarted.stop()
+
+	assert restarted.ready
+	assert restarted.artworks == 5
+	# The mirror was fresh, so it was not downloaded again
+	assert len(smk_api) == 2
+
+
+# Test: Processes sharing a mirror path do not download the catalog at the same time.
+@pytest.mark.asyncio
+async def test_processes_sharing_a_mirror_take_turns(smk_api, mirror):
+	lock = try_lock(f'{mirror.path}.lock')
+	try:
+		assert await mirror.sync() is False
+	finally:
+		os.close(lock)
+	assert smk_api == []
+
+	assert await mirror.sync() is True
+	other = ArtworkMirror(mirror.path, page_size=3, sync_interval=3600, retry_interval=60)
+
+	assert await other.sync() is True
+	assert other.ready
+	assert other.artworks == 5
+	# The other process used the fresh mirror instead of downloading it again
+	assert len(smk_api) == 2
+
+
+@pytest.mark.asyncio
+async def test_empty_catalog_is_not_mirrored(mirror, monkeypatch):
+	@asynccontextmanager
+	async def fake_upstream_client(url):
+		transport = httpx.MockTransport(lambda request: httpx.Response(200, json={'found': 0, 'items': []}))
+		async with httpx.AsyncClient(transport=transport) as client:
+			yield client
+
+	monkeypatch.setattr(artwork_harvester, 'upstream_client', fake_upstream_client)
+
+	with pytest.raises(ValueError):
+		await mirror.sync()
+	assert not mirror.ready
+
+
+# Test: An artwork listed twice by a harvest is mirrored once.
+def test_duplicate_artworks_are_mirrored_once(tmp_path):
+	path = str(tmp_path / 'artworks.sqlite3')
+	items = [
+		{'object_number': 'KMS1', 'titles': [{'title': 'First'}]},
+		{'object_number': 'KMS2', 'titles': [{'title': 'Second'}]},
+		{'object_number': 'KMS1', 'titles': [{'title': 'First again'}]},
+	]
+
+	assert write_mirror(path, items, 0.0) == 2
+	found = search_mirror(path, '*', None, 10, 0)['items']
+	assert [item['titles'][0]['title'] for item in found] == ['First', 'Second']
+
+
+@pytest.mark.asyncio
+async def test_artwork_route_uses_mirror(smk_api, mocker, monkeypatch, tmp_path):
+	monkeypatch.setattr(artwork_mirror, 'path', str(tmp_path / 'artworks.sqlite3'))
+	monkeypatch.setattr(artwork_mirror, 'page_size', 3)
+	await artwork_mirror.sync()
+	forward_request = mocker.patch('app.services.smk_api.forward_request', return_value=({'name': 'Sal 217'}, 200))
+
+	response = client.get('/artwork', params={'keys': 'portræt', 'room': '67efbb200b23f5290bff700f'})
+
+	assert response.status_code == 200
+	assert response.json()['found'] == 1
+	assert response.json()['items'][0]['artist'] == ['C.W. Eckersberg']
+	# Only the room was looked up, the SMK API was not called
+	forward_request.assert_called_once()
+	assert artwork_mirror.stats()['queries'] == 1
+
+
+def test_artwork_route_falls_back_to_live_api(mocker):
+	live = {'found': 0, 'offset': 0, 'rows': 10, 'items': []}
+	forward_request = mocker.patch('app.services.smk_api.forward_request', return_value=(live, 200))
+
+	response = client.get('/artwork', params={'keys': 'portræt'})
+
+	assert response.status_code == 200
+	assert forward_request.call_args.args[0] == 'https://api.smk.dk/api/v1/art/search'
+	assert artwork_mirror.stats()['fallbacks'] == 1
+
+
+@pytest.mark.asyncio
+async def test_filter_index(smk_api, mirror):
+	await mirror.sync()
+
+	assert mirror.filter_index['creator']['Christen Købke'] == {'Sal 217'}
+	assert mirror.filter_index['materials']['olie'] == {'Sal 217', 'Sal 218', 'Sal 271'}
+	assert mirror.filter_index['materials']['blyant'] == {'Sal 217'}
+	assert mirror.stats()['filter_values'] == len(mirror.filter_index['creator']) + len(mirror.filter_index['materials'])
@@ -1,10 +1,23 @@
+import asyncio
+import json
 import pytest
+import httpx
+from contextlib import asynccontextmanager
 from fastapi import HTTPException
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 from app.schemas.filter_schemas import FilterToRoomsRequest, FilterRequest
-import requests
 
-from app.services.filter_service import get_filters, get_facet_count, filter_to_rooms, get_rooms
+from app.services import filter_service
+from app.services.artwork_mirror import artwork_mirror
+from app.services.filter_service import (
+	get_filters,
+	get_facet_count,
+	filter_to_rooms,
+	filters_snapshot,
+	get_rooms,
+	restore_filters,
+	room_cache,
+)
 
 
 @pytest.fixture
@@ -20,6 +33,22 @@ def mocked_response(mock_facets):
 	return {'facets': mock_facets}
 
 
+@pytest.fixture
+def smk_api(monkeypatch):
+	"""Answer SMK API searches with `smk_api(handler)`, where the handler gets the request's query parameters."""
+
+	def respond(handler):
+		@asynccontextmanager
+		async def fake_upstream_client(url):
+			transport = httpx.MockTransport(lambda request: handler(dict(request.url.params)))
+			async with httpx.AsyncClient(transport=transport) as client:
+				yield client
+
+		monkeypatch.setattr(filter_service, 'upstream_client', fake_upstream_client)
+
+	return respond
+
+
 def test_get_facet_count(mock_facets):
 	result = get_facet_count(mock_facets)
 	expected = [
@@ -41,16 +70,11 @@ def test_get_facet_count(mock_facets):
 	assert result == expected
 
 
-def test_get_filters_success(monkeypatch, mocked_response):
-	def mock_get(*args, **kwargs):
-		mock_resp = MagicMock()
-		mock_resp.status_code = 200
-		mock_resp.json.return_value = mocked_response
-		return mock_resp
+@pytest.mark.asyncio
+async def test_get_filters_success(smk_api, mocked_response):
+	smk_api(lambda params: httpx.Response(200, json=mocked_response))
 
-	monkeypatch.setattr(requests, 'get', mock_get)
-
-	result = get_filters()
+	result = await get_filters()
 	assert isinstance(result, list)
 	assert 'creator' in result[0]['type']
 	assert 'materials' in result[1]['type']
@@ -58,40 +82,62 @@ def test_get_filters_success(monkeypatch, mocked_response):
 	assert len(result[1]['filters']) == 2
 
 
-def test_get_filters_http_error(monkeypatch):
-	def mock_get(*args, **kwargs):
-		mock_resp = MagicMock()
-		mock_resp.status_code = 404
-		mock_resp.text = 'Not Found'
-		return mock_resp
-
-	monkeypatch.setattr(requests, 'get', mock_get)
+@pytest.mark.asyncio
+async def test_get_filters_http_error(smk_api):
+	smk_api(lambda params: httpx.Response(404, text='Not Found'))
 
 	with pytest.raises(HTTPException) as exc_info:
-		get_filters()
+		await get_filters()
 	assert exc_info.value.status_code == 404
 	assert 'Failed to fetch data' in exc_info.value.detail
 
 
-def test_get_filters_no_facets(monkeypatch):
-	def mock_get(*args, **kwargs):
-		mock_resp = MagicMock()
-		mock_resp.status_code = 200
-		mock_resp.json.return_value = {'facets': {}}
-		return mock_resp
-
-	monkeypatch.setattr(requests, 'get', mock_get)
+@pytest.mark.asyncio
+async def test_get_filters_no_facets(smk_api):
+	smk_api(lambda params: httpx.Response(200, json={'facets': {}}))
 
 	with pytest.raises(HTTPException) as exc_info:
-		get_filters()
+		await get_filters()
 	assert exc_info.value.status_code == 500
 	assert 'No filters found' in exc_info.value.detail
 
 
+# ---------- Tests for the cached filter catalog ----------
+
+
+@pytest.mark.asyncio
+async def test_filter_catalog_is_persisted_and_restored(smk_api, mocked_response, filter_catalog_path):
+	searches = []
+
+	def handler(params):
+		searches.append(params)
+		return httpx.Response(200, json=mocked_response)
+
+	smk_api(handler)
+	filters = await filters_snapshot.get()
+	assert await filters_snapshot.get() is filters
+	assert len(searches) == 1
+	assert json.loads(filter_catalog_path.read_text())['filters'] == filters
+
+	# A restart serves the persisted copy without asking the SMK API
+	filters_snapshot.clear()
+	assert restore_filters()
+	assert await filters_snapshot.get() == filters
+	assert len(searches) == 1
+
+
+def test_unreadable_filter_catalog_is_ignored(filter_catalog_path):
+	assert not restore_filters()
+	filter_catalog_path.write_text('{"fetched_at": 0, "filters": [{"type": "unknown", "filters": []}]}')
+	assert not restore_filters()
+	assert filters_snapshot.peek() is None
+
+
 # ---------- Unit test for filter_to_rooms ----------
 
 
-def test_filter_to_rooms_aggregates_rooms():
+@pytest.mark.asyncio
+async def test_filter_to_rooms_aggregates_rooms():
 	request_data = FilterToRoomsRequest(
 		filters=[
 			FilterRequest(type='creator', keys=['John Doe', 'Jane Smith']),
@@ -105,57 +151,128 @@ def test_filter_to_rooms_aggregates_rooms():
 		('materials', 'Oil'): ['Room 3'],
 	}
 
-	def mock_get_rooms(filter_type, value):
+	async def mock_get_rooms(filter_type, value):
 		return mock_return[(filter_type, value)]
 
 	with patch('app.services.filter_service.get_rooms', side_effect=mock_get_rooms):
-		result = filter_to_rooms(request_data)
+		result = await filter_to_rooms(request_data)
 		assert sorted(result) == ['Room 1', 'Room 2', 'Room 3']
 
 
-# ---------- Tests for get_rooms ----------
+@pytest.mark.asyncio
+async def test_filter_to_rooms_deduplicates_rooms():
+	request_data = FilterToRoomsRequest(filters=[FilterRequest(type='creator', keys=['John Doe', 'Jane Smith'])])
+
+	with patch('app.services.filter_service.get_rooms', side_effect=[['Room 2', 'Room 1'], ['Room 1']]):
+		assert await filter_to_rooms(request_data) == ['Room 1', 'Room 2']
+
+
+@pytest.mark.asyncio
+async def test_filter_to_rooms_uses_mirror_index(monkeypatch):
+	monkeypatch.setattr(
+		artwork_mirror,
+		'filter_index',
+		{
+			'creator': {'John Doe': frozenset({'Room 1', 'Room 2'}), 'Jane Smith': frozenset({'Room 2'})},
+			'materials': {'Oil': frozenset({'Room 3'})},
+		},
+	)
+	request_data = FilterToRoomsRequest(
+		filters=[
+			FilterRequest(type='creator', keys=['John Doe', 'Jane Smith', 'Unknown']),
+			FilterRequest(type='materials', keys=['Oil']),
+			FilterRequest(type='techniques', keys=['Etching']),
+		]
+	)
+
+	# Only the type the index does not cover is searched in the SMK API
+	with patch('app.services.filter_service.get_rooms', return_value=['Room 4']) as get_rooms_mock:
+		assert await filter_to_rooms(request_data) == ['Room 1', 'Room 2', 'Room 3', 'Room 4']
+	get_rooms_mock.assert_called_once_with('techniques', 'Etching')
+
+
+@pytest.mark.asyncio
+async def test_filter_to_rooms_looks_up_each_value_once_concurrently(monkeypatch):
+	monkeypatch.setattr(filter_service, 'room_lookups', asyncio.Semaphore(2))
+	request_data = FilterToRoomsRequest(
+		filters=[
+			FilterRequest(type='creator', keys=['A', 'B', 'A', 'C']),
+			FilterRequest(type='materials', keys=['Oil', 'Oil']),
+		]
+	)
+	other_request = FilterToRoomsRequest(filters=[FilterRequest(type='creator', keys=['D', 'E'])])
+	running = 0
+	most_running = 0
+	lookups = []
+
+	async def mock_get_rooms(filter_type, value):
+		nonlocal running, most_running
+		lookups.append((filter_type, value))
+		running += 1
+		most_running = max(most_running, running)
+		await asyncio.sleep(0.01)
+		running -= 1
+		return [f'Room {value}']
 
+	with patch('app.services.filter_service.get_rooms', side_effect=mock_get_rooms):
+		results = await asyncio.gather(filter_to_rooms(request_data), filter_to_rooms(other_request))
+	assert results == [['Room A', 'Room B', 'Room C', 'Room Oil'], ['Room D', 'Room E']]
+	assert sorted(lookups) == [
+		('creator', 'A'), ('creator', 'B'), ('creator', 'C'), ('creator', 'D'), ('creator', 'E'), ('materials', 'Oil')
+	]
+	# The limit is shared by concurrent requests
+	assert most_running == 2
 
-def test_get_rooms_success(monkeypatch):
-	mock_response_data = {'facets': {'current_location_name': ['Room A', 5, 'Room B', 3]}}
 
-	def mock_get(*args, **kwargs):
-		mock_resp = MagicMock()
-		mock_resp.status_code = 200
-		mock_resp.json.return_value = mock_response_data
-		return mock_resp
+@pytest.mark.asyncio
+async def test_filter_to_rooms_caches_rooms_per_value():
+	request_data = FilterToRoomsRequest(filters=[FilterRequest(type='creator', keys=['John Doe'])])
 
-	monkeypatch.setattr('requests.get', mock_get)
+	with patch('app.services.filter_service.get_rooms', return_value=['Room 1']) as get_rooms_mock:
+		assert await filter_to_rooms(request_data) == ['Room 1']
+		assert await filter_to_rooms(request_data) == ['Room 1']
+	get_rooms_mock.assert_called_once_with('creator', 'John Doe')
+	assert room_cache.stats()['hits'] == 1
 
-	result = get_rooms('creator', 'John Doe')
-	assert result == ['Room A', 'Room B']
+	# Failed lookups are not cached
+	room_cache.clear()
+	with patch('app.services.filter_service.get_rooms', side_effect=HTTPException(status_code=502)):
+		with pytest.raises(HTTPException):
+			await filter_to_rooms(request_data)
+	assert room_cache.stats()['size'] == 0
 
 
-def test_get_rooms_empty(monkeypatch):
-	mock_response_data = {'facets': {'current_location_name': []}}
+# ---------- Tests for get_rooms ----------
 
-	def mock_get(*args, **kwargs):
-		mock_resp = MagicMock()
-		mock_resp.status_code = 200
-		mock_resp.json.return_value = mock_response_data
-		return mock_resp
 
-	monkeypatch.setattr('requests.get', mock_get)
+@pytest.mark.asyncio
+async def test_get_rooms_success(smk_api):
+	searches = []
 
-	result = get_rooms('creator', 'Nonexistent')
-	assert result == []
+	def handler(params):
+		searches.append(params)
+		return httpx.Response(200, json={'facets': {'current_location_name': ['Room A', 5, 'Room B', 3]}})
 
+	smk_api(handler)
+
+	result = await get_rooms('creator', 'John Doe')
+	assert searches[0]['filters'] == '[creator:John Doe]'
+	assert result == ['Room A', 'Room B']
+
+
+@pytest.mark.asyncio
+async def test_get_rooms_empty(smk_api):
+	smk_api(lambda params: httpx.Response(200, json={'facets': {'current_location_name': []}}))
+
+	result = await get_rooms('creator', 'Nonexistent')
+	assert result == []
 
-def test_get_rooms_http_error(monkeypatch):
-	def mock_get(*args, **kwargs):
-		mock_resp = MagicMock()
-		mock_resp.status_code = 500
-		mock_resp.text = 'Internal Server Error'
-		return mock_resp
 
-	monkeypatch.setattr('requests.get', mock_get)
+@pytest.mark.asyncio
+async def test_get_rooms_http_error(smk_api):
+	smk_api(lambda params: httpx.Response(500, text='Internal Server Error'))
 
 	with pytest.raises(HTTPException) as exc_info:
-		get_rooms('creator', 'John Doe')
+		await get_rooms('creator', 'John Doe')
 	assert exc_info.value.status_code == 500
 	assert 'Failed to fetch data' in str(exc_info.value.detail)
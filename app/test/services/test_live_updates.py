@@ -0,0 +1,94 @@
+import asyncio
+import json
+import pytest
+from app.services.live_updates import room_broadcaster, room_update_events
+from app.test.factories.room_factory import RoomFactory
+from app.utils.room_sensor_fetch import rooms_snapshot
+
+
+@pytest.fixture
+def rooms():
+	return [RoomFactory(id=room_id).to_dict() for room_id in ['67e52c913161b5df7189df14', '67e52c913161b5df7189df15']]
+
+
+@pytest.fixture
+def mock_snapshot_forward_request(mocker, rooms):
+	return mocker.patch('app.utils.room_sensor_fetch.forward_request', return_value=({'rooms': rooms}, 200))
+
+
+def parse(event: str) -> tuple[str, dict]:
+	lines = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+	return lines['event'], json.loads(lines['data'])
+
+
+async def never_disconnected() -> bool:
+	return False
+
+
+@pytest.mark.asyncio
+async def test_stream_starts_with_resync_then_pushes_changes(mock_snapshot_forward_request, rooms):
+	events = room_update_events(await rooms_snapshot.get_snapshot(), never_disconnected, keepalive=1)
+
+	event, data = parse(await events.__anext__())
+	assert event == 'resync'
+	assert len(data['rooms']) == 2
+	epoch, _, resync_version = data['version'].partition(':')
+
+	mock_snapshot_forward_request.return_value = ({'rooms': [{**rooms[0], 'occupants': 50}, rooms[1]]}, 200)
+	await rooms_snapshot.refresh()
+
+	event, data = parse(await events.__anext__())
+	assert event == 'changes'
+	assert data['version'] == f'{epoch}:{int(resync_version) + 1}'
+	assert [room['id'] for room in data['rooms']] == [rooms[0]['id']]
+	assert data['rooms'][0]['occupants'] == 50
+
+	await events.aclose()
+	assert room_broadcaster.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_starts_from_newer_snapshot(mock_snapshot_forward_request, rooms):
+	snapshot = await rooms_snapshot.get_snapshot()
+	mock_snapshot_forward_request.return_value = ({'rooms': [{**rooms[0], 'occupants': 50}, rooms[1]]}, 200)
+	await rooms_snapshot.refresh()
+
+	events = room_update_events(snapshot, never_disconnected, keepalive=1)
+
+	event, data = parse(await events.__anext__())
+	assert event == 'resync'
+	assert data['rooms'][0]['occupants'] == 50
+	await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_snapshot_is_not_pushed(mock_snapshot_forward_request):
+	events = room_update_events(await rooms_snapshot.get_snapshot(), never_disconnected, keepalive=0.01)
+	await events.__anext__()
+
+	await rooms_snapshot.refresh()
+
+	assert await events.__anext__() == ': keep-alive\n\n'
+	await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_when_client_disconnects(mock_snapshot_forward_request):
+	async def disconnected() -> bool:
+		return True
+
+	events = [event async for event in room_update_events(await rooms_snapshot.get_snapshot(), disconnected)]
+
+	assert len(events) == 1
+	assert room_broadcaster.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_when_broadcaster_closes(mock_snapshot_forward_request):
+	events = room_update_events(await rooms_snapshot.get_snapshot(), never_disconnected, keepalive=1)
+	await events.__anext__()
+
+	room_broadcaster.close()
+
+	with pytest.raises(StopAsyncIteration):
+		await asyncio.wait_for(events.__anext__(), timeout=1)
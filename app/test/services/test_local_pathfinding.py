@@ -0,0 +1,174 @@
+import json
+import pytest
+from pathlib import Path
+from fastapi import HTTPException
+from app.schemas.pathfinding_schema import FastestPathModel, FrontendPathFindingRequest
+from app.services import pathfinding_service
+from app.services.pathfinding_service import build_path_table, haversine, local_fastest_path, sensor_graph
+from app.utils.snapshot_cache import Snapshot
+
+FIXTURE_DIR = Path(__file__).parent.parent / 'fixtures' / 'pathfinding'
+# Hand-built topologies with paths worked out from the gateway's own cost model
+FIXTURES = sorted(FIXTURE_DIR.glob('*.json'))
+# Answers of the pathfinding service, recorded by app/test/e2e/pathfinding/test_record_pathfinding.py
+RECORDED = sorted((FIXTURE_DIR / 'recorded').glob('*.json'))
+
+
+def load_fixture(path: Path) -> tuple[dict, Snapshot, Snapshot]:
+	fixture = json.loads(path.read_text())
+	return fixture, Snapshot({'rooms': fixture['rooms']}, 1, 0), Snapshot({'sensors': fixture['sensors']}, 1, 0)
+
+
+def test_haversine():
+	assert haversine(55.0, 12.0, 55.0, 12.0) == 0
+	assert haversine(55.0, 12.0, 55.001, 12.0) == pytest.approx(111.19, abs=0.01)
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=[path.stem for path in FIXTURES])
+def test_expected_paths_of_fixtures(monkeypatch, path):
+	"""
+	The hand-built fixtures guard the local engine against regressions. They do not prove parity
+	with the pathfinding service, see `test_parity_with_recorded_responses`.
+	"""
+	fixture, rooms, sensors = load_fixture(path)
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'vertical_cost', fixture['vertical_cost'])
+
+	for request in fixture['requests']:
+		result = local_fastest_path(request['source'], request['target'], rooms, sensors)
+
+		FastestPathModel.model_validate(result)
+		assert [sensor['id'] for sensor in result['fastest_path']] == request['response']['fastest_path']
+		assert result['distance'] == pytest.approx(request['response']['distance'], abs=0.01)
+
+
+@pytest.mark.skipif(not RECORDED, reason='No responses recorded from the pathfinding service yet')
+@pytest.mark.parametrize('path', RECORDED, ids=[path.stem for path in RECORDED])
+def test_parity_with_recorded_responses(path):
+	"""
+	The local engine, and the path table built from the same graph, answer like the pathfinding service.
+	Until this passes on recordings of the real topology, 'local', 'fallback' and 'table' modes and the
+	tour optimizer may choose other routes than 'remote'.
+	"""
+	fixture, rooms, sensors = load_fixture(path)
+	table = build_path_table(rooms, sensors)()
+
+	for request in fixture['requests']:
+		expected = request['response']
+		local = local_fastest_path(request['source'], request['target'], rooms, sensors)
+		for result in (local, table.fastest_path(request['source'], request['target'])):
+			assert [sensor['id'] for sensor in result['fastest_path']] == expected['fastest_path']
+			assert result['distance'] == pytest.approx(expected['distance'], rel=1e-3)
+
+
+def test_path_includes_rooms_of_each_sensor(topology):
+	fixture, rooms, sensors = topology
+	request = fixture['requests'][0]
+
+	result = local_fastest_path(request['source'], request['target'], rooms, sensors)
+
+	first = result['fastest_path'][0]
+	assert [room['id'] for room in first['rooms']] == fixture['sensors'][2]['rooms']
+	assert set(first['rooms'][0]) == {'id', 'name', 'crowd_factor', 'occupants', 'area', 'popularity_factor', 'floor'}
+
+
+def test_graph_is_built_once_per_version(topology):
+	_, rooms, sensors = topology
+
+	assert sensor_graph(rooms, sensors) is sensor_graph(rooms, sensors)
+
+
+def test_crowd_changes_reroute(topology):
+	fixture, rooms, sensors = topology
+	request = fixture['requests'][0]
+	crowded = Snapshot(
+		{'rooms': [{**room, 'crowd_factor': 0.05} if room['name'] == 'Crowded hall' else room for room in fixture['rooms']]},
+		2,
+		0,
+	)
+
+	result = local_fastest_path(request['source'], request['target'], crowded, sensors)
+
+	assert [sensor['id'] for sensor in result['fastest_path']] == [fixture['sensors'][0]['id'], fixture['sensors'][1]['id']]
+
+
+def test_same_source_and_target(topology):
+	fixture, rooms, sensors = topology
+	room_id = fixture['rooms'][0]['id']
+
+	assert local_fastest_path(room_id, room_id, rooms, sensors) == {'fastest_path': [], 'distance': 0.0}
+
+
+def test_invalid_room(topology):
+	fixture, rooms, sensors = topology
+
+	with pytest.raises(HTTPException) as e:
+		local_fastest_path('invalid_source', fixture['rooms'][0]['id'], rooms, sensors)
+
+	assert e.value.status_code == 400
+	assert e.value.detail == "Room 'invalid_source' is not valid."
+
+
+def test_unreachable_room(topology):
+	fixture, rooms, sensors = topology
+	island = {**fixture['rooms'][0], 'id': '67e52c913161b5df7189df19'}
+	rooms = Snapshot({'rooms': fixture['rooms'] + [island]}, 2, 0)
+
+	with pytest.raises(HTTPException) as e:
+		local_fastest_path(fixture['rooms'][0]['id'], island['id'], rooms, sensors)
+
+	assert e.value.status_code == 404
+
+
+@pytest.mark.parametrize(
+	'mode, error, expect_local',
+	[
+		('fallback', HTTPException(status_code=503, detail='down'), True),
+		('fallback', HTTPException(status_code=400, detail='bad request'), False),
+		('remote', HTTPException(status_code=503, detail='down'), False),
+	],
+)
+@pytest.mark.asyncio
+async def test_fallback_mode(mocker, monkeypatch, topology, mode, error, expect_local):
+	fixture, rooms, sensors = topology
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'mode', mode)
+	mocker.patch('app.services.pathfinding_service.forward_request', side_effect=error)
+	request = fixture['requests'][0]
+	path_request = FrontendPathFindingRequest(source=request['source'], target=request['target'])
+
+	if expect_local:
+		result = await pathfinding_service.request_fastest_path(path_request, rooms, sensors)
+		assert [sensor['id'] for sensor in result['fastest_path']] == request['response']['fastest_path']
+	else:
+		with pytest.raises(HTTPException):
+			await pathfinding_service.request_fastest_path(path_request, rooms, sensors)
+
+
+@pytest.mark.asyncio
+async def test_local_mode_does_not_call_pathfinding(mocker, monkeypatch, topology):
+	fixture, rooms, sensors = topology
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'mode', 'local')
+	mock_forward_request = mocker.patch('app.services.pathfinding_service.forward_request')
+	request = fixture['requests'][1]
+
+	result = await pathfinding_service.request_fastest_path(
+		FrontendPathFindingRequest(source=request['source'], target=request['target']), rooms, sensors
+	)
+
+	assert result['distance'] == pytest.approx(request['response']['distance'], abs=0.01)
+	mock_forward_request.assert_not_called()
+
+
+def test_empty_rooms_are_not_free(topology):
+	fixture, rooms, sensors = topology
+	request = fixture['requests'][0]
+	# The empty quiet hall is twice as long as the barely crowded hall, so it is no longer the faster way
+	crowd = {'Crowded hall': 0.15, 'Quiet hall': 0.0}
+	snapshot = Snapshot(
+		{'rooms': [{**room, 'crowd_factor': crowd.get(room['name'], room['crowd_factor'])} for room in fixture['rooms']]},
+		2,
+		0,
+	)
+
+	result = local_fastest_path(request['source'], request['target'], snapshot, sensors)
+
+	assert [sensor['id'] for sensor in result['fastest_path']] == [fixture['sensors'][0]['id'], fixture['sensors'][1]['id']]
@@ -0,0 +1,98 @@
+import time
+import pytest
+from fastapi import HTTPException
+from app.schemas.pathfinding_schema import FrontendPathFindingRequest
+from app.services import pathfinding_service
+from app.services.path_prewarmer import PathPrewarmer
+from app.services.pathfinding_service import path_cache, path_prewarmer
+from app.utils.popularity import DecayingTopK
+from app.utils.snapshot_cache import Snapshot
+
+
+def rooms(version: int, crowd_factor: float) -> Snapshot:
+	return Snapshot({'rooms': [{'id': room_id, 'crowd_factor': crowd_factor} for room_id in 'abc']}, version, time.monotonic())
+
+
+@pytest.mark.asyncio
+async def test_warms_most_popular_pairs():
+	warmed = []
+
+	async def warm(key, rooms, sensors):
+		warmed.append((key, rooms.version))
+		return key != ('a', 'b')
+
+	sensors = Snapshot({'sensors': []}, 1, 0)
+	prewarmer = PathPrewarmer(DecayingTopK(capacity=10, half_life=60), lambda: sensors, warm, pairs=2, concurrency=1)
+	for key, count in ((('a', 'b'), 3), (('a', 'c'), 2), (('b', 'c'), 1)):
+		for _ in range(count):
+			prewarmer.record(key)
+
+	prewarmer.schedule(None, rooms(1, 0.1))
+	assert prewarmer.stats()['runs'] == 0
+
+	prewarmer.schedule(rooms(1, 0.1), rooms(2, 0.9))
+	# Refreshes during a run are warmed once afterwards, for the newest snapshot
+	prewarmer.schedule(rooms(2, 0.9), rooms(3, 0.5))
+	prewarmer.schedule(rooms(3, 0.5), rooms(4, 0.4))
+	await prewarmer.wait()
+
+	assert warmed == [(('a', 'b'), 4), (('a', 'c'), 4)]
+	assert prewarmer.stats()['runs'] == 1
+	assert prewarmer.stats()['warmed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_recomputes_stale_popular_paths(mocker):
+	computed = []
+
+	async def fake_request_fastest_path(request, rooms, sensors):
+		computed.append((request.source, rooms.version))
+		if request.source == 'unknown':
+			raise ValueError(request.source)
+		return {'fastest_path': [], 'distance': 0.0}
+
+	mocker.patch('app.services.pathfinding_service.request_fastest_path', side_effect=fake_request_fastest_path)
+	mocker.patch('app.services.pathfinding_service.topology_id', return_value='topology')
+	sensors = Snapshot({'sensors': []}, 1, time.monotonic())
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'peek', return_value=sensors)
+	first = rooms(1, 0.1)
+	path_prewarmer.record(('a', 'b'))
+	path_prewarmer.record(('unknown', 'b'))
+	await pathfinding_service.warm_path(('a', 'b'), first, sensors)
+
+	# Within epsilon the cached path stays valid and nothing is recomputed
+	path_prewarmer.schedule(first, rooms(2, 0.11))
+	await path_prewarmer.wait()
+	assert computed == [('a', 1), ('unknown', 2)]
+
+	# Cheaper rooms off the cached route can make another route faster
+	path_prewarmer.schedule(first, rooms(3, 0.01))
+	await path_prewarmer.wait()
+
+	assert sorted(computed[2:]) == [('a', 3), ('unknown', 3)]
+	assert path_cache.stats()['warmed'] == 2
+	assert path_cache.stats()['hits'] == 0
+	assert path_prewarmer.stats()['errors'] == 2
+
+
+# Test: Only pairs that were computed successfully are counted as popular.
+@pytest.mark.asyncio
+async def test_failed_pairs_are_not_recorded(mocker):
+	async def fake_request_fastest_path(request, rooms, sensors):
+		if request.source == 'unknown':
+			raise HTTPException(status_code=400, detail=f"Room '{request.source}' is not valid.")
+		return {'fastest_path': [], 'distance': 0.0}
+
+	mocker.patch('app.services.pathfinding_service.request_fastest_path', side_effect=fake_request_fastest_path)
+	mocker.patch('app.services.pathfinding_service.topology_id', return_value='topology')
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'get_snapshot', return_value=rooms(1, 0.1))
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'get_snapshot', return_value=Snapshot({'sensors': []}, 1, 0))
+
+	await pathfinding_service.calculate_fastest_path(FrontendPathFindingRequest(source='a', target='b'))
+	with pytest.raises(HTTPException):
+		await pathfinding_service.calculate_fastest_path(FrontendPathFindingRequest(source='unknown', target='b'))
+	requests = [FrontendPathFindingRequest(source=source, target='c') for source in ('a', 'unknown')]
+	snapshot = rooms(1, 0.1)
+	[line async for line in pathfinding_service.fastest_path_batch(requests, snapshot, snapshot, concurrency=2)]
+
+	assert sorted(key for key, _ in path_prewarmer.popularity.top(10)) == [('a', 'b'), ('a', 'c')]
@@ -0,0 +1,212 @@
+import asyncio
+import itertools
+import random
+import pytest
+from fastapi import HTTPException
+from app.schemas.pathfinding_schema import DistanceMatrixRequest, FrontendPathFindingRequest
+from app.services import pathfinding_service
+from app.services.path_table import PathTable, PathTableBuilder
+from app.services.pathfinding_service import (
+	build_path_table,
+	calculate_distance_matrix,
+	local_fastest_path,
+	sensor_graph,
+	table_fastest_path,
+)
+from app.utils.snapshot_cache import Snapshot
+
+def grid(size: int, seed: int) -> tuple[Snapshot, Snapshot]:
+	"""A grid of rooms with doors between neighbours and random crowd factors."""
+	generator = random.Random(seed)
+	room_ids = {(x, y): f'room-{x}-{y}' for x, y in itertools.product(range(size), repeat=2)}
+	rooms = [
+		{
+			'id': room_id,
+			'name': room_id,
+			'type': 'EXHIBITION',
+			'crowd_factor': round(generator.uniform(0.1, 1.5), 3),
+			'occupants': 0,
+			'area': 10.0,
+			'popularity_factor': 1.0,
+			'floor': 1,
+			'longitude': 12.0,
+			'latitude': 55.0,
+			'borders': [],
+		}
+		for room_id in room_ids.values()
+	]
+	sensors = []
+	for (x, y), room_id in room_ids.items():
+		for dx, dy in ((1, 0), (0, 1)):
+			neighbour = room_ids.get((x + dx, y + dy))
+			if neighbour:
+				sensors.append({
+					'id': f'door-{x}-{y}-{dx}{dy}',
+					'rooms': [room_id, neighbour],
+					'latitude': 55.0 + (x + dx / 2) * 1e-4 + generator.uniform(-1e-5, 1e-5),
+					'longitude': 12.0 + (y + dy / 2) * 1e-4 + generator.uniform(-1e-5, 1e-5),
+					'is_vertical': False,
+				})
+	return Snapshot({'rooms': rooms}, 1, 0), Snapshot({'sensors': sensors}, 1, 0)
+
+
+def table_for(rooms: Snapshot, sensors: Snapshot) -> PathTable:
+	return build_path_table(rooms, sensors)()
+
+
+def test_table_matches_fixture(topology):
+	fixture, rooms, sensors = topology
+	table = table_for(rooms, sensors)
+
+	for request in fixture['requests']:
+		result = table.fastest_path(request['source'], request['target'])
+		assert [sensor['id'] for sensor in result['fastest_path']] == request['response']['fastest_path']
+		assert result['distance'] == pytest.approx(request['response']['distance'], abs=0.01)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_table_matches_dijkstra_for_all_pairs(seed):
+	rooms, sensors = grid(5, seed)
+	table = table_for(rooms, sensors)
+	room_ids = [room['id'] for room in rooms.value['rooms']]
+
+	for source, target in itertools.product(room_ids, repeat=2):
+		expected = local_fastest_path(source, target, rooms, sensors)
+		result = table.fastest_path(source, target)
+		assert result['fastest_path'] == expected['fastest_path']
+		assert result['distance'] == pytest.approx(expected['distance'])
+
+
+def test_room_matrices(topology):
+	fixture, rooms, sensors = topology
+	table = table_for(rooms, sensors)
+	entrance = table.room_index[fixture['rooms'][0]['id']]
+	staircase_hall = table.room_index[fixture['rooms'][3]['id']]
+
+	assert table.room_costs().shape == (5, 5)
+	assert table.room_costs()[entrance, entrance] == 0
+	assert table.room_distances()[entrance, staircase_hall] == pytest.approx(222.39, abs=0.01)
+	assert table.room_costs()[entrance, staircase_hall] == pytest.approx(222.39 * 0.2, abs=0.01)
+
+
+def test_unknown_and_unreachable_rooms(topology):
+	fixture, rooms, sensors = topology
+	island = {**fixture['rooms'][0], 'id': 'island'}
+	island_door = {**fixture['sensors'][0], 'id': 'island-door', 'rooms': ['island']}
+	rooms = Snapshot({'rooms': fixture['rooms'] + [island]}, 2, 0)
+	sensors = Snapshot({'sensors': fixture['sensors'] + [island_door]}, 2, 0)
+	table = table_for(rooms, sensors)
+
+	assert table.fastest_path('unknown', 'island') is None
+	with pytest.raises(HTTPException) as e:
+		table.fastest_path(fixture['rooms'][0]['id'], 'island')
+	assert e.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_builder_rebuilds_once_after_changes_during_a_build(topology):
+	_, rooms, sensors = topology
+	builds = []
+
+	def build(rooms, sensors):
+		builds.append(rooms.version)
+		return build_path_table(rooms, sensors)
+
+	current = {'rooms': rooms}
+	builder = PathTableBuilder(lambda: (current['rooms'], sensors), build)
+
+	builder.schedule()
+	# Let the first build start
+	await asyncio.sleep(0)
+	for version in (2, 3):
+		current['rooms'] = Snapshot(rooms.value, version, 0)
+		builder.schedule()
+	await builder.wait()
+
+	assert builds == [1, 3]
+	assert builder.table.rooms_version == 3
+	assert builder.stats()['builds'] == 2
+
+
+@pytest.mark.asyncio
+async def test_table_mode_falls_back_to_local_until_table_is_built(mocker, topology):
+	fixture, rooms, sensors = topology
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'peek', return_value=rooms)
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'peek', return_value=sensors)
+	request = fixture['requests'][0]
+	path_request = FrontendPathFindingRequest(source=request['source'], target=request['target'])
+
+	local = table_fastest_path(path_request, rooms, sensors)
+	await pathfinding_service.path_table.wait()
+
+	assert pathfinding_service.path_table.table is not None
+	assert table_fastest_path(path_request, rooms, sensors) == local
+
+
+@pytest.mark.asyncio
+async def test_table_answers_are_audited(mocker, monkeypatch, topology):
+	fixture, rooms, sensors = topology
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'table_audit_rate', 1.0)
+	pathfinding_service.path_table.table = table_for(rooms, sensors)
+	request = fixture['requests'][0]
+	mocker.patch(
+		'app.services.pathfinding_service.forward_request',
+		return_value=({'fastest_path': [], 'distance': 0.0}, 200),
+	)
+
+	table_fastest_path(FrontendPathFindingRequest(source=request['source'], target=request['target']), rooms, sensors)
+	await asyncio.gather(*pathfinding_service._audits)
+
+	assert pathfinding_service.path_table.stats()['audits'] == 1
+	assert pathfinding_service.path_table.stats()['audit_mismatches'] == 1
+
+
+def test_graph_is_shared_with_local_engine(topology):
+	_, rooms, sensors = topology
+
+	assert table_for(rooms, sensors).graph is sensor_graph(rooms, sensors)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('with_table', [False, True])
+async def test_distance_matrix(mocker, topology, with_table):
+	fixture, rooms, sensors = topology
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'get_snapshot', return_value=rooms)
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'get_snapshot', return_value=sensors)
+	if with_table:
+		pathfinding_service.path_table.table = table_for(rooms, sensors)
+		# The table is current, so no Dijkstra runs
+		mocker.patch.object(pathfinding_service.SensorGraph, 'costs_from', side_effect=AssertionError)
+	entrance, _, _, staircase_hall, upstairs = (room['id'] for room in fixture['rooms'])
+
+	result = await calculate_distance_matrix(
+		DistanceMatrixRequest(sources=[entrance, staircase_hall], targets=[staircase_hall, upstairs, entrance])
+	)
+
+	assert result['sources'] == [entrance, staircase_hall]
+	assert result['costs'][0][0] == pytest.approx(222.39 * 0.2, abs=0.01)
+	assert result['costs'][1][0] == 0.0
+	assert result['costs'] == [
+		[round(float(cost), 3) for cost in row]
+		for row in table_for(rooms, sensors).room_costs()[[0, 3]][:, [3, 4, 0]]
+	]
+
+
+@pytest.mark.asyncio
+async def test_distance_matrix_unknown_and_unreachable_rooms(mocker, topology):
+	fixture, _, _ = topology
+	island = {**fixture['rooms'][0], 'id': 'island'}
+	island_door = {**fixture['sensors'][0], 'id': 'island-door', 'rooms': ['island']}
+	rooms = Snapshot({'rooms': fixture['rooms'] + [island]}, 2, 0)
+	sensors = Snapshot({'sensors': fixture['sensors'] + [island_door]}, 2, 0)
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'get_snapshot', return_value=rooms)
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'get_snapshot', return_value=sensors)
+	entrance = fixture['rooms'][0]['id']
+
+	result = await calculate_distance_matrix(DistanceMatrixRequest(sources=[entrance], targets=['island']))
+	assert result['costs'] == [[None]]
+
+	with pytest.raises(HTTPException) as e:
+		await calculate_distance_matrix(DistanceMatrixRequest(sources=[entrance], targets=['unknown', 'missing']))
+	assert e.value.status_code == 400
+	assert e.value.detail == 'Unknown rooms: unknown, missing.'
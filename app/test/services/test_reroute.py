@@ -0,0 +1,121 @@
+import time
+import pytest
+from fastapi import HTTPException
+from app.schemas.pathfinding_schema import RerouteRequest
+from app.services import pathfinding_service
+from app.services.pathfinding_service import local_fastest_path, path_tokens, remaining_path, reroute_fastest_path
+from app.utils.path_tokens import PathTokens
+from app.utils.snapshot_cache import Snapshot
+
+ENTRANCE, CROWDED_HALL, QUIET_HALL, STAIRCASE_HALL, UPSTAIRS = (f'67e52c913161b5df7189df1{i}' for i in range(5))
+
+
+@pytest.fixture
+def route(mocker, monkeypatch, topology):
+	"""A path through the fixture topology in local mode, with the crowd of rooms changeable through `crowd`."""
+	_, rooms, sensors = topology
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'mode', 'local')
+	state = {'rooms': rooms}
+
+	def crowd(room_id: str, crowd_factor: float) -> None:
+		current = state['rooms']
+		rooms = [{**room, 'crowd_factor': crowd_factor} if room['id'] == room_id else room for room in current.value['rooms']]
+		state['rooms'] = Snapshot({'rooms': rooms}, current.version + 1, time.monotonic())
+
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'get_snapshot', side_effect=lambda: state['rooms'])
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'get_snapshot', return_value=sensors)
+	path = local_fastest_path(ENTRANCE, STAIRCASE_HALL, state['rooms'], sensors)
+	return path, crowd
+
+
+def test_remaining_path(route):
+	path, _ = route
+	sensors = path['fastest_path']
+
+	assert remaining_path(sensors, ENTRANCE, STAIRCASE_HALL) == sensors
+	assert remaining_path(sensors, QUIET_HALL, STAIRCASE_HALL) == sensors[1:]
+	assert remaining_path(sensors, STAIRCASE_HALL, STAIRCASE_HALL) == []
+	assert remaining_path(sensors, CROWDED_HALL, STAIRCASE_HALL) is None
+
+
+@pytest.mark.asyncio
+async def test_unchanged_while_crowd_stays_within_threshold(mocker, route):
+	path, crowd = route
+	compute = mocker.spy(pathfinding_service, 'request_fastest_path')
+	token = path_tokens.issue(STAIRCASE_HALL, path)
+	# Off the remaining route, and a small change on it
+	crowd(ENTRANCE, 1.5)
+	crowd(QUIET_HALL, 0.22)
+
+	result, new_token = await reroute_fastest_path(RerouteRequest(position=QUIET_HALL, threshold=0.05), token)
+
+	assert result == {'status': 'unchanged'}
+	assert new_token == token
+	compute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reroutes_from_position_when_remaining_route_gets_crowded(route):
+	path, crowd = route
+	crowd(QUIET_HALL, 1.5)
+
+	result, token = await reroute_fastest_path(
+		RerouteRequest(position=ENTRANCE, target=STAIRCASE_HALL, path=path, threshold=0.05)
+	)
+
+	assert result['status'] == 'rerouted'
+	assert [sensor['id'] for sensor in result['fastest_path']] == ['67e52c913161b5df7189df20', '67e52c913161b5df7189df21']
+	assert [sensor['id'] for sensor in path_tokens.get(token)[1]['fastest_path']] == [sensor['id'] for sensor in result['fastest_path']]
+
+
+@pytest.mark.asyncio
+async def test_reroutes_visitors_who_left_the_path(route):
+	path, _ = route
+
+	result, _ = await reroute_fastest_path(RerouteRequest(position=CROWDED_HALL, target=STAIRCASE_HALL, path=path))
+
+	assert result['status'] == 'rerouted'
+	assert [sensor['id'] for sensor in result['fastest_path']] == ['67e52c913161b5df7189df21']
+
+
+@pytest.mark.asyncio
+async def test_unchanged_at_target(route):
+	path, crowd = route
+	crowd(QUIET_HALL, 1.5)
+
+	result, _ = await reroute_fastest_path(RerouteRequest(position=STAIRCASE_HALL, target=STAIRCASE_HALL, path=path))
+
+	assert result == {'status': 'unchanged'}
+
+
+# Test: Tokens carry what re-routing needs, so any instance with the same secret accepts them.
+def test_tokens_are_verified_without_state(route):
+	path, _ = route
+	token = PathTokens(b'shared secret').issue(STAIRCASE_HALL, path)
+
+	target, decoded = PathTokens(b'shared secret').get(token)
+
+	assert target == STAIRCASE_HALL
+	assert decoded['fastest_path'] == [
+		{'id': sensor['id'], 'rooms': [{'id': room['id'], 'crowd_factor': room['crowd_factor']} for room in sensor['rooms']]}
+		for sensor in path['fastest_path']
+	]
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_and_missing_path(route):
+	path, _ = route
+	token = path_tokens.issue(STAIRCASE_HALL, path)
+	payload, _, signature = token.partition('.')
+	forged = PathTokens(b'other secret').issue(ENTRANCE, path).partition('.')[0]
+	# A signed payload that is not a path ('e30' is '{}') is rejected too
+	unreadable = f'e30.{path_tokens._sign("e30")}'
+	for invalid in ('garbage', f'{forged}.{signature}', f'{payload}.{signature[:-1]}', unreadable):
+		with pytest.raises(HTTPException) as e:
+			await reroute_fastest_path(RerouteRequest(position=ENTRANCE), invalid)
+		assert e.value.status_code == 404
+	assert path_tokens.stats()['rejected'] == 4
+
+	with pytest.raises(HTTPException) as e:
+		await reroute_fastest_path(RerouteRequest(position=ENTRANCE, target=STAIRCASE_HALL))
+	assert e.value.status_code == 400
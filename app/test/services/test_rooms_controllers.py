@@ -1,8 +1,16 @@
 import pytest
 from fastapi import HTTPException
-from app.services.rooms_controllers import get_all_rooms, get_room_by_id
+from app.services.rooms_controllers import (
+	get_all_rooms,
+	get_room_by_id,
+	room_geometry_payload,
+	room_occupancy_payload,
+	get_rooms_by_ids,
+	get_room_changes,
+)
 from app.schemas.room_response_schema import RoomModel, RoomListModel
 from app.test.factories.room_factory import RoomFactory
+from app.utils.room_sensor_fetch import rooms_snapshot
 
 
 @pytest.fixture
@@ -10,6 +18,12 @@ def mock_forward_request(mocker):
 	return mocker.patch('app.services.rooms_controllers.forward_request')
 
 
+@pytest.fixture
+def mock_snapshot_forward_request(mocker, monkeypatch):
+	monkeypatch.setattr('app.utils.room_sensor_fetch.SENSOR_SIM_PATH', 'http://mock-sensor-sim')
+	return mocker.patch('app.utils.room_sensor_fetch.forward_request')
+
+
 @pytest.fixture
 def mock_env(monkeypatch):
 	monkeypatch.setattr('app.services.rooms_controllers.SENSOR_SIM_PATH', 'http://mock-sensor-sim')
@@ -19,19 +33,31 @@ def mock_env(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_get_all_rooms(mock_env, mock_forward_request):
+async def test_get_all_rooms(mock_snapshot_forward_request):
 	mock_response = {'rooms': [room.to_dict() for room in [RoomFactory() for _ in range(10)]]}
-	mock_forward_request.return_value = (mock_response, 200)
+	mock_snapshot_forward_request.return_value = (mock_response, 200)
 
 	result = await get_all_rooms()
 
 	assert RoomListModel.model_validate(result) == RoomListModel.model_validate(mock_response)
-	mock_forward_request.assert_called_once_with('http://mock-sensor-sim/rooms', 'GET')
+	mock_snapshot_forward_request.assert_called_once_with('http://mock-sensor-sim/rooms', 'GET')
+
+
+@pytest.mark.asyncio
+async def test_get_all_rooms_served_from_snapshot(mock_snapshot_forward_request):
+	mock_response = {'rooms': [room.to_dict() for room in [RoomFactory() for _ in range(10)]]}
+	mock_snapshot_forward_request.return_value = (mock_response, 200)
+
+	await get_all_rooms()
+	result = await get_all_rooms()
+
+	assert result == mock_response
+	mock_snapshot_forward_request.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_get_all_rooms_invalid_response(mock_env, mock_forward_request):
-	mock_forward_request.return_value = ({'details': 'Invalid response'}, 500)
+async def test_get_all_rooms_invalid_response(mock_snapshot_forward_request):
+	mock_snapshot_forward_request.return_value = ({'details': 'Invalid response'}, 500)
 
 	with pytest.raises(HTTPException) as exc:
 		await get_all_rooms()
@@ -40,6 +66,39 @@ async def test_get_all_rooms_invalid_response(mock_env, mock_forward_request):
 	assert exc.value.detail == 'Invalid room data received from sensor simulation service'
 
 
+@pytest.mark.asyncio
+async def test_get_all_rooms_passes_upstream_error_through(mock_snapshot_forward_request):
+	mock_snapshot_forward_request.side_effect = HTTPException(status_code=503, detail='sensor-sim starting')
+
+	with pytest.raises(HTTPException) as exc:
+		await get_all_rooms()
+
+	assert exc.value.status_code == 503
+	assert exc.value.detail == 'sensor-sim starting'
+
+
+def test_room_geometry_payload():
+	rooms = [RoomFactory(id=room_id).to_dict() for room_id in ['67e52c913161b5df7189df14', '67e52c913161b5df7189df15']]
+
+	result = room_geometry_payload({'rooms': rooms})
+
+	assert [room['id'] for room in result['rooms']] == [room['id'] for room in rooms]
+	assert result['rooms'][0]['borders'] == rooms[0]['borders']
+	assert 'occupants' not in result['rooms'][0]
+
+
+def test_room_occupancy_payload():
+	room = RoomFactory(id='67e52c913161b5df7189df14', occupants=12, crowd_factor=0.4).to_dict()
+
+	result = room_occupancy_payload({'rooms': [room]})
+
+	assert result == {
+		'rooms': [
+			{'id': room['id'], 'crowd_factor': 0.4, 'popularity_factor': room['popularity_factor'], 'occupants': 12}
+		]
+	}
+
+
 @pytest.mark.asyncio
 async def test_get_room_by_id(mock_env, mock_forward_request):
 	room_id = '67e52c913161b5df7189df14'
@@ -53,6 +112,33 @@ async def test_get_room_by_id(mock_env, mock_forward_request):
 	mock_forward_request.assert_called_once_with(f'http://mock-sensor-sim/rooms/{room_id}', 'GET')
 
 
+@pytest.mark.asyncio
+async def test_get_room_by_id_from_snapshot(mock_env, mock_forward_request, mock_snapshot_forward_request):
+	room_id = '67e52c913161b5df7189df14'
+	rooms = [RoomFactory(id=room_id).to_dict(), RoomFactory(id='67e52c913161b5df7189df15').to_dict()]
+	mock_snapshot_forward_request.return_value = ({'rooms': rooms}, 200)
+	await get_all_rooms()
+
+	result = await get_room_by_id(room_id)
+
+	assert result['id'] == room_id
+	assert RoomModel.model_validate(result) == RoomModel.model_validate(rooms[0])
+	mock_forward_request.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_room_by_id_snapshot_miss(mock_env, mock_forward_request, mock_snapshot_forward_request):
+	room_id = '67e52c913161b5df7189df14'
+	mock_snapshot_forward_request.return_value = ({'rooms': [RoomFactory(id='67e52c913161b5df7189df15').to_dict()]}, 200)
+	await get_all_rooms()
+	mock_forward_request.return_value = (RoomFactory(id=room_id).to_dict(), 200)
+
+	result = await get_room_by_id(room_id)
+
+	assert result['id'] == room_id
+	mock_forward_request.assert_called_once_with(f'http://mock-sensor-sim/rooms/{room_id}', 'GET')
+
+
 @pytest.mark.asyncio
 async def test_get_room_by_id_invalid_response(mock_env, mock_forward_request):
 	mock_forward_request.return_value = ({'details': 'This is an error'}, 500)
@@ -62,3 +148,53 @@ async def test_get_room_by_id_invalid_response(mock_env, mock_forward_request):
 
 	assert exc.value.status_code == 500
 	assert exc.value.detail == 'Invalid room data received from sensor simulation service'
+
+
+@pytest.mark.asyncio
+async def test_get_rooms_by_ids(mock_forward_request, mock_snapshot_forward_request):
+	ids = ['67e52c913161b5df7189df14', '67e52c913161b5df7189df15', '67e52c913161b5df7189df16']
+	rooms = [RoomFactory(id=room_id, name=f'Room {i}').to_dict() for i, room_id in enumerate(ids)]
+	mock_snapshot_forward_request.return_value = ({'rooms': rooms}, 200)
+
+	result = await get_rooms_by_ids([ids[2], 'unknown', ids[0], ids[2]], ['name', 'crowd_factor'])
+
+	assert result == {
+		'rooms': [
+			{'id': ids[2], 'name': 'Room 2', 'crowd_factor': rooms[2]['crowd_factor']},
+			{'id': ids[0], 'name': 'Room 0', 'crowd_factor': rooms[0]['crowd_factor']},
+		],
+		'missing': ['unknown'],
+	}
+	mock_snapshot_forward_request.assert_called_once()
+	mock_forward_request.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_rooms_by_ids_without_projection(mock_snapshot_forward_request):
+	room = RoomFactory(id='67e52c913161b5df7189df14').to_dict()
+	mock_snapshot_forward_request.return_value = ({'rooms': [room]}, 200)
+
+	result = await get_rooms_by_ids([room['id']])
+
+	assert RoomModel.model_validate(result['rooms'][0]) == RoomModel.model_validate(room)
+	assert result['missing'] == []
+
+
+@pytest.mark.asyncio
+async def test_get_room_changes(mock_snapshot_forward_request):
+	rooms = [RoomFactory(id=room_id).to_dict() for room_id in ['67e52c913161b5df7189df14', '67e52c913161b5df7189df15']]
+	mock_snapshot_forward_request.return_value = ({'rooms': rooms}, 200)
+	first = await get_room_changes(None)
+	assert first['resync'] is True
+	assert len(first['rooms']) == 2
+
+	changed = [{**rooms[0], 'occupants': 30}, rooms[1]]
+	mock_snapshot_forward_request.return_value = ({'rooms': changed}, 200)
+	await rooms_snapshot.refresh()
+
+	result = await get_room_changes(first['version'])
+	assert result['resync'] is False
+	epoch, _, version = first['version'].partition(':')
+	assert result['version'] == f'{epoch}:{int(version) + 1}'
+	assert [room['id'] for room in result['rooms']] == [rooms[0]['id']]
+	assert result['rooms'][0]['occupants'] == 30
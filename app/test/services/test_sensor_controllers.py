@@ -1,10 +1,17 @@
 import pytest
 from fastapi import HTTPException
-from app.services.sensor_controllers import get_all_sensors, get_sensor_by_id
+from app.services.sensor_controllers import get_all_sensors, get_sensor_by_id, get_sensors_by_ids
 from app.schemas.sensor_response_schema import SensorModel, SensorListModel
 from app.test.factories.sensor_factory import SensorFactory
 
 
+# Mocking the snapshot loader's environment and forward_request
+@pytest.fixture
+def mock_snapshot_forward_request(mocker, monkeypatch):
+	monkeypatch.setattr('app.utils.room_sensor_fetch.SENSOR_SIM_PATH', 'http://mock-sensor-sim')
+	return mocker.patch('app.utils.room_sensor_fetch.forward_request')
+
+
 # Mocking the environment variables
 @pytest.fixture
 def mock_env(monkeypatch):
@@ -22,21 +29,34 @@ def mock_forward_request(mocker):
 
 # Test for getting all sensors
 @pytest.mark.asyncio
-async def test_get_all_sensors(mock_env, mock_forward_request):
+async def test_get_all_sensors(mock_snapshot_forward_request):
 	mock_response = {'sensors': [sensor.to_dict() for sensor in [SensorFactory() for _ in range(10)]]}
-	mock_forward_request.return_value = (mock_response, 200)
+	mock_snapshot_forward_request.return_value = (mock_response, 200)
 
 	result = await get_all_sensors()
 
 	assert SensorListModel.model_validate(result)
 	assert result == mock_response
-	mock_forward_request.assert_called_once_with('http://mock-sensor-sim/sensors', 'GET')
+	mock_snapshot_forward_request.assert_called_once_with('http://mock-sensor-sim/sensors', 'GET')
+
+
+# Test that repeated calls are served from the snapshot cache
+@pytest.mark.asyncio
+async def test_get_all_sensors_served_from_snapshot(mock_snapshot_forward_request):
+	mock_response = {'sensors': [sensor.to_dict() for sensor in [SensorFactory() for _ in range(10)]]}
+	mock_snapshot_forward_request.return_value = (mock_response, 200)
+
+	await get_all_sensors()
+	result = await get_all_sensors()
+
+	assert result == mock_response
+	mock_snapshot_forward_request.assert_called_once()
 
 
 # Test for handling invalid response when getting all sensors
 @pytest.mark.asyncio
-async def test_get_all_sensors_invalid_response(mock_env, mock_forward_request):
-	mock_forward_request.return_value = ({'details': 'Invalid response'}, 500)
+async def test_get_all_sensors_invalid_response(mock_snapshot_forward_request):
+	mock_snapshot_forward_request.return_value = ({'details': 'Invalid response'}, 500)
 
 	with pytest.raises(HTTPException) as exc:
 		await get_all_sensors()
@@ -61,6 +81,20 @@ async def test_get_sensor_by_id(mock_env, mock_forward_request):
 	)
 
 
+# Test that a sensor in the snapshot is served without an upstream call
+@pytest.mark.asyncio
+async def test_get_sensor_by_id_from_snapshot(mock_env, mock_forward_request, mock_snapshot_forward_request):
+	sensor_id = '67e52c913161b5df7189df14'
+	mock_sensor = SensorFactory(id=sensor_id).to_dict()
+	mock_snapshot_forward_request.return_value = ({'sensors': [mock_sensor]}, 200)
+	await get_all_sensors()
+
+	result = await get_sensor_by_id(sensor_id)
+
+	assert result == mock_sensor
+	mock_forward_request.assert_not_called()
+
+
 # Test for handling invalid response when getting a sensor by ID
 @pytest.mark.asyncio
 async def test_get_sensor_by_id_invalid_response(mock_env, mock_forward_request):
@@ -71,3 +105,16 @@ async def test_get_sensor_by_id_invalid_response(mock_env, mock_forward_request)
 
 	assert exc.value.status_code == 404
 	assert exc.value.detail == 'Invalid room data received from sensor simulation service'
+
+
+# Test for getting several sensors at once from the snapshot
+@pytest.mark.asyncio
+async def test_get_sensors_by_ids(mock_forward_request, mock_snapshot_forward_request):
+	sensors = [SensorFactory(id=sensor_id).to_dict() for sensor_id in ['67e52c913161b5df7189df14', '67e52c913161b5df7189df15']]
+	mock_snapshot_forward_request.return_value = ({'sensors': sensors}, 200)
+
+	result = await get_sensors_by_ids([sensors[1]['id'], 'unknown'], ['rooms'])
+
+	assert result == {'sensors': [{'id': sensors[1]['id'], 'rooms': sensors[1]['rooms']}], 'missing': ['unknown']}
+	mock_snapshot_forward_request.assert_called_once()
+	mock_forward_request.assert_not_called()
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import HTTPException
+from app.schemas.pathfinding_schema import FrontendPathFindingRequest
+from app.services import pathfinding_service
+from app.services.topology_session import TopologySession, topology_id
+from app.test.factories.room_factory import RoomFactory
+from app.test.factories.sensor_factory import SensorFactory
+from app.utils.snapshot_cache import Snapshot
+
+ROOM_IDS = ['67e52c913161b5df7189df14', '67e52c913161b5df7189df15']
+
+
+@pytest.fixture
+def rooms():
+	return Snapshot({'rooms': [RoomFactory(id=room_id).to_dict() for room_id in ROOM_IDS]}, 1, 0)
+
+
+@pytest.fixture
+def sensors():
+	return Snapshot({'sensors': [SensorFactory().to_dict()]}, 1, 0)
+
+
+def next_rooms(rooms: Snapshot, version: int, **changes) -> Snapshot:
+	return Snapshot({'rooms': [{**rooms.value['rooms'][0], **changes}, rooms.value['rooms'][1]]}, version, 0)
+
+
+@pytest.fixture
+def session():
+	return TopologySession('http://mock-pathfinding', max_versions=2, retry_after=300)
+
+
+@pytest.fixture
+def mock_forward_request(mocker):
+	return mocker.patch('app.services.topology_session.forward_request', return_value=({}, 200))
+
+
+def test_topology_id_ignores_occupancy(rooms, sensors):
+	assert topology_id(rooms, sensors) == topology_id(next_rooms(rooms, 2, occupants=99), sensors)
+	assert topology_id(rooms, sensors) != topology_id(next_rooms(rooms, 3, floor=2), sensors)
+
+
+@pytest.mark.asyncio
+async def test_topology_is_registered_once(session, rooms, sensors, mock_forward_request):
+	fields = {'source_room': 'a', 'target_room': 'b'}
+
+	first = await session.body(fields, rooms, sensors)
+	second = await session.body(fields, next_rooms(rooms, 2, occupants=99), sensors)
+
+	mock_forward_request.assert_called_once()
+	registration = mock_forward_request.call_args.kwargs['body']
+	assert registration['topology_id'] == first['topology_id']
+	assert registration['rooms'] == rooms.value['rooms']
+	assert first == {**fields, 'topology_id': first['topology_id'], 'weights': []}
+	assert second['topology_id'] == first['topology_id']
+	assert second['weights'] == [
+		{'id': ROOM_IDS[0], 'crowd_factor': 0.9, 'popularity_factor': 1.1, 'occupants': 99}
+	]
+	assert 'rooms' not in second
+	assert session.stats()['compact_requests'] == 2
+
+
+@pytest.mark.asyncio
+async def test_refused_registration_falls_back_to_full_body(session, rooms, sensors, mock_forward_request):
+	mock_forward_request.side_effect = HTTPException(status_code=404, detail='Not Found')
+
+	first = await session.body({'source_room': 'a'}, rooms, sensors)
+	second = await session.body({'source_room': 'a'}, rooms, sensors)
+
+	assert first == {'source_room': 'a', 'rooms': rooms.value['rooms'], 'sensors': sensors.value['sensors']}
+	assert second == first
+	mock_forward_request.assert_called_once()
+	assert session.stats()['fallbacks'] == 2
+
+
+@pytest.mark.asyncio
+async def test_forgotten_topology_is_registered_again(session, rooms, sensors, mock_forward_request):
+	body = await session.body({}, rooms, sensors)
+
+	assert session.forget(body)
+	assert not session.forget({'rooms': []})
+	await session.body({}, rooms, sensors)
+
+	assert mock_forward_request.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_fastest_path_resends_full_body_for_unknown_topology(mocker, monkeypatch, rooms, sensors):
+	monkeypatch.setitem(pathfinding_service.TOPOLOGY_SESSION_SETTINGS, 'enabled', True)
+	pathfinding_service.topology_session.clear()
+	mocker.patch.object(pathfinding_service.rooms_snapshot, 'get_snapshot', return_value=rooms)
+	mocker.patch.object(pathfinding_service.sensors_snapshot, 'get_snapshot', return_value=sensors)
+	mocker.patch('app.services.topology_session.forward_request', return_value=({}, 200))
+	mock_path_request = mocker.patch(
+		'app.services.pathfinding_service.forward_request',
+		side_effect=[HTTPException(status_code=409, detail='Unknown topology'), ({'fastest_path': []}, 200)],
+	)
+
+	result = await pathfinding_service.calculate_fastest_path(FrontendPathFindingRequest(source='a', target='b'))
+
+	assert result == {'fastest_path': []}
+	compact, full = [call.kwargs['body'] for call in mock_path_request.call_args_list]
+	assert 'topology_id' in compact
+	assert full['rooms'] == rooms.value['rooms']
+	assert pathfinding_service.topology_session.stats()['registered'] == []
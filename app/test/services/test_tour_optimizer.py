@@ -0,0 +1,125 @@
+import itertools
+import math
+import random
+import time
+import pytest
+from fastapi import HTTPException
+from app.services import pathfinding_service
+from app.services.pathfinding_service import optimized_tour, sensor_graph
+from app.services.tour_optimizer import held_karp, improve, nearest_neighbour, optimize_tour, tour_cost
+from app.utils.snapshot_cache import Snapshot
+
+
+def random_costs(size: int, seed: int) -> list[list[float]]:
+	generator = random.Random(seed)
+	return [[0.0 if i == j else generator.uniform(1, 10) for j in range(size)] for i in range(size)]
+
+
+def brute_force(costs: list[list[float]]) -> float:
+	return min(tour_cost(costs, list(order)) for order in itertools.permutations(range(1, len(costs))))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_held_karp_is_exact(seed):
+	costs = random_costs(random.Random(seed).randint(2, 7), seed)
+
+	order = held_karp(costs)
+
+	assert sorted(order) == list(range(1, len(costs)))
+	assert tour_cost(costs, order) == pytest.approx(brute_force(costs))
+
+
+def test_held_karp_without_targets():
+	assert held_karp([[0.0]]) == []
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_improve_never_makes_a_tour_worse(seed):
+	costs = random_costs(15, seed)
+	start = nearest_neighbour(costs)
+
+	order = improve(costs, start)
+
+	assert sorted(order) == list(range(1, 15))
+	assert tour_cost(costs, order) <= tour_cost(costs, start)
+
+
+def test_improve_untangles_a_crossing():
+	points = [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0)]
+	costs = [[math.dist(a, b) for b in points] for a in points]
+
+	assert improve(costs, [3, 2, 1, 4]) == [1, 2, 3, 4]
+
+
+def test_optimize_tour_uses_heuristic_beyond_exact_limit(mocker):
+	costs = random_costs(6, 1)
+	mock_held_karp = mocker.patch('app.services.tour_optimizer.held_karp')
+
+	assert sorted(optimize_tour(costs, exact_limit=2)) == [1, 2, 3, 4, 5]
+	mock_held_karp.assert_not_called()
+
+
+def test_optimize_tour_is_exact_up_to_exact_limit():
+	costs = random_costs(6, 1)
+
+	assert tour_cost(costs, optimize_tour(costs, exact_limit=5)) == pytest.approx(brute_force(costs))
+
+
+@pytest.fixture
+def topology(topology, monkeypatch):
+	"""The shared fixture topology in local mode, served as the current snapshots."""
+	_, rooms, sensors = topology
+	monkeypatch.setitem(pathfinding_service.PATHFINDING_SETTINGS, 'mode', 'local')
+	monkeypatch.setattr(pathfinding_service.rooms_snapshot, '_snapshot', rooms)
+	monkeypatch.setattr(pathfinding_service.sensors_snapshot, '_snapshot', sensors)
+	return topology
+
+
+@pytest.mark.asyncio
+async def test_optimized_tour_orders_targets_and_joins_legs(topology):
+	fixture, rooms, sensors = topology
+	entrance, crowded, quiet, staircase, upstairs = (room['id'] for room in fixture['rooms'])
+
+	result = await optimized_tour(entrance, [upstairs, quiet], rooms, sensors)
+
+	ab, bd, ac, cd, de = (sensor['id'] for sensor in fixture['sensors'])
+	assert [sensor['id'] for sensor in result['fastest_path']] == [ac, cd, de]
+	assert result['distance'] == pytest.approx(63.7756)
+
+
+@pytest.mark.asyncio
+async def test_legs_use_the_ordering_snapshots_and_are_not_recorded(mocker, monkeypatch, topology):
+	fixture, rooms, sensors = topology
+	entrance, crowded, quiet, staircase, upstairs = (room['id'] for room in fixture['rooms'])
+	monkeypatch.setitem(pathfinding_service.TOUR_SETTINGS, 'concurrency', 1)
+	# A newer snapshot published while the tour is computed must not be used for its legs
+	newer = Snapshot({'rooms': [{**room, 'crowd_factor': 5.0} for room in fixture['rooms']]}, 2, time.monotonic())
+	monkeypatch.setattr(pathfinding_service.rooms_snapshot, '_snapshot', newer)
+	compute = mocker.spy(pathfinding_service, 'request_fastest_path')
+	record = mocker.spy(pathfinding_service.path_prewarmer, 'record')
+
+	await optimized_tour(entrance, [upstairs, quiet], rooms, sensors)
+
+	assert compute.call_count == 2
+	assert all(call.args[1] is rooms and call.args[2] is sensors for call in compute.call_args_list)
+	record.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_leg_costs_are_memoized_per_snapshot(topology):
+	fixture, rooms, sensors = topology
+	entrance = fixture['rooms'][0]['id']
+
+	assert sensor_graph(rooms, sensors).costs_from(entrance) is sensor_graph(rooms, sensors).costs_from(entrance)
+	assert sensor_graph(rooms, sensors).costs_from(entrance)[entrance] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_optimized_tour_rejects_unknown_source(topology):
+	fixture, rooms, sensors = topology
+
+	with pytest.raises(HTTPException) as e:
+		await optimized_tour('invalid_source', [fixture['rooms'][1]['id']], rooms, sensors)
+
+	assert e.value.status_code == 400
+	assert e.value.detail == "Room 'invalid_source' in the tour is not valid."
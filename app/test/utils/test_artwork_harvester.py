@@ -0,0 +1,123 @@
+import asyncio
+import json
+import httpx
+import pytest
+from contextlib import asynccontextmanager
+from app.utils import artwork_harvester
+from app.utils.artwork_harvester import ArtworkHarvester, HarvestError, read_ndjson
+
+CATALOG = [{'object_number': f'KMS{index}'} for index in range(23)]
+
+
+@pytest.fixture
+def smk_api(monkeypatch):
+	"""
+	Serve CATALOG like the SMK search API. Later pages answer faster than earlier ones, and
+	`failures` makes requests for an offset fail with the given statuses first.
+	"""
+	api = {'requests': [], 'failures': {}}
+
+	async def handler(request: httpx.Request) -> httpx.Response:
+		params = request.url.params
+		offset, rows = int(params['offset']), int(params['rows'])
+		api['requests'].append(params)
+		await asyncio.sleep(0.01 * (len(CATALOG) - offset) / len(CATALOG))
+		failures = api['failures'].get(offset)
+		if failures:
+			return httpx.Response(failures.pop(0))
+		body = {'offset': offset, 'rows': rows, 'found': len(CATALOG), 'items': CATALOG[offset : offset + rows]}
+		if 'facets' in params:
+			body['facets'] = {'creator': ['Købke', 2]}
+		return httpx.Response(200, json=body)
+
+	@asynccontextmanager
+	async def fake_upstream_client(url):
+		async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+			yield client
+
+	monkeypatch.setattr(artwork_harvester, 'upstream_client', fake_upstream_client)
+	return api
+
+
+def harvester(tmp_path, **kwargs) -> ArtworkHarvester:
+	options = {'params': {'facets': ['creator']}, 'page_size': 5, 'concurrency': 3, 'retries': 2, 'backoff': 0, **kwargs}
+	return ArtworkHarvester(str(tmp_path / 'artworks.ndjson'), **options)
+
+
+@pytest.mark.asyncio
+async def test_harvest_writes_pages_in_order(smk_api, tmp_path):
+	harvest = harvester(tmp_path)
+
+	result = await harvest.run()
+
+	assert result == {'items': 23, 'found': 23, 'facets': {'creator': ['Købke', 2]}}
+	assert list(read_ndjson(harvest.output)) == CATALOG
+	assert sorted(int(params['offset']) for params in smk_api['requests']) == [0, 5, 10, 15, 20]
+	# Facets are only requested with the first page
+	assert [params.get_list('facets') for params in smk_api['requests']][1:] == [[]] * 4
+	assert not (tmp_path / 'artworks.ndjson.checkpoint').exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_are_retried(smk_api, tmp_path):
+	smk_api['failures'] = {10: [503, 429]}
+
+	result = await harvester(tmp_path).run()
+
+	assert result['items'] == 23
+	assert len(smk_api['requests']) == 7
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(smk_api, tmp_path):
+	smk_api['failures'] = {10: [400]}
+
+	with pytest.raises(httpx.HTTPStatusError):
+		await harvester(tmp_path).run()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_harvest_resumes(smk_api, tmp_path):
+	smk_api['failures'] = {15: [503, 503, 503]}
+	harvest = harvester(tmp_path)
+
+	with pytest.raises(HarvestError):
+		await harvest.run()
+	checkpoint = json.loads((tmp_path / 'artworks.ndjson.checkpoint').read_text())
+	assert checkpoint['next_page'] == 3
+	assert list(read_ndjson(harvest.output)) == CATALOG[:checkpoint['items']]
+
+	smk_api['requests'].clear()
+	result = await harvest.run()
+
+	assert result['items'] == 23
+	assert list(read_ndjson(harvest.output)) == CATALOG
+	assert sorted(int(params['offset']) for params in smk_api['requests']) == [15, 20]
+
+
+@pytest.mark.asyncio
+async def test_changed_parameters_start_over(smk_api, tmp_path):
+	smk_api['failures'] = {15: [503, 503, 503]}
+	with pytest.raises(HarvestError):
+		await harvester(tmp_path).run()
+
+	result = await harvester(tmp_path, page_size=10).run()
+
+	assert result['items'] == 23
+	assert list(read_ndjson(str(tmp_path / 'artworks.ndjson'))) == CATALOG
+
+
+@pytest.mark.asyncio
+async def test_expired_checkpoint_starts_over(smk_api, tmp_path, monkeypatch):
+	smk_api['failures'] = {15: [503, 503, 503]}
+	with pytest.raises(HarvestError):
+		await harvester(tmp_path, max_age=3600).run()
+
+	started = json.loads((tmp_path / 'artworks.ndjson.checkpoint').read_text())['started_at']
+	monkeypatch.setattr(artwork_harvester.time, 'time', lambda: started + 3601)
+	smk_api['requests'].clear()
+	result = await harvester(tmp_path, max_age=3600).run()
+
+	assert result['items'] == 23
+	assert list(read_ndjson(str(tmp_path / 'artworks.ndjson'))) == CATALOG
+	assert sorted(int(params['offset']) for params in smk_api['requests']) == [0, 5, 10, 15, 20]
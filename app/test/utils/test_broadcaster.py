@@ -0,0 +1,68 @@
+import pytest
+from app.utils.broadcaster import Broadcaster
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_to_all_subscribers():
+	broadcaster = Broadcaster(queue_size=4, max_overflows=1)
+	first = broadcaster.subscribe()
+	second = broadcaster.subscribe()
+
+	broadcaster.publish('update', lambda: 'resync')
+
+	assert await first.get() == 'update'
+	assert await second.get() == 'update'
+	assert broadcaster.subscriber_count() == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_backlog_is_coalesced():
+	broadcaster = Broadcaster(queue_size=2, max_overflows=3)
+	slow = broadcaster.subscribe()
+	fast = broadcaster.subscribe()
+	resync_calls = 0
+
+	def resync():
+		nonlocal resync_calls
+		resync_calls += 1
+		return 'resync'
+
+	for message in ['1', '2']:
+		broadcaster.publish(message, resync)
+		assert await fast.get() == message
+	broadcaster.publish('3', resync)
+
+	assert await fast.get() == '3'
+	assert await slow.get() == 'resync'
+	assert slow.queue.empty()
+	assert resync_calls == 1
+	assert broadcaster.coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_subscriber_overflowing_repeatedly_is_dropped():
+	broadcaster = Broadcaster(queue_size=1, max_overflows=1)
+	slow = broadcaster.subscribe()
+
+	for message in ['1', '2', '3']:
+		broadcaster.publish(message, lambda: 'resync')
+
+	assert await slow.get() is None
+	assert slow.closed
+	assert broadcaster.subscriber_count() == 0
+	assert broadcaster.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_and_close():
+	broadcaster = Broadcaster(queue_size=1, max_overflows=1)
+	gone = broadcaster.subscribe()
+	open_subscription = broadcaster.subscribe()
+
+	broadcaster.unsubscribe(gone)
+	broadcaster.publish('update', lambda: 'resync')
+	broadcaster.close()
+
+	assert gone.queue.empty()
+	assert await open_subscription.get() is None
+	assert broadcaster.subscriber_count() == 0
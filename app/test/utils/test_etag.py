@@ -0,0 +1,40 @@
+import time
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from app.schemas.sensor_response_schema import SensorListModel
+from app.utils.etag import JSONBody, etag_matches, snapshot_body
+from app.utils.snapshot_cache import Snapshot
+
+
+def make_request(if_none_match: str | None = None) -> Request:
+	headers = [(b'if-none-match', if_none_match.encode())] if if_none_match else []
+	return Request({'type': 'http', 'headers': headers})
+
+
+def test_etag_is_content_hash():
+	assert JSONBody(b'{"a":1}').etag == JSONBody(b'{"a":1}').etag
+	assert JSONBody(b'{"a":1}').etag != JSONBody(b'{"a":2}').etag
+	assert JSONBody(b'{}').etag.startswith('"')
+
+
+def test_etag_matches():
+	etag = JSONBody(b'{}').etag
+
+	assert not etag_matches(make_request(), etag)
+	assert not etag_matches(make_request('"other"'), etag)
+	assert etag_matches(make_request(etag), etag)
+	assert etag_matches(make_request(f'"other", W/{etag}'), etag)
+	assert etag_matches(make_request('*'), etag)
+
+
+def test_snapshot_body_is_serialized_once_per_version(mocker):
+	adapter = TypeAdapter(SensorListModel)
+	snapshot = Snapshot({'sensors': []}, 1, time.monotonic())
+	spy = mocker.spy(JSONBody, 'serialize')
+
+	first = snapshot_body(snapshot, adapter)
+	second = snapshot_body(snapshot, adapter)
+
+	assert first is second
+	assert first.content == b'{"sensors":[]}'
+	assert spy.call_count == 1
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 import httpx
 from fastapi import HTTPException
@@ -111,4 +112,57 @@ async def test_forward_request_error_no_detail(mocker):
 	with pytest.raises(HTTPException) as exc_info:
 		await forward_request("http://example.com", "GET")
 
-	assert exc_info.value.detail == {}
\ No newline at end of file
+	assert exc_info.value.detail == {}
+
+# A fake AsyncClient that counts the requests reaching the upstream.
+class FakeCountingAsyncClient:
+	calls = 0
+
+	async def request(self, method, target_url, params=None, json=None):
+		FakeCountingAsyncClient.calls += 1
+		await asyncio.sleep(0.01)
+		return FakeResponse({'url': target_url, 'params': params})
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_val, exc_tb):
+		pass
+
+
+@pytest.mark.asyncio
+async def test_forward_request_coalesces_identical_gets(monkeypatch):
+	FakeCountingAsyncClient.calls = 0
+	monkeypatch.setattr(httpx, 'AsyncClient', lambda: FakeCountingAsyncClient())
+
+	results = await asyncio.gather(
+		*[forward_request('http://example.com/rooms', 'GET', params={'a': 1}) for _ in range(5)]
+	)
+
+	assert FakeCountingAsyncClient.calls == 1
+	assert all(result == ({'url': 'http://example.com/rooms', 'params': {'a': 1}}, 200) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_forward_request_does_not_coalesce_different_params(monkeypatch):
+	FakeCountingAsyncClient.calls = 0
+	monkeypatch.setattr(httpx, 'AsyncClient', lambda: FakeCountingAsyncClient())
+
+	await asyncio.gather(
+		forward_request('http://example.com/rooms', 'GET', params={'a': 1}),
+		forward_request('http://example.com/rooms', 'GET', params={'a': 2}),
+	)
+
+	assert FakeCountingAsyncClient.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_forward_request_does_not_coalesce_posts(monkeypatch):
+	FakeCountingAsyncClient.calls = 0
+	monkeypatch.setattr(httpx, 'AsyncClient', lambda: FakeCountingAsyncClient())
+
+	await asyncio.gather(
+		*[forward_request('http://example.com/path', 'POST', body={'source': 'a'}) for _ in range(3)]
+	)
+
+	assert FakeCountingAsyncClient.calls == 3
@@ -0,0 +1,52 @@
+import pytest
+import pytest_asyncio
+import httpx
+from app.utils import http_clients
+from app.utils.http_clients import start_clients, close_clients, get_client, upstream_client
+
+
+@pytest_asyncio.fixture
+async def registry():
+	start_clients()
+	yield
+	await close_clients()
+
+
+@pytest.mark.asyncio
+async def test_get_client_reuses_pool_per_upstream(registry):
+	client = get_client('http://sensor-sim:8002/rooms')
+	assert client is get_client('http://sensor-sim:8002/sensors/123')
+	assert client is not get_client('http://pathfinding:8001/pathfinding/fastest-path')
+	assert client is not get_client('https://api.smk.dk/api/v1/art/search')
+
+
+@pytest.mark.asyncio
+async def test_upstream_client_uses_shared_pool(registry):
+	async with upstream_client('http://sensor-sim:8002/rooms') as client:
+		assert client is get_client('http://sensor-sim:8002')
+	assert not client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_close_clients_closes_pools():
+	start_clients()
+	client = get_client('http://sensor-sim:8002/rooms')
+	await close_clients()
+
+	assert client.is_closed
+	assert http_clients._clients == {}
+	with pytest.raises(RuntimeError, match='has not been started'):
+		get_client('http://sensor-sim:8002/rooms')
+
+
+@pytest.mark.asyncio
+async def test_upstream_client_without_registry_is_short_lived():
+	async with upstream_client('http://sensor-sim:8002/rooms') as client:
+		assert isinstance(client, httpx.AsyncClient)
+	assert client.is_closed
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+	monkeypatch.setitem(http_clients.HTTP_CLIENT_SETTINGS, 'http2', True)
+	monkeypatch.setattr(http_clients.importlib.util, 'find_spec', lambda name: None)
+	assert http_clients._http2_enabled() is False
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from app.utils.path_cache import PathCache
+from app.utils.snapshot_cache import Snapshot
+
+
+def rooms(version: int, **crowd: float) -> Snapshot:
+	factors = {'a': 0.5, 'b': 0.5, 'c': 0.5, **crowd}
+	return Snapshot({'rooms': [{'id': room_id, 'crowd_factor': factor} for room_id, factor in factors.items()]}, version, 0)
+
+
+class FakePathfinding:
+	def __init__(self):
+		self.calls = 0
+
+	async def __call__(self):
+		self.calls += 1
+		await asyncio.sleep(0)
+		return {'route': ['a', 'b'], 'call': self.calls}
+
+
+@pytest.fixture
+def cache():
+	return PathCache(max_size=2, epsilon=0.1, route=lambda path: path['route'])
+
+
+@pytest.fixture
+def pathfinding():
+	return FakePathfinding()
+
+
+@pytest.mark.asyncio
+async def test_same_version_is_served_from_cache(cache, pathfinding):
+	snapshot = rooms(1)
+
+	first = await cache.get(('a', 'b'), snapshot, 'topology', pathfinding)
+	second = await cache.get(('a', 'b'), snapshot, 'topology', pathfinding)
+
+	assert first is second
+	assert pathfinding.calls == 1
+	assert cache.stats()['hit_ratio'] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_small_crowd_changes_keep_the_entry(cache, pathfinding):
+	await cache.get(('a', 'b'), rooms(1), 'topology', pathfinding)
+
+	# On the route within epsilon, off the route more crowded
+	await cache.get(('a', 'b'), rooms(2, a=0.55, c=0.9), 'topology', pathfinding)
+	# Drift is measured against the crowd the path was computed with
+	await cache.get(('a', 'b'), rooms(3, a=0.59), 'topology', pathfinding)
+
+	assert pathfinding.calls == 1
+	assert cache.stats()['invalidations'] == 0
+
+
+@pytest.mark.parametrize(
+	'crowd, topology',
+	[
+		({'a': 0.7}, 'topology'),
+		({'b': 0.3}, 'topology'),
+		({'c': 0.3}, 'topology'),
+		({}, 'changed-topology'),
+	],
+)
+@pytest.mark.asyncio
+async def test_large_changes_invalidate_the_entry(cache, pathfinding, crowd, topology):
+	await cache.get(('a', 'b'), rooms(1), 'topology', pathfinding)
+
+	path = await cache.get(('a', 'b'), rooms(2, **crowd), topology, pathfinding)
+
+	assert path['call'] == 2
+	assert cache.stats()['invalidations'] == 1
+
+
+# Test: A sensors change alone (same rooms version) still invalidates the entry.
+@pytest.mark.asyncio
+async def test_topology_change_at_same_rooms_version_invalidates_the_entry(cache, pathfinding):
+	snapshot = rooms(1)
+	await cache.get(('a', 'b'), snapshot, 'topology', pathfinding)
+
+	path = await cache.get(('a', 'b'), snapshot, 'changed-topology', pathfinding)
+
+	assert path['call'] == 2
+	assert cache.stats()['invalidations'] == 1
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted(cache, pathfinding):
+	snapshot = rooms(1)
+	for key in [('a', 'b'), ('a', 'c'), ('a', 'b'), ('b', 'c')]:
+		await cache.get(key, snapshot, 'topology', pathfinding)
+
+	await cache.get(('a', 'b'), snapshot, 'topology', pathfinding)
+	await cache.get(('a', 'c'), snapshot, 'topology', pathfinding)
+
+	assert pathfinding.calls == 4
+	assert cache.stats()['size'] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_computation(cache, pathfinding):
+	snapshot = rooms(1)
+
+	results = await asyncio.gather(*[cache.get(('a', 'b'), snapshot, 'topology', pathfinding) for _ in range(5)])
+
+	assert pathfinding.calls == 1
+	assert all(result is results[0] for result in results)
+	assert cache.stats()['coalesced'] == 4
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(cache, pathfinding):
+	async def failing():
+		raise RuntimeError('pathfinding down')
+
+	with pytest.raises(RuntimeError):
+		await cache.get(('a', 'b'), rooms(1), 'topology', failing)
+	await cache.get(('a', 'b'), rooms(1), 'topology', pathfinding)
+
+	assert pathfinding.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_always_computes(pathfinding):
+	cache = PathCache(max_size=0, epsilon=0.1, route=lambda path: path['route'])
+
+	await cache.get(('a', 'b'), rooms(1), 'topology', pathfinding)
+	await cache.get(('a', 'b'), rooms(1), 'topology', pathfinding)
+
+	assert pathfinding.calls == 2
@@ -0,0 +1,67 @@
+import pytest
+from app.schemas.pathfinding_schema import CompactPathModel
+from app.utils.path_encoding import COMPACT_PATH_MEDIA_TYPE, compact_path, decode_polyline, encode_polyline, path_format
+
+
+def room(room_id: str) -> dict:
+	return {
+		'id': room_id,
+		'name': room_id,
+		'crowd_factor': 0.3,
+		'occupants': 1,
+		'area': 10.0,
+		'popularity_factor': 1.0,
+		'floor': 1,
+	}
+
+
+PATH = {
+	'fastest_path': [
+		{'id': 's1', 'rooms': [room('a'), room('b')], 'latitude': 55.676101, 'longitude': 12.568301, 'is_vertical': False},
+		{'id': 's2', 'rooms': [room('b'), room('c')], 'latitude': 55.676201, 'longitude': 12.568251, 'is_vertical': True},
+	],
+	'distance': 12.5,
+}
+
+
+def test_polyline_matches_reference_encoding():
+	# Example from the Encoded Polyline Algorithm Format documentation
+	points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+	assert encode_polyline(points, precision=5) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+	assert decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@', precision=5) == points
+
+
+def test_compact_path_deduplicates_rooms():
+	compact = compact_path(PATH)
+
+	CompactPathModel.model_validate(compact)
+	assert [room['id'] for room in compact['rooms']] == ['a', 'b', 'c']
+	assert [sensor['rooms'] for sensor in compact['sensors']] == [[0, 1], [1, 2]]
+	assert compact['coordinates'] == [[55.676101, 12.568301], [55.676201, 12.568251]]
+	assert compact['distance'] == 12.5
+
+
+def test_compact_path_with_polyline():
+	compact = compact_path(PATH, polyline=True)
+
+	assert 'coordinates' not in compact
+	assert decode_polyline(compact['polyline']) == [(55.676101, 12.568301), (55.676201, 12.568251)]
+
+
+@pytest.mark.parametrize(
+	'format, coordinates, accept, expected',
+	[
+		(None, None, None, 'full'),
+		(None, None, 'application/json', 'full'),
+		('compact', None, None, 'compact'),
+		('compact', 'polyline', None, 'polyline'),
+		('full', None, COMPACT_PATH_MEDIA_TYPE, 'full'),
+		(None, None, f'application/json, {COMPACT_PATH_MEDIA_TYPE}', 'compact'),
+		(None, None, f'{COMPACT_PATH_MEDIA_TYPE}; coordinates=polyline', 'polyline'),
+		(None, 'list', f'{COMPACT_PATH_MEDIA_TYPE}; coordinates=polyline', 'compact'),
+		(None, 'polyline', None, 'full'),
+	],
+)
+def test_path_format(format, coordinates, accept, expected):
+	assert path_format(format, coordinates, accept) == expected
@@ -0,0 +1,53 @@
+import pytest
+from app.utils.popularity import DecayingTopK
+
+
+def test_top_keys_by_count():
+	sketch = DecayingTopK(capacity=10, half_life=60)
+	for key, count in (('a', 5), ('b', 1), ('c', 3)):
+		for _ in range(count):
+			sketch.record(key, now=0)
+
+	top = sketch.top(2, now=0)
+
+	assert [key for key, _ in top] == ['a', 'c']
+	assert top[0][1] == pytest.approx(5)
+
+
+def test_counts_halve_every_half_life():
+	sketch = DecayingTopK(capacity=10, half_life=60)
+	sketch.clear()
+	origin = sketch._origin
+	for _ in range(4):
+		sketch.record('old', now=origin)
+	for _ in range(3):
+		sketch.record('new', now=origin + 120)
+
+	top = dict(sketch.top(2, now=origin + 120))
+
+	assert top['old'] == pytest.approx(1)
+	assert top['new'] == pytest.approx(3)
+
+
+def test_frequent_keys_survive_eviction():
+	sketch = DecayingTopK(capacity=3, half_life=60)
+	for _ in range(50):
+		sketch.record('hot', now=0)
+	for index in range(100):
+		sketch.record(f'cold-{index}', now=0)
+
+	assert len(sketch) == 3
+	assert sketch.top(1, now=0)[0][0] == 'hot'
+
+
+def test_rescales_without_overflow():
+	sketch = DecayingTopK(capacity=3, half_life=1)
+	origin = sketch._origin
+	sketch.record('a', now=origin)
+	sketch.record('a', now=origin + 1000)
+	sketch.record('b', now=origin + 1000)
+
+	top = dict(sketch.top(2, now=origin + 1000))
+
+	assert top['a'] == pytest.approx(1)
+	assert top['b'] == pytest.approx(1)
@@ -0,0 +1,103 @@
+import time
+import pytest
+from app.utils.room_changes import RoomChangeLog
+from app.utils.snapshot_cache import Snapshot
+
+
+def room(room_id: str, occupants: int = 0, crowd_factor: float = 0.1) -> dict:
+	return {
+		'id': room_id,
+		'name': room_id,
+		'crowd_factor': crowd_factor,
+		'popularity_factor': 1.0,
+		'occupants': occupants,
+	}
+
+
+def snapshot(version: int, *rooms: dict) -> Snapshot:
+	return Snapshot({'rooms': list(rooms)}, version, time.monotonic())
+
+
+@pytest.fixture
+def log():
+	return RoomChangeLog(max_versions=3)
+
+
+def test_first_snapshot_requires_resync(log):
+	first = snapshot(1, room('a'), room('b'))
+	log.record(None, first)
+
+	assert log.since(None, first)['resync'] is True
+	assert [r['id'] for r in log.since('0', first)['rooms']] == ['a', 'b']
+	assert log.since(log.token(1), first) == {'version': log.token(1), 'resync': False, 'rooms': [], 'removed': []}
+
+
+def test_changes_since_version(log):
+	v1 = snapshot(1, room('a'), room('b'), room('c'))
+	v2 = snapshot(2, room('a', occupants=5), room('b'), room('c'))
+	v3 = snapshot(3, room('a', occupants=5), room('b', crowd_factor=0.9), room('c'))
+	log.record(None, v1)
+	log.record(v1, v2)
+	log.record(v2, v3)
+
+	assert [r['id'] for r in log.since(log.token(2), v3)['rooms']] == ['b']
+	result = log.since(log.token(1), v3)
+	assert result['version'] == log.token(3)
+	assert result['resync'] is False
+	assert [r['id'] for r in result['rooms']] == ['a', 'b']
+	assert result['rooms'][0] == {'id': 'a', 'crowd_factor': 0.1, 'popularity_factor': 1.0, 'occupants': 5}
+
+
+def test_added_and_removed_rooms(log):
+	v1 = snapshot(1, room('a'), room('b'))
+	v2 = snapshot(2, room('a'), room('c'))
+	log.record(None, v1)
+	log.record(v1, v2)
+
+	result = log.since(log.token(1), v2)
+	assert [r['id'] for r in result['rooms']] == ['c']
+	assert result['removed'] == ['b']
+
+
+def test_too_old_version_requires_resync(log):
+	versions = [snapshot(1, room('a'))]
+	log.record(None, versions[0])
+	for version in range(2, 7):
+		versions.append(snapshot(version, room('a', occupants=version)))
+		log.record(versions[-2], versions[-1])
+
+	current = versions[-1]
+	assert log.since(log.token(1), current)['resync'] is True
+	assert log.since(log.token(3), current)['resync'] is False
+	assert log.since(log.token(3), current)['rooms'][0]['occupants'] == 6
+
+
+def test_future_version_requires_resync(log):
+	first = snapshot(1, room('a'))
+	log.record(None, first)
+
+	assert log.since(log.token(7), first)['resync'] is True
+
+
+def test_versions_of_another_epoch_require_resync(log):
+	v1 = snapshot(1, room('a'))
+	v2 = snapshot(2, room('a', occupants=3))
+	log.record(None, v1)
+	old_token = log.token(1)
+
+	# After a restart the versions start over, so the same number means something else
+	log.record(None, v1)
+	log.record(v1, v2)
+
+	assert log.token(1) != old_token
+	assert log.since(old_token, v2)['resync'] is True
+	assert log.since(log.token(1), v2)['resync'] is False
+
+
+def test_unknown_versions_share_one_answer(log):
+	first = snapshot(1, room('a'))
+	log.record(None, first)
+
+	answers = [log.since(f'{log.epoch}:{version}', first) for version in range(2, 50)]
+	assert all(answer is answers[0] for answer in answers)
+	assert len(first._memo) == 1
@@ -0,0 +1,89 @@
+import bson
+import pytest
+from app.schemas.room_response_schema import RoomModel
+from app.test.factories.room_factory import RoomFactory
+from app.utils.room_geometry import GeometryCache, geometry, occupancy
+
+
+@pytest.fixture
+def rooms():
+	return [RoomFactory(id=str(bson.ObjectId()), name=f'Room {i}').to_dict() for i in range(3)]
+
+
+def test_merge_returns_full_rooms(rooms):
+	cache = GeometryCache(ttl=3600)
+
+	merged = cache.merge(rooms)
+
+	assert [RoomModel.model_validate(room).model_dump() for room in merged] == [
+		RoomModel.model_validate(room).model_dump() for room in rooms
+	]
+	assert 'crowd_factor' not in cache.get(rooms[0]['id'])
+
+
+def test_merge_validates_geometry_once(mocker, rooms):
+	cache = GeometryCache(ttl=3600)
+	spy = mocker.spy(RoomModel, 'model_validate')
+
+	cache.merge(rooms)
+	rooms[0]['crowd_factor'] = 0.1
+	rooms[0]['occupants'] = 42
+	merged = cache.merge(rooms)
+
+	assert spy.call_count == len(rooms)
+	assert merged[0]['crowd_factor'] == 0.1
+	assert merged[0]['occupants'] == 42
+	assert merged[0]['borders'] is cache.get(rooms[0]['id'])['borders']
+
+
+def test_merge_drops_removed_rooms(rooms):
+	cache = GeometryCache(ttl=3600)
+	cache.merge(rooms)
+
+	cache.merge(rooms[1:])
+
+	assert cache.get(rooms[0]['id']) is None
+	assert cache.get(rooms[1]['id']) is not None
+
+
+def test_merge_revalidates_geometry_after_ttl(mocker, rooms):
+	cache = GeometryCache(ttl=0)
+	spy = mocker.spy(RoomModel, 'model_validate')
+
+	cache.merge(rooms)
+	cache.merge(rooms)
+
+	assert spy.call_count == 2 * len(rooms)
+
+
+def test_merge_rejects_invalid_occupancy(rooms):
+	cache = GeometryCache(ttl=3600)
+	cache.merge(rooms)
+	rooms[0]['crowd_factor'] = 'very crowded'
+
+	with pytest.raises(ValueError):
+		cache.merge(rooms)
+
+
+def test_merge_rejects_invalid_geometry(rooms):
+	cache = GeometryCache(ttl=3600)
+	del rooms[0]['borders']
+
+	with pytest.raises(ValueError):
+		cache.merge(rooms)
+
+
+def test_geometry(rooms):
+	assert geometry(rooms[0]) == {
+		'id': rooms[0]['id'],
+		**{field: rooms[0][field] for field in ('name', 'type', 'area', 'longitude', 'latitude', 'floor', 'borders')},
+	}
+
+
+def test_occupancy(rooms):
+	assert occupancy(rooms[0]) == {
+		'id': rooms[0]['id'],
+		'crowd_factor': rooms[0]['crowd_factor'],
+		'popularity_factor': rooms[0]['popularity_factor'],
+		'occupants': rooms[0]['occupants'],
+	}
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+	flight = SingleFlight()
+	calls = 0
+
+	async def fetch():
+		nonlocal calls
+		calls += 1
+		await asyncio.sleep(0.01)
+		return {'rooms': []}
+
+	results = await asyncio.gather(*[flight.do('rooms', fetch) for _ in range(10)])
+
+	assert calls == 1
+	assert all(result is results[0] for result in results)
+	assert flight.executed == 1
+	assert flight.coalesced == 9
+	assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_coalesced():
+	flight = SingleFlight()
+
+	async def fetch(value):
+		await asyncio.sleep(0.01)
+		return value
+
+	results = await asyncio.gather(flight.do('a', lambda: fetch('a')), flight.do('b', lambda: fetch('b')))
+
+	assert results == ['a', 'b']
+	assert flight.executed == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_with_all_callers():
+	flight = SingleFlight()
+
+	async def fail():
+		await asyncio.sleep(0.01)
+		raise ValueError('upstream down')
+
+	results = await asyncio.gather(*[flight.do('rooms', fail) for _ in range(3)], return_exceptions=True)
+
+	assert all(isinstance(result, ValueError) for result in results)
+	assert flight.executed == 1
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_run_again():
+	flight = SingleFlight()
+	calls = 0
+
+	async def fetch():
+		nonlocal calls
+		calls += 1
+		return calls
+
+	assert await flight.do('rooms', fetch) == 1
+	assert await flight.do('rooms', fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+	flight = SingleFlight()
+
+	async def fetch():
+		await asyncio.sleep(0.02)
+		return 'done'
+
+	first = asyncio.create_task(flight.do('rooms', fetch))
+	second = asyncio.create_task(flight.do('rooms', fetch))
+	await asyncio.sleep(0)
+	first.cancel()
+
+	assert await second == 'done'
@@ -0,0 +1,192 @@
+import asyncio
+import pytest
+from app.utils.snapshot_cache import SnapshotCache
+
+
+class FakeLoader:
+	def __init__(self, fail: bool = False):
+		self.calls = 0
+		self.fail = fail
+
+	async def __call__(self):
+		self.calls += 1
+		await asyncio.sleep(0)
+		if self.fail:
+			raise RuntimeError('sensor-sim down')
+		return {'rooms': [], 'call': self.calls}
+
+
+def age_snapshot(cache: SnapshotCache, seconds: float):
+	cache._snapshot.fetched_at -= seconds
+
+
+@pytest.mark.asyncio
+async def test_fresh_snapshot_is_served_from_memory():
+	loader = FakeLoader()
+	cache = SnapshotCache('rooms', loader, ttl=10, max_stale=60)
+
+	first = await cache.get()
+	second = await cache.get()
+
+	assert first is second
+	assert loader.calls == 1
+	assert cache.stats()['hits'] == 1
+	assert cache.stats()['misses'] == 1
+	assert cache.stats()['hit_ratio'] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_served_while_revalidating():
+	loader = FakeLoader()
+	cache = SnapshotCache('rooms', loader, ttl=10, max_stale=60)
+	await cache.get()
+	age_snapshot(cache, 20)
+
+	stale = await cache.get()
+	assert stale['call'] == 1
+	await cache._background
+
+	assert loader.calls == 2
+	assert (await cache.get())['call'] == 2
+	assert cache.stats()['stale_hits'] == 1
+	assert cache.stats()['version'] == 2
+
+
+@pytest.mark.asyncio
+async def test_too_stale_snapshot_is_reloaded():
+	loader = FakeLoader()
+	cache = SnapshotCache('rooms', loader, ttl=10, max_stale=60)
+	await cache.get()
+	age_snapshot(cache, 120)
+
+	assert cache.peek() is None
+	assert (await cache.get())['call'] == 2
+	assert cache.stats()['misses'] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_keeps_stale_snapshot():
+	loader = FakeLoader()
+	cache = SnapshotCache('rooms', loader, ttl=10, max_stale=60)
+	await cache.get()
+	age_snapshot(cache, 20)
+	loader.fail = True
+
+	assert (await cache.get())['call'] == 1
+	await cache._background
+
+	assert cache.stats()['refresh_errors'] == 1
+	assert cache.peek().value['call'] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_load_without_snapshot_raises():
+	cache = SnapshotCache('rooms', FakeLoader(fail=True), ttl=10, max_stale=60)
+
+	with pytest.raises(RuntimeError, match='sensor-sim down'):
+		await cache.get()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+	loader = FakeLoader()
+	cache = SnapshotCache('rooms', loader, ttl=10, max_stale=60)
+
+	await asyncio.gather(*[cache.get() for _ in range(10)])
+
+	assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_refresher_keeps_snapshot_loaded():
+	loader = FakeLoader()
+	cache = SnapshotCache('rooms', loader, ttl=0.01, max_stale=60)
+
+	cache.start_refresher()
+	await asyncio.sleep(0.05)
+	await cache.stop_refresher()
+
+	assert loader.calls >= 2
+	assert cache.peek() is not None
+
+
+@pytest.mark.asyncio
+async def test_restored_snapshot_is_served_until_due():
+	loader = FakeLoader()
+	cache = SnapshotCache('filters', loader, ttl=0.05, max_stale=60)
+
+	restored = cache.restore({'rooms': [], 'call': 0}, age=0.03)
+	assert cache.restore({'rooms': [], 'call': -1}, age=0) is None
+	cache.start_refresher()
+	await asyncio.sleep(0)
+	assert (await cache.get())['call'] == 0
+	assert loader.calls == 0
+	await asyncio.sleep(0.04)
+	await cache.stop_refresher()
+
+	assert loader.calls == 1
+	assert cache.peek().version == restored.version + 1
+
+
+def test_stats_without_snapshot():
+	cache = SnapshotCache('rooms', FakeLoader(), ttl=10, max_stale=60)
+
+	stats = cache.stats()
+	assert stats['version'] is None
+	assert stats['age'] is None
+	assert stats['hit_ratio'] is None
+
+
+@pytest.mark.asyncio
+async def test_memo_is_computed_once_per_version():
+	cache = SnapshotCache('rooms', FakeLoader(), ttl=10, max_stale=60)
+	calls = 0
+
+	def count_rooms(value):
+		nonlocal calls
+		calls += 1
+		return len(value['rooms'])
+
+	snapshot = await cache.get_snapshot()
+	assert snapshot.memo('count', count_rooms) == 0
+	assert snapshot.memo('count', count_rooms) == 0
+	assert calls == 1
+
+	refreshed = await cache.refresh()
+	refreshed.memo('count', count_rooms)
+	assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_listeners_receive_previous_and_current_snapshot():
+	cache = SnapshotCache('rooms', FakeLoader(), ttl=10, max_stale=60)
+	updates = []
+	cache.subscribe(lambda previous, current: updates.append((previous, current)))
+
+	def failing_listener(previous, current):
+		raise RuntimeError('listener bug')
+
+	cache.subscribe(failing_listener)
+
+	first = await cache.refresh()
+	second = await cache.refresh()
+
+	assert updates == [(None, first), (first, second)]
+
+
+@pytest.mark.asyncio
+async def test_apply_publishes_updated_version():
+	cache = SnapshotCache('rooms', FakeLoader(), ttl=10, max_stale=60)
+	updates = []
+	cache.subscribe(lambda previous, current: updates.append(current.version))
+
+	assert cache.apply(lambda value: {**value, 'call': 0}) is None
+
+	first = await cache.refresh()
+	updated = cache.apply(lambda value: {**value, 'applied': True})
+
+	assert updated.version == first.version + 1
+	assert (await cache.get())['applied'] is True
+	assert first.value.get('applied') is None
+	assert cache.apply(lambda value: value) is updated
+	assert updates == [first.version, updated.version]
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import pytest
+from collections import namedtuple
+from app.schemas.room_response_schema import RoomModel
+from app.test.factories.room_factory import RoomFactory
+from app.utils.snapshot_cache import SnapshotCache
+from app.utils.snapshot_events import SnapshotEventConsumer, SnapshotTopic, apply_events, decode_events
+
+Record = namedtuple('Record', ['topic', 'value'])
+
+ROOM_1 = '67e52c913161b5df7189df14'
+ROOM_2 = '67e52c913161b5df7189df15'
+ROOM_3 = '67e52c913161b5df7189df16'
+
+
+class FakeBroker:
+	"""In-process stand-in for a Kafka consumer: messages sent to the broker are returned by `getmany`."""
+
+	def __init__(self):
+		self.queue: asyncio.Queue = asyncio.Queue()
+		self.started = False
+		self.stopped = False
+
+	def send(self, topic: str, value) -> None:
+		self.queue.put_nowait(Record(topic, json.dumps(value).encode()))
+
+	async def start(self):
+		self.started = True
+
+	async def stop(self):
+		self.stopped = True
+
+	async def getmany(self, timeout_ms: int = 0, max_records: int | None = None):
+		records = []
+		try:
+			records.append(await asyncio.wait_for(self.queue.get(), timeout=timeout_ms / 1000))
+		except asyncio.TimeoutError:
+			return {}
+		while not self.queue.empty() and (max_records is None or len(records) < max_records):
+			records.append(self.queue.get_nowait())
+		return {'partition-0': records}
+
+
+class FakeLoader:
+	def __init__(self, rooms: list[dict]):
+		self.rooms = rooms
+		self.calls = 0
+
+	async def __call__(self):
+		self.calls += 1
+		return {'rooms': list(self.rooms)}
+
+
+@pytest.fixture
+def rooms():
+	return [RoomFactory(id=room_id).to_dict() for room_id in [ROOM_1, ROOM_2]]
+
+
+@pytest.fixture
+def loader(rooms):
+	return FakeLoader(rooms)
+
+
+@pytest.fixture
+def cache(loader):
+	return SnapshotCache('rooms', loader, ttl=60, max_stale=60)
+
+
+@pytest.fixture
+def broker():
+	return FakeBroker()
+
+
+@pytest.fixture
+def consumer(broker, cache):
+	return SnapshotEventConsumer(broker, {'rooms': SnapshotTopic(cache, 'rooms', RoomModel)})
+
+
+def test_decode_events():
+	assert decode_events(b'{"id": "room-1", "occupants": 3}') == [{'id': 'room-1', 'occupants': 3}]
+	assert decode_events(b'[{"id": "room-1"}, {"occupants": 3}, 4]') == [{'id': 'room-1'}]
+	assert decode_events(b'not json') == []
+	assert decode_events(None) == []
+
+
+def test_apply_events_does_not_mutate_value(rooms):
+	value = {'rooms': rooms}
+
+	updated, unknown, skipped = apply_events(
+		value,
+		'rooms',
+		RoomModel,
+		[
+			{'id': ROOM_1, 'occupants': 42},
+			{'id': ROOM_2, 'deleted': True},
+			{'id': ROOM_1, 'crowd_factor': 'high'},
+			{'id': ROOM_3, 'occupants': 1},
+		],
+	)
+
+	assert [room['id'] for room in updated['rooms']] == [ROOM_1]
+	assert updated['rooms'][0]['occupants'] == 42
+	assert unknown == [ROOM_3]
+	assert skipped == 1
+	assert value == {'rooms': rooms}
+	assert rooms[0]['occupants'] == 0
+
+
+def test_apply_events_adds_complete_new_items(rooms):
+	new_room = RoomFactory(id=ROOM_3).to_dict()
+
+	updated, unknown, _ = apply_events({'rooms': rooms}, 'rooms', RoomModel, [new_room])
+
+	assert updated['rooms'][-1] == new_room
+	assert unknown == []
+
+
+def test_apply_events_without_changes_returns_same_value(rooms):
+	value = {'rooms': rooms}
+
+	updated, _, _ = apply_events(value, 'rooms', RoomModel, [{'id': ROOM_1, 'occupants': rooms[0]['occupants']}])
+
+	assert updated is value
+
+
+@pytest.mark.asyncio
+async def test_batch_of_events_is_applied_as_one_version(broker, consumer, cache, loader):
+	first = await cache.get_snapshot()
+	broker.send('rooms', {'id': ROOM_1, 'occupants': 7})
+	broker.send('rooms', [{'id': ROOM_2, 'occupants': 8}])
+	broker.send('other', {'id': ROOM_1, 'occupants': 9})
+
+	await consumer.poll(timeout=0.1)
+
+	snapshot = await cache.get_snapshot()
+	assert snapshot.version == first.version + 1
+	assert [room['occupants'] for room in snapshot.value['rooms']] == [7, 8]
+	assert loader.calls == 1
+	assert consumer.stats() == {'running': False, 'applied': 2, 'skipped': 0, 'reconciliations': 0}
+
+
+@pytest.mark.asyncio
+async def test_unchanged_events_do_not_publish_a_version(broker, consumer, cache, rooms):
+	first = await cache.get_snapshot()
+	broker.send('rooms', {'id': ROOM_1, 'occupants': rooms[0]['occupants']})
+
+	await consumer.poll(timeout=0.1)
+
+	assert await cache.get_snapshot() is first
+
+
+@pytest.mark.asyncio
+async def test_unknown_item_triggers_reconciliation(broker, consumer, cache, loader):
+	await cache.get_snapshot()
+	loader.rooms = loader.rooms + [RoomFactory(id=ROOM_3).to_dict()]
+	broker.send('rooms', {'id': ROOM_3, 'occupants': 1})
+
+	await consumer.poll(timeout=0.1)
+
+	snapshot = await cache.get_snapshot()
+	assert [room['id'] for room in snapshot.value['rooms']] == [ROOM_1, ROOM_2, ROOM_3]
+	assert loader.calls == 2
+	assert consumer.reconciliations == 1
+
+
+@pytest.mark.asyncio
+async def test_events_before_first_snapshot_trigger_load(broker, consumer, cache, loader):
+	broker.send('rooms', {'id': ROOM_1, 'occupants': 1})
+
+	await consumer.poll(timeout=0.1)
+
+	assert cache.peek() is not None
+	assert loader.calls == 1
+	assert consumer.reconciliations == 1
+
+
+@pytest.mark.asyncio
+async def test_run_consumes_until_stopped(broker, consumer, cache):
+	await cache.get_snapshot()
+	consumer.start()
+	await asyncio.sleep(0)
+	assert consumer.stats()['running'] is True
+	broker.send('rooms', {'id': ROOM_2, 'deleted': True})
+
+	for _ in range(100):
+		if len(cache.peek().value['rooms']) == 1:
+			break
+		await asyncio.sleep(0.01)
+	await consumer.stop()
+
+	assert [room['id'] for room in cache.peek().value['rooms']] == [ROOM_1]
+	assert broker.started
+	assert broker.stopped
+
+
+@pytest.mark.asyncio
+async def test_reconcile_interval_applies_only_while_running(broker, loader):
+	cache = SnapshotCache('rooms', loader, ttl=5, max_stale=60)
+	consumer = SnapshotEventConsumer(broker, {'rooms': SnapshotTopic(cache, 'rooms', RoomModel)}, reconcile_interval=120)
+
+	consumer.start()
+	await asyncio.sleep(0)
+	assert (cache.ttl, cache.max_stale) == (120, 175)
+
+	await consumer.stop()
+	assert (cache.ttl, cache.max_stale) == (5, 60)
+	assert consumer.stats()['running'] is False
+
+
+@pytest.mark.asyncio
+async def test_snapshot_ttl_unchanged_when_consumer_fails_to_start(broker, cache):
+	async def unreachable():
+		raise ConnectionError('no broker')
+
+	broker.start = unreachable
+	consumer = SnapshotEventConsumer(broker, {'rooms': SnapshotTopic(cache, 'rooms', RoomModel)}, reconcile_interval=120)
+
+	with pytest.raises(ConnectionError):
+		await consumer.run()
+	assert cache.ttl == 60
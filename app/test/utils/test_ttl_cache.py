@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from app.utils import ttl_cache
+from app.utils.ttl_cache import TTLCache
+
+
+@pytest.mark.asyncio
+async def test_values_expire_after_ttl(monkeypatch):
+	now = [100.0]
+	monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+	cache = TTLCache(max_size=10, ttl=60)
+	loads = []
+
+	async def load():
+		loads.append(now[0])
+		return len(loads)
+
+	assert await cache.get('key', load) == 1
+	now[0] += 59
+	assert await cache.get('key', load) == 1
+	now[0] += 1
+	assert await cache.get('key', load) == 2
+	assert cache.stats()['hits'] == 1
+	assert cache.stats()['misses'] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load_and_least_recent_is_evicted():
+	cache = TTLCache(max_size=2, ttl=60)
+	calls = 0
+
+	async def load():
+		nonlocal calls
+		calls += 1
+		await asyncio.sleep(0.01)
+		return calls
+
+	results = await asyncio.gather(*[cache.get('a', load) for _ in range(5)])
+	assert results == [1] * 5
+	assert cache.stats()['coalesced'] == 4
+
+	await cache.get('b', load)
+	await cache.get('a', load)
+	await cache.get('c', load)
+	# 'b' was used least recently
+	assert await cache.get('b', load) == 4
+	assert cache.stats()['size'] == 2
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Iterator
+import httpx
+from app.config import ARTWORK_HARVEST_SETTINGS
+from app.utils.http_clients import upstream_client
+
+logger = logging.getLogger(__name__)
+
+SMK_SEARCH_URL = 'https://api.smk.dk/api/v1/art/search'
+
+
+class HarvestError(Exception):
+	"""A page could not be fetched, even after retrying. The checkpoint allows resuming later."""
+
+
+def read_ndjson(path: str) -> Iterator[dict]:
+	"""Read the items of a harvest one at a time."""
+	with open(path, encoding='utf-8') as file:
+		for line in file:
+			if line.strip():
+				yield json.loads(line)
+
+
+class ArtworkHarvester:
+	"""
+	Downloads every artwork matching a search of the SMK API into an NDJSON file.
+
+	Up to `concurrency` pages are fetched at a time, and failed requests are retried with
+	exponential backoff. Pages are written in order as soon as they and the pages before them
+	have arrived, so at most `concurrency` pages are held in memory. After each page a checkpoint
+	records the next page and the size of the output, so an interrupted harvest with the same
+	parameters resumes where it stopped instead of starting over. A harvest started more than
+	`max_age` seconds ago starts over, as the catalog may have changed since.
+	"""
+
+	def __init__(
+		self,
+		output: str,
+		checkpoint: str | None = None,
+		params: dict[str, Any] | None = None,
+		page_size: int = ARTWORK_HARVEST_SETTINGS['page_size'],
+		concurrency: int = ARTWORK_HARVEST_SETTINGS['concurrency'],
+		retries: int = ARTWORK_HARVEST_SETTINGS['retries'],
+		backoff: float = ARTWORK_HARVEST_SETTINGS['backoff'],
+		max_age: float | None = None,
+	):
+		self.output = output
+		self.checkpoint = checkpoint if checkpoint is not None else f'{output}.checkpoint'
+		self.params = {'keys': '*', 'filters': '[on_display:true]', **(params or {})}
+		self.page_size = page_size
+		self.concurrency = max(concurrency, 1)
+		self.retries = retries
+		self.backoff = backoff
+		self.max_age = max_age
+
+	async def run(self) -> dict[str, Any]:
+		"""Harvest every page. Returns the number of items written, the number found and the facets."""
+		async with upstream_client(SMK_SEARCH_URL) as client:
+			state = self._resume()
+			if state is None:
+				started_at = time.time()
+				first = await self._fetch(client, 0, facets=True)
+				state = {
+					'started_at': started_at,
+					'params': self.params,
+					'page_size': self.page_size,
+					'found': first.get('found', 0),
+					'facets': first.get('facets') or {},
+					'pages': math.ceil(first.get('found', 0) / self.page_size),
+					'next_page': 0,
+					'written': 0,
+					'items': 0,
+				}
+				prefetched = {0: first.get('items') or []}
+				self._save(state)
+			else:
+				logger.info('Resuming harvest at page %s of %s', state['next_page'], state['pages'])
+				prefetched = {}
+			await self._harvest(client, state, prefetched)
+
+		os.remove(self.checkpoint)
+		return {'items': state['items'], 'found': state['found'], 'facets': state['facets']}
+
+	async def _harvest(self, client: httpx.AsyncClient, state: dict, prefetched: dict[int, list]) -> None:
+		pending: deque[asyncio.Future] = deque()
+		next_fetch = state['next_page']
+		with open(self.output, 'ab') as file:
+			# Drop anything written after the last checkpoint, it is fetched again
+			file.truncate(state['written'])
+			try:
+				while next_fetch < state['pages'] or pending:
+					while next_fetch < state['pages'] and len(pending) < self.concurrency:
+						pending.append(asyncio.ensure_future(self._page(client, next_fetch, prefetched)))
+						next_fetch += 1
+					items = await pending.popleft()
+					file.write(b''.join(json.dumps(item, ensure_ascii=False).encode() + b'\n' for item in items))
+					file.flush()
+					state['next_page'] += 1
+					state['written'] = file.tell()
+					state['items'] += len(items)
+					self._save(state)
+			finally:
+				for task in pending:
+					task.cancel()
+
+	async def _page(self, client: httpx.AsyncClient, page: int, prefetched: dict[int, list]) -> list:
+		if page in prefetched:
+			return prefetched.pop(page)
+		return (await self._fetch(client, page)).get('items') or []
+
+	async def _fetch(self, client: httpx.AsyncClient, page: int, facets: bool = False) -> dict:
+		params = {**self.params, 'offset': page * self.page_size, 'rows': self.page_size}
+		if not facets:
+			params.pop('facets', None)
+		attempt = 0
+		while True:
+			try:
+				response = await client.get(SMK_SEARCH_URL, params=params, timeout=30.0)
+				if response.status_code != 429 and response.status_code < 500:
+					response.raise_for_status()
+					return response.json()
+				error: Exception = httpx.HTTPStatusError(
+					f'{response.status_code} from the SMK API', request=response.request, response=response
+				)
+				retry_after = response.headers.get('retry-after')
+			except httpx.TransportError as e:
+				error, retry_after = e, None
+			if attempt == self.retries:
+				raise HarvestError(f'Failed to fetch page {page} after {attempt + 1} attempts: {error}') from error
+			# Exponential backoff with jitter, unless the API says how long to wait
+			delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2**attempt * random.uniform(1.0, 1.5)
+			logger.warning('Fetching page %s failed (%s), retrying in %.1f seconds', page, error, delay)
+			await asyncio.sleep(delay)
+			attempt += 1
+
+	def _resume(self) -> dict | None:
+		"""The state of an interrupted harvest with the same parameters, if any."""
+		try:
+			with open(self.checkpoint, encoding='utf-8') as file:
+				state = json.load(file)
+		except FileNotFoundError:
+			return None
+		except ValueError:
+			logger.warning('Ignoring unreadable harvest checkpoint %s', self.checkpoint)
+			return None
+		if state.get('params') != self.params or state.get('page_size') != self.page_size:
+			logger.info('Harvest parameters changed, starting over')
+			return None
+		if self.max_age is not None and time.time() - state.get('started_at', 0) > self.max_age:
+			logger.info('Harvest checkpoint is older than %s seconds, starting over', self.max_age)
+			return None
+		if not os.path.exists(self.output) or os.path.getsize(self.output) < state['written']:
+			return None
+		return state
+
+	def _save(self, state: dict) -> None:
+		temporary = f'{self.checkpoint}.tmp'
+		with open(temporary, 'w', encoding='utf-8') as file:
+			json.dump(state, file)
+		os.replace(temporary, self.checkpoint)
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Callable
+
+
+class Subscription:
+	"""A subscriber's bounded queue of pre-serialized messages. `None` means the stream is closed."""
+
+	def __init__(self, queue_size: int):
+		self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+		self.overflows = 0
+		self.closed = False
+
+	def _drain(self) -> None:
+		while not self.queue.empty():
+			self.queue.get_nowait()
+
+	async def get(self) -> str | None:
+		message = await self.queue.get()
+		self.overflows = 0
+		return message
+
+
+class Broadcaster:
+	"""
+	Fan messages out to any number of subscribers without waiting for any of them.
+	A subscriber whose queue is full has its backlog replaced by a single resync message,
+	and a subscriber that keeps overflowing is disconnected, so one slow client cannot
+	hold back the others or make the gateway buffer unbounded data.
+	"""
+
+	def __init__(self, queue_size: int, max_overflows: int):
+		self.queue_size = queue_size
+		self.max_overflows = max_overflows
+		self._subscribers: set[Subscription] = set()
+		self.published = 0
+		self.coalesced = 0
+		self.dropped = 0
+
+	def subscribe(self) -> Subscription:
+		subscription = Subscription(self.queue_size)
+		self._subscribers.add(subscription)
+		return subscription
+
+	def unsubscribe(self, subscription: Subscription) -> None:
+		self._subscribers.discard(subscription)
+
+	def publish(self, message: str, resync: Callable[[], str]) -> None:
+		"""
+		Queue a message for every subscriber.
+		`resync` builds the message replacing the backlog of a slow subscriber;
+		it is only called if some subscriber overflows.
+		"""
+		self.published += 1
+		resync_message: str | None = None
+		for subscription in list(self._subscribers):
+			try:
+				subscription.queue.put_nowait(message)
+				continue
+			except asyncio.QueueFull:
+				subscription.overflows += 1
+
+			subscription._drain()
+			if subscription.overflows > self.max_overflows:
+				self.dropped += 1
+				subscription.closed = True
+				subscription.queue.put_nowait(None)
+				self.unsubscribe(subscription)
+				continue
+
+			self.coalesced += 1
+			if resync_message is None:
+				resync_message = resync()
+			subscription.queue.put_nowait(resync_message)
+
+	def subscriber_count(self) -> int:
+		return len(self._subscribers)
+
+	def close(self) -> None:
+		"""Close every subscriber's stream."""
+		for subscription in list(self._subscribers):
+			subscription._drain()
+			subscription.closed = True
+			subscription.queue.put_nowait(None)
+		self._subscribers.clear()
@@ -0,0 +1,48 @@
+import hashlib
+from typing import Any
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from app.utils.snapshot_cache import Snapshot
+
+
+class JSONBody:
+	"""A serialized JSON response body together with its strong ETag."""
+
+	def __init__(self, content: bytes):
+		self.content = content
+		self.etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+	@classmethod
+	def serialize(cls, adapter: TypeAdapter, value: Any) -> 'JSONBody':
+		"""Serialize a value the same way FastAPI would serialize it with the adapter's response model."""
+		return cls(adapter.dump_json(adapter.validate_python(value)))
+
+
+def snapshot_body(snapshot: Snapshot, adapter: TypeAdapter, key: str = 'body', project=None) -> JSONBody:
+	"""
+	Get the serialized body of a snapshot, or of a projection of it.
+	The body and its ETag are computed once per snapshot version.
+	"""
+	return snapshot.memo(
+		key, lambda value: JSONBody.serialize(adapter, project(value) if project else value)
+	)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+	"""Check the request's If-None-Match header against an ETag."""
+	header = request.headers.get('if-none-match')
+	if not header:
+		return False
+	for candidate in header.split(','):
+		candidate = candidate.strip()
+		if candidate == '*' or candidate.removeprefix('W/') == etag:
+			return True
+	return False
+
+
+def etag_response(request: Request, body: JSONBody) -> Response:
+	"""Answer with 304 Not Modified if the client already has the body, otherwise send it."""
+	headers = {'ETag': body.etag, 'Cache-Control': 'no-cache'}
+	if etag_matches(request, body.etag):
+		return Response(status_code=304, headers=headers)
+	return Response(content=body.content, media_type='application/json', headers=headers)
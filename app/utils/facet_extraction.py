@@ -1,40 +1,17 @@
-import requests
+import asyncio
+import sys
+from app.utils.artwork_harvester import ArtworkHarvester
 
 total_techniques = 0
 
 
-def fetch_all_artworks():
-	"""Fetch all artworks from the SMK API."""
-	base_url = 'https://api.smk.dk/api/v1/art/search'
-	page = 1
-	page_size = 100
-	all_artworks = []
-	data = {}
-
-	while True:
-		response = requests.get(
-			base_url,
-			params={
-				'keys': '*',
-				'offset': (page - 1) * 100,
-				'rows': page_size,
-				'filters': '[on_display:true]',
-				'facets': ['creator', 'materials'],
-			},
-		)
-		if response.status_code != 200:
-			print(f'Failed to fetch data: {response.status_code}')
-			print(response.url)
-			break
-		data = response.json()
-		artworks = data.get('items', [])
-		if not artworks:
-			break
-
-		all_artworks.extend(artworks)
-		page += 1
-
-	return all_artworks, data.get('facets', {})
+async def fetch_all_artworks(output: str = 'artworks.ndjson') -> tuple[int, dict]:
+	"""
+	Harvest all on-display artworks from the SMK API into an NDJSON file, resuming an interrupted run.
+	Returns the number of artworks and the creator and materials facets.
+	"""
+	result = await ArtworkHarvester(output, params={'facets': ['creator', 'materials']}).run()
+	return result['items'], result['facets']
 
 
 def get_facet_count(facets: dict, facet_name: str) -> list[dict]:
@@ -52,9 +29,10 @@ def get_facet_count(facets: dict, facet_name: str) -> list[dict]:
 
 
 def main():
+	output = sys.argv[1] if len(sys.argv) > 1 else 'artworks.ndjson'
 	print('Fetching all artworks from SMK API...')
-	artworks, facets = fetch_all_artworks()
-	print(f'Fetched {len(artworks)} artworks.')
+	count, facets = asyncio.run(fetch_all_artworks(output))
+	print(f'Fetched {count} artworks into {output}.')
 
 	# Count the occurrences of each facet
 	for facet in facets:
@@ -1,6 +1,13 @@
-import httpx
+import json
 from typing import Any
 from fastapi import HTTPException
+from app.utils.http_clients import upstream_client
+from app.utils.single_flight import SingleFlight
+
+# Methods whose concurrent identical calls can safely share one upstream request.
+COALESCED_METHODS = {'GET', 'HEAD'}
+
+_in_flight = SingleFlight()
 
 
 async def forward_request(
@@ -8,6 +15,7 @@ async def forward_request(
 ) -> tuple[Any, int]:
 	"""
 	Forward a request to a specified URL using the given HTTP method.
+	The pooled client for the target upstream is reused, so connections are kept alive between calls.
 	Args:
 		target_url (str): The URL to forward the request to.
 		method (str): The HTTP method to use (e.g., 'GET', 'POST').
@@ -15,8 +23,19 @@ async def forward_request(
 		body (dict, optional): JSON body to include in the request.
 	Returns:
 		tuple[dict, int]: A tuple containing the response data and status code.
+	Concurrent identical GET requests (same URL and params) share a single upstream call,
+	so the returned data may be shared between callers and must not be mutated.
 	"""
-	async with httpx.AsyncClient() as client:
+	if method.upper() in COALESCED_METHODS and body is None:
+		key = (method.upper(), target_url, json.dumps(params, sort_keys=True, default=str))
+		return await _in_flight.do(key, lambda: _send_request(target_url, method, params, body))
+	return await _send_request(target_url, method, params, body)
+
+
+async def _send_request(
+	target_url: str, method: str, params: dict | None, body: dict | None
+) -> tuple[Any, int]:
+	async with upstream_client(target_url) as client:
 		response = await client.request(method, target_url, params=params, json=body)
   
 		try:
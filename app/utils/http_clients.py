@@ -0,0 +1,84 @@
+import httpx
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from app.config import HTTP_CLIENT_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# One pooled client per upstream origin, e.g. 'http://sensor-sim:8002' or 'https://api.smk.dk'.
+_clients: dict[str, httpx.AsyncClient] = {}
+_started = False
+
+
+def _origin(url: str) -> str:
+	"""Return the scheme, host and port of a URL, used as the pool key."""
+	parsed = httpx.URL(url)
+	return f'{parsed.scheme}://{parsed.netloc.decode()}'
+
+
+def _http2_enabled() -> bool:
+	if not HTTP_CLIENT_SETTINGS['http2']:
+		return False
+	if importlib.util.find_spec('h2') is None:
+		logger.warning('HTTP2 is enabled but the h2 package is not installed, falling back to HTTP/1.1')
+		return False
+	return True
+
+
+def _create_client() -> httpx.AsyncClient:
+	return httpx.AsyncClient(
+		http2=_http2_enabled(),
+		timeout=HTTP_CLIENT_SETTINGS['timeout'],
+		limits=httpx.Limits(
+			max_connections=HTTP_CLIENT_SETTINGS['max_connections'],
+			max_keepalive_connections=HTTP_CLIENT_SETTINGS['max_keepalive_connections'],
+			keepalive_expiry=HTTP_CLIENT_SETTINGS['keepalive_expiry'],
+		),
+	)
+
+
+def start_clients() -> None:
+	"""Enable the shared client registry. Called from the application lifespan."""
+	global _started
+	_started = True
+
+
+async def close_clients() -> None:
+	"""Close every pooled client and disable the registry."""
+	global _started
+	_started = False
+	clients = list(_clients.values())
+	_clients.clear()
+	for client in clients:
+		await client.aclose()
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+	"""
+	Get the pooled client for the upstream serving the given URL.
+	The client is created on first use and kept alive until `close_clients` is called.
+	"""
+	if not _started:
+		raise RuntimeError('HTTP client registry has not been started')
+	origin = _origin(url)
+	client = _clients.get(origin)
+	if client is None:
+		client = _create_client()
+		_clients[origin] = client
+	return client
+
+
+@asynccontextmanager
+async def upstream_client(url: str) -> AsyncIterator[httpx.AsyncClient]:
+	"""
+	Yield a client for the given URL.
+	Uses the shared pool when the registry is running (inside the application lifespan),
+	otherwise a short-lived client is created and closed afterwards (scripts and tests).
+	"""
+	if _started:
+		yield get_client(url)
+		return
+	async with httpx.AsyncClient() as client:
+		yield client
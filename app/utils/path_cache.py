@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+from app.utils.single_flight import SingleFlight
+from app.utils.snapshot_cache import Snapshot
+
+
+def crowd_factors(rooms: Snapshot) -> dict[str, float]:
+	"""Crowd factor of every room in a snapshot, computed once per version."""
+	return rooms.memo('crowd_factors', lambda value: {room['id']: room['crowd_factor'] for room in value['rooms']})
+
+
+class PathEntry:
+	__slots__ = ('path', 'version', 'topology', 'crowd', 'route')
+
+	def __init__(self, path: Any, version: int, topology: str, crowd: dict[str, float], route: set[str]):
+		self.path = path
+		# Last rooms snapshot version the entry was computed or revalidated at
+		self.version = version
+		self.topology = topology
+		# Crowd factors the path was computed with
+		self.crowd = crowd
+		self.route = route
+
+
+class PathCache:
+	"""
+	LRU cache of path results that survives room snapshot updates while the crowd stays similar.
+
+	An entry is reused as long as the topology is unchanged, no room on the cached route has
+	moved its crowd factor by more than `epsilon`, and no room off the route (a competing route)
+	has become less crowded by more than `epsilon`. A route getting more crowded elsewhere cannot
+	make another route faster, so those changes are ignored.
+	Concurrent misses for the same key share one computation.
+	"""
+
+	def __init__(self, max_size: int, epsilon: float, route: Callable[[Any], Iterable[str]]):
+		self.max_size = max_size
+		self.epsilon = epsilon
+		self._route = route
+		self._entries: OrderedDict[Hashable, PathEntry] = OrderedDict()
+		self._flight = SingleFlight()
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+		self.warmed = 0
+
+	async def get(
+		self, key: Hashable, rooms: Snapshot, topology: str, compute: Callable[[], Awaitable[Any]]
+	) -> Any:
+		"""Get the cached path for a key, or compute it with the given rooms snapshot and topology."""
+		if self.max_size <= 0:
+			return await compute()
+		entry = self._entries.get(key)
+		if entry is not None:
+			if self._is_valid(entry, rooms, topology):
+				self._entries.move_to_end(key)
+				self.hits += 1
+				return entry.path
+			self.invalidations += 1
+			del self._entries[key]
+		self.misses += 1
+		return await self._flight.do((key, rooms.version, topology), lambda: self._compute(key, rooms, topology, compute))
+
+	async def warm(
+		self, key: Hashable, rooms: Snapshot, topology: str, compute: Callable[[], Awaitable[Any]]
+	) -> bool:
+		"""
+		Compute and cache the path for a key unless a valid entry exists.
+		Not counted as a hit or miss. Returns whether the path was computed.
+		"""
+		if self.max_size <= 0:
+			return False
+		entry = self._entries.get(key)
+		if entry is not None:
+			if self._is_valid(entry, rooms, topology):
+				self._entries.move_to_end(key)
+				return False
+			self.invalidations += 1
+			del self._entries[key]
+		await self._flight.do((key, rooms.version, topology), lambda: self._compute(key, rooms, topology, compute))
+		self.warmed += 1
+		return True
+
+	async def _compute(
+		self, key: Hashable, rooms: Snapshot, topology: str, compute: Callable[[], Awaitable[Any]]
+	) -> Any:
+		path = await compute()
+		self._entries[key] = PathEntry(path, rooms.version, topology, crowd_factors(rooms), set(self._route(path)))
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_size:
+			self._entries.popitem(last=False)
+		return path
+
+	def _is_valid(self, entry: PathEntry, rooms: Snapshot, topology: str) -> bool:
+		if entry.topology != topology:
+			return False
+		if entry.version == rooms.version:
+			return True
+		current = crowd_factors(rooms)
+		for room_id, before in entry.crowd.items():
+			now = current.get(room_id)
+			if now is None:
+				return False
+			if room_id in entry.route:
+				if abs(now - before) > self.epsilon:
+					return False
+			elif before - now > self.epsilon:
+				return False
+		# Still compared against the crowd the path was computed with, so drift cannot accumulate
+		entry.version = rooms.version
+		return True
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+		self.warmed = 0
+
+	def stats(self) -> dict:
+		lookups = self.hits + self.misses
+		return {
+			'size': len(self._entries),
+			'max_size': self.max_size,
+			'epsilon': self.epsilon,
+			'hits': self.hits,
+			'misses': self.misses,
+			'coalesced': self._flight.coalesced,
+			'invalidations': self.invalidations,
+			'warmed': self.warmed,
+			'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+		}
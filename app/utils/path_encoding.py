@@ -0,0 +1,120 @@
+from typing import Literal
+from fastapi import Header, Query, Response
+from pydantic import TypeAdapter
+from app.schemas.pathfinding_schema import CompactPathModel
+
+# Media type of compact path responses; a 'coordinates=polyline' parameter also encodes the coordinates.
+COMPACT_PATH_MEDIA_TYPE = 'application/vnd.path.compact+json'
+
+# Polyline precision: 6 decimal places, about 0.1 m, since rooms are only a few meters apart.
+POLYLINE_PRECISION = 6
+
+PathFormat = Literal['full', 'compact', 'polyline']
+
+_compact_path_adapter = TypeAdapter(CompactPathModel)
+
+
+def encode_polyline(points: list[tuple[float, float]], precision: int = POLYLINE_PRECISION) -> str:
+	"""Encode (latitude, longitude) points with the Encoded Polyline Algorithm Format."""
+	factor = 10**precision
+	encoded: list[str] = []
+	previous = (0, 0)
+	for latitude, longitude in points:
+		current = (round(latitude * factor), round(longitude * factor))
+		for value, before in zip(current, previous):
+			delta = value - before
+			delta = ~(delta << 1) if delta < 0 else delta << 1
+			while delta >= 0x20:
+				encoded.append(chr((0x20 | (delta & 0x1F)) + 63))
+				delta >>= 5
+			encoded.append(chr(delta + 63))
+		previous = current
+	return ''.join(encoded)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> list[tuple[float, float]]:
+	"""Decode a polyline into (latitude, longitude) points."""
+	factor = 10**precision
+	points: list[tuple[float, float]] = []
+	values = [0, 0]
+	index = 0
+	while index < len(encoded):
+		for axis in (0, 1):
+			shift = 0
+			result = 0
+			while True:
+				byte = ord(encoded[index]) - 63
+				index += 1
+				result |= (byte & 0x1F) << shift
+				shift += 5
+				if byte < 0x20:
+					break
+			values[axis] += ~(result >> 1) if result & 1 else result >> 1
+		points.append((values[0] / factor, values[1] / factor))
+	return points
+
+
+def compact_path(path: dict, polyline: bool = False) -> dict:
+	"""
+	Convert a path to the compact representation: every room once in a room table, sensors
+	referring to rooms by index, and the sensor coordinates as a list or an encoded polyline.
+	"""
+	rooms: list[dict] = []
+	room_index: dict[str, int] = {}
+	sensors = []
+	for sensor in path['fastest_path']:
+		indices = []
+		for room in sensor['rooms']:
+			index = room_index.get(room['id'])
+			if index is None:
+				index = room_index[room['id']] = len(rooms)
+				rooms.append(room)
+			indices.append(index)
+		sensors.append({'id': sensor['id'], 'rooms': indices, 'is_vertical': sensor['is_vertical']})
+	points = [(sensor['latitude'], sensor['longitude']) for sensor in path['fastest_path']]
+	compact = {'rooms': rooms, 'sensors': sensors, 'distance': path['distance']}
+	if polyline:
+		compact['polyline'] = encode_polyline(points)
+	else:
+		compact['coordinates'] = [list(point) for point in points]
+	return compact
+
+
+def path_format(
+	format: Literal['full', 'compact'] | None = Query(
+		default=None, description=f'Path representation, defaults to the Accept header ({COMPACT_PATH_MEDIA_TYPE}) or full.'
+	),
+	coordinates: Literal['list', 'polyline'] | None = Query(
+		default=None, description='How compact paths carry the sensor coordinates.'
+	),
+	accept: str | None = Header(default=None),
+) -> PathFormat:
+	"""Pick the path representation from the query, falling back to the Accept header."""
+	if format is None:
+		format = 'full'
+		for media_range in (accept or '').split(','):
+			media_type, *parameters = (part.strip() for part in media_range.split(';'))
+			if media_type.lower() == COMPACT_PATH_MEDIA_TYPE:
+				format = 'compact'
+				if coordinates is None and 'coordinates=polyline' in (parameter.replace(' ', '') for parameter in parameters):
+					coordinates = 'polyline'
+				break
+	if format == 'compact' and coordinates == 'polyline':
+		return 'polyline'
+	return format
+
+
+def path_response(path: dict, format: PathFormat, response: Response) -> dict | Response:
+	"""
+	Return a path in the requested representation. The full one goes through the route's response
+	model; compact ones are serialized here, keeping the headers already set on `response`.
+	"""
+	response.headers['Vary'] = 'Accept'
+	if format == 'full':
+		return path
+	compact = _compact_path_adapter.validate_python(compact_path(path, polyline=format == 'polyline'))
+	return Response(
+		content=_compact_path_adapter.dump_json(compact, exclude_none=True),
+		media_type=COMPACT_PATH_MEDIA_TYPE,
+		headers=dict(response.headers),
+	)
@@ -0,0 +1,73 @@
+import base64
+import hashlib
+import hmac
+import json
+from typing import Any
+
+# Header carrying the token of a path in /fastest-path responses and reroute requests.
+PATH_TOKEN_HEADER = 'X-Path-Token'
+
+
+def _encode(data: bytes) -> str:
+	return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _decode(text: str) -> bytes:
+	return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class PathTokens:
+	"""
+	Signed tokens for paths the gateway returned, so re-routing clients can refer to their path
+	instead of sending it back. A token carries the target and what re-routing reads of the path
+	(the door ids and the id and crowd factor of their rooms) with an HMAC of that content, so any
+	worker or replica sharing `secret` can verify it without keeping state.
+	"""
+
+	def __init__(self, secret: bytes):
+		self._secret = secret
+		self.issued = 0
+		self.rejected = 0
+
+	def _sign(self, payload: str) -> str:
+		return _encode(hmac.new(self._secret, payload.encode('utf-8'), hashlib.sha256).digest())
+
+	def issue(self, target: str, path: Any) -> str:
+		sensors = [
+			[sensor.get('id'), [[room.get('id'), room.get('crowd_factor')] for room in sensor.get('rooms') or []]]
+			for sensor in path.get('fastest_path') or []
+		]
+		payload = _encode(json.dumps([target, sensors], separators=(',', ':')).encode('utf-8'))
+		self.issued += 1
+		return f'{payload}.{self._sign(payload)}'
+
+	def get(self, token: str) -> tuple[str, Any] | None:
+		"""The target and path of a token, or None when it was not issued with this secret."""
+		payload, _, signature = token.partition('.')
+		# Header values may hold any Latin-1 text, which compare_digest does not accept
+		if not token.isascii() or not hmac.compare_digest(signature, self._sign(payload)):
+			self.rejected += 1
+			return None
+		try:
+			target, sensors = json.loads(_decode(payload))
+			path = {
+				'fastest_path': [
+					{'id': id, 'rooms': [{'id': room, 'crowd_factor': crowd_factor} for room, crowd_factor in rooms]}
+					for id, rooms in sensors
+				]
+			}
+		except (ValueError, TypeError):
+			# binascii.Error and JSON errors are ValueErrors
+			self.rejected += 1
+			return None
+		return target, path
+
+	def clear(self) -> None:
+		self.issued = 0
+		self.rejected = 0
+
+	def stats(self) -> dict:
+		return {
+			'issued': self.issued,
+			'rejected': self.rejected,
+		}
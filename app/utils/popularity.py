@@ -0,0 +1,54 @@
+import math
+import time
+from typing import Hashable
+
+
+class DecayingTopK:
+	"""
+	Approximate counts of the most frequent keys in a stream, with older occurrences weighing less.
+
+	A Space-Saving sketch of at most `capacity` keys: a key not in a full sketch replaces the key
+	with the lowest count and inherits that count, so counts may be overestimated by at most the
+	lowest count but frequent keys are never lost. Counts decay exponentially with `half_life`
+	seconds. Instead of decaying every count, each occurrence adds a weight that grows with time,
+	and the counts are rescaled before the weights get too large.
+	"""
+
+	def __init__(self, capacity: int, half_life: float):
+		self.capacity = capacity
+		self._rate = math.log(2) / half_life
+		self._counts: dict[Hashable, float] = {}
+		self._origin = time.monotonic()
+
+	def record(self, key: Hashable, now: float | None = None) -> None:
+		if self.capacity <= 0:
+			return
+		weight = self._weight(time.monotonic() if now is None else now)
+		count = self._counts.get(key)
+		if count is None and len(self._counts) >= self.capacity:
+			evicted = min(self._counts, key=self._counts.__getitem__)
+			count = self._counts.pop(evicted)
+		self._counts[key] = (count or 0.0) + weight
+
+	def top(self, n: int, now: float | None = None) -> list[tuple[Hashable, float]]:
+		"""The `n` keys with the highest decayed counts, with their counts, most frequent first."""
+		scale = math.exp(-self._rate * ((time.monotonic() if now is None else now) - self._origin))
+		ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[:n]
+		return [(key, count * scale) for key, count in ranked]
+
+	def _weight(self, now: float) -> float:
+		exponent = self._rate * (now - self._origin)
+		if exponent > 50:
+			# Rescale to the current time, so the weights stay far from overflowing
+			scale = math.exp(-exponent)
+			self._counts = {key: count * scale for key, count in self._counts.items()}
+			self._origin = now
+			exponent = 0.0
+		return math.exp(exponent)
+
+	def __len__(self) -> int:
+		return len(self._counts)
+
+	def clear(self) -> None:
+		self._counts.clear()
+		self._origin = time.monotonic()
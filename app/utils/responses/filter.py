@@ -34,6 +34,9 @@ get_filters_responses: dict[int | str, dict[str, object]] = {
 			}
 		},
 	},
+	304: {
+		'description': 'Not Modified - the ETag in If-None-Match is still current',
+	},
 	500: {
 		'description': 'Internal Server Error',
 		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
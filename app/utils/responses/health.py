@@ -0,0 +1,89 @@
+cache_stats_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'application/json': {
+				'example': {
+					'rooms': {
+						'version': 42,
+						'age': 1.734,
+						'ttl': 5.0,
+						'max_stale': 60.0,
+						'hits': 980,
+						'stale_hits': 12,
+						'misses': 1,
+						'hit_ratio': 0.999,
+						'refresh_errors': 0,
+					},
+					'fastest_path': {
+						'size': 118,
+						'max_size': 1024,
+						'epsilon': 0.05,
+						'hits': 4210,
+						'misses': 390,
+						'coalesced': 41,
+						'invalidations': 272,
+						'warmed': 180,
+						'hit_ratio': 0.9152,
+					},
+					'path_table': {
+						'rooms_version': 42,
+						'sensors_version': 40,
+						'rooms': 96,
+						'builds': 42,
+						'build_errors': 0,
+						'build_seconds': 0.0381,
+						'audits': 38,
+						'audit_mismatches': 0,
+					},
+					'prewarm': {
+						'tracked_pairs': 143,
+						'top': [
+							{'source': '67efbb210b23f5290bff702e', 'target': '67efbb210b23f5290bff7031', 'count': 211.47},
+							{'source': '67efbb210b23f5290bff702e', 'target': '67efbb210b23f5290bff7044', 'count': 96.02},
+						],
+						'runs': 42,
+						'warmed': 180,
+						'errors': 0,
+					},
+					'artworks': {
+						'ready': True,
+						'artworks': 1843,
+						'filter_values': 1270,
+						'age': 5120.4,
+						'syncs': 1,
+						'sync_errors': 0,
+						'queries': 312,
+						'fallbacks': 0,
+					},
+					'filters': {
+						'version': 3,
+						'age': 1520.8,
+						'ttl': 21600.0,
+						'max_stale': 604800.0,
+						'hits': 87,
+						'stale_hits': 0,
+						'misses': 0,
+						'hit_ratio': 1.0,
+						'refresh_errors': 0,
+					},
+					'filter_rooms': {
+						'size': 0,
+						'max_size': 4096,
+						'ttl': 3600.0,
+						'hits': 0,
+						'misses': 0,
+						'coalesced': 0,
+						'hit_ratio': None,
+					},
+					'events': {
+						'running': True,
+						'applied': 48211,
+						'skipped': 0,
+						'reconciliations': 3,
+					},
+				}
+			}
+		},
+	},
+}
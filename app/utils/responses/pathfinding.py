@@ -1,3 +1,42 @@
+from app.utils.path_encoding import COMPACT_PATH_MEDIA_TYPE
+
+
+compact_path_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Fastest path found successfully',
+		'content': {
+			COMPACT_PATH_MEDIA_TYPE: {
+				'example': {
+					'rooms': [
+						{
+							'id': '67d935add6d3ce76bef2c884',
+							'name': '106',
+							'crowd_factor': 0.3,
+							'occupants': 15,
+							'area': 50.0,
+							'popularity_factor': 0.61,
+							'floor': 1,
+						},
+						{
+							'id': '67d935add6d3ce76bef2c883',
+							'name': '107',
+							'crowd_factor': 0.3,
+							'occupants': 12,
+							'area': 50.0,
+							'popularity_factor': 0.52,
+							'floor': 1,
+						},
+					],
+					'sensors': [{'id': '67d935b1d6d3ce76bef2c8e9', 'rooms': [0, 1], 'is_vertical': False}],
+					'polyline': 'gkeeiBwmb~V',
+					'distance': 30.5,
+				},
+			}
+		},
+	},
+}
+
+
 multipoint_path_response: dict[int | str, dict[str, object]] = {
 	200: {
 		'description': 'Fastest path found successfully',
@@ -23,8 +62,92 @@ multipoint_path_response: dict[int | str, dict[str, object]] = {
 					],
 					'distance': 30,
 				}
-			}
+			},
+			**compact_path_responses[200]['content'],
 		},
 	},
 	
 }
+
+
+fastest_path_batch_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Paths streamed as they complete',
+		'content': {
+			'application/x-ndjson': {
+				'example': '{"index":1,"source":"67efbb210b23f5290bff702e","target":"67efbb210b23f5290bff7031",'
+				'"result":{"fastest_path":[{"id":"67efbb220b23f5290bff7056","rooms":[],"latitude":55.6761,'
+				'"longitude":12.5683,"is_vertical":false}],"distance":30.5}}\n'
+				'{"index":0,"source":"67efbb210b23f5290bff702e","target":"unknown",'
+				'"error":{"status_code":400,"detail":"Room \'unknown\' is not valid."}}\n'
+			}
+		},
+	},
+}
+
+
+distance_matrix_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Cost matrix calculated successfully',
+		'content': {
+			'application/json': {
+				'example': {
+					'sources': ['67efbb210b23f5290bff702e', '67efbb210b23f5290bff702f'],
+					'targets': ['67efbb210b23f5290bff7031', '67efbb210b23f5290bff7032', '67efbb210b23f5290bff7033'],
+					'costs': [[12.5, 40.125, None], [0.0, 27.5, None]],
+				}
+			}
+		},
+	},
+	400: {
+		'description': 'Unknown rooms',
+		'content': {'application/json': {'example': {'detail': 'Unknown rooms: 67efbb210b23f5290bff7099.'}}},
+	},
+}
+
+
+reroute_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': "'unchanged' to keep following the path, or the new path from the current room",
+		'headers': {'X-Path-Token': {'description': 'Token of the path to follow', 'schema': {'type': 'string'}}},
+		'content': {
+			'application/json': {
+				'examples': {
+					'unchanged': {'value': {'status': 'unchanged'}},
+					'rerouted': {
+						'value': {
+							'status': 'rerouted',
+							'fastest_path': [
+								{
+									'id': '67efbb220b23f5290bff7056',
+									'rooms': [],
+									'latitude': 55.6761,
+									'longitude': 12.5683,
+									'is_vertical': False,
+								}
+							],
+							'distance': 30.5,
+						}
+					},
+				}
+			}
+		},
+	},
+	400: {
+		'description': 'Neither a path token nor a path and target were sent',
+		'content': {
+			'application/json': {
+				'example': {'detail': 'Either an X-Path-Token header or a path and a target are required.'}
+			}
+		},
+	},
+	404: {
+		'description': 'Invalid path token',
+		'content': {
+			'application/json': {
+				'example': {'detail': 'Invalid path token, send the path and target instead.'}
+			}
+		},
+	},
+}
+
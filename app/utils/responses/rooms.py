@@ -31,8 +31,133 @@ get_rooms_responses: dict[int | str, dict[str, object]] = {
 			}
 		},
 	},
+	304: {
+		'description': 'Not Modified - the ETag in If-None-Match is still current',
+	},
 	500: {
 		'description': 'Internal Server Error',
 		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
 	}
-}
\ No newline at end of file
+}
+
+get_room_geometry_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'application/json': {
+				'example': {
+					'rooms': [
+						{
+							'id': '67efbb210b23f5290bff702e',
+							'name': '201',
+							'type': 'EXHIBITION',
+							'area': 50.0,
+							'longitude': 12.5783982,
+							'latitude': 55.6885731,
+							'floor': 2,
+							'borders': [[55.6885731, 12.5783982], [55.6886012, 12.5784510]],
+						},
+					]
+				}
+			}
+		},
+	},
+	304: {
+		'description': 'Not Modified - the ETag in If-None-Match is still current',
+	},
+	500: {
+		'description': 'Internal Server Error',
+		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
+	}
+}
+
+get_room_occupancy_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'application/json': {
+				'example': {
+					'rooms': [
+						{
+							'id': '67efbb210b23f5290bff702e',
+							'crowd_factor': 0.4,
+							'popularity_factor': 1.2,
+							'occupants': 17,
+						},
+					]
+				}
+			}
+		},
+	},
+	304: {
+		'description': 'Not Modified - the ETag in If-None-Match is still current',
+	},
+	500: {
+		'description': 'Internal Server Error',
+		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
+	}
+}
+
+get_rooms_batch_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'application/json': {
+				'example': {
+					'rooms': [
+						{'id': '67efbb210b23f5290bff702e', 'name': '201', 'crowd_factor': 0.4},
+					],
+					'missing': ['67efbb210b23f5290bff7000'],
+				}
+			}
+		},
+	},
+	422: {
+		'description': 'Invalid request',
+		'content': {'application/json': {'example': {'detail': 'Unknown room fields: capacity.'}}},
+	},
+	500: {
+		'description': 'Internal Server Error',
+		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
+	}
+}
+
+get_room_changes_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'application/json': {
+				'example': {
+					'version': '5f0c9e2a:1042',
+					'resync': False,
+					'rooms': [
+						{
+							'id': '67efbb210b23f5290bff702e',
+							'crowd_factor': 0.4,
+							'popularity_factor': 1.2,
+							'occupants': 17,
+						},
+					],
+					'removed': [],
+				}
+			}
+		},
+	},
+	500: {
+		'description': 'Internal Server Error',
+		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
+	}
+}
+
+stream_room_updates_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'text/event-stream': {
+				'example': 'event: changes\nid: 5f0c9e2a:1043\ndata: {"version":"5f0c9e2a:1043","resync":false,'
+				'"rooms":[{"id":"67efbb210b23f5290bff702e","crowd_factor":0.5,"popularity_factor":1.2,'
+				'"occupants":21}],"removed":[]}\n\n'
+			}
+		},
+	},
+}
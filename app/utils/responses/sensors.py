@@ -51,9 +51,36 @@ get_sensors_responses: dict[int | str, dict[str, object]] = {
 			}
 		},
 	},
+	304: {
+		'description': 'Not Modified - the ETag in If-None-Match is still current',
+	},
 	500: {
 		'description': 'Internal Server Error',
 		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
 	},
 }
 
+
+get_sensors_batch_responses: dict[int | str, dict[str, object]] = {
+	200: {
+		'description': 'Successful Response',
+		'content': {
+			'application/json': {
+				'example': {
+					'sensors': [
+						{'id': '123', 'rooms': ['room_1_id', 'room_2_id']},
+					],
+					'missing': ['124'],
+				}
+			}
+		},
+	},
+	422: {
+		'description': 'Invalid request',
+		'content': {'application/json': {'example': {'detail': 'Unknown sensor fields: name.'}}},
+	},
+	500: {
+		'description': 'Internal Server Error',
+		'content': {'application/json': {'example': {'detail': 'Internal Server Error'}}},
+	},
+}
@@ -0,0 +1,101 @@
+import secrets
+from collections import deque
+from app.config import ROOM_CHANGES_HISTORY
+from app.utils.room_geometry import OCCUPANCY_FIELDS, occupancy
+from app.utils.snapshot_cache import Snapshot
+
+
+def _occupancy_key(room: dict) -> tuple:
+	return tuple(room[field] for field in OCCUPANCY_FIELDS)
+
+
+class RoomChangeLog:
+	"""
+	Keep track of which rooms changed their occupancy between room snapshot versions,
+	so clients can fetch only the rooms changed since the version they last saw.
+	Only the last `max_versions` versions are kept, older clients have to resync.
+
+	Clients get versions as '<epoch>:<version>' tokens. Snapshot versions start over when the
+	process restarts, so the epoch is new every time the log starts over and tokens of another
+	epoch always ask for a resync.
+	"""
+
+	def __init__(self, max_versions: int):
+		self._changes: deque[tuple[int, set[str], set[str]]] = deque(maxlen=max_versions)
+		# Deltas are available for every version after the base version.
+		self._base_version: int | None = None
+		self.epoch = secrets.token_hex(4)
+
+	def token(self, version: int) -> str:
+		"""The version token handed to clients."""
+		return f'{self.epoch}:{version}'
+
+	def parse(self, token: str | None) -> int | None:
+		"""The snapshot version of a token of this epoch, or None."""
+		epoch, _, version = (token or '').partition(':')
+		if epoch != self.epoch or not version.isdigit():
+			return None
+		return int(version)
+
+	def record(self, previous: Snapshot | None, current: Snapshot) -> None:
+		"""Snapshot listener recording the rooms that changed in a new version."""
+		if previous is None:
+			self.clear()
+			self._base_version = current.version
+			return
+
+		before = {room['id']: _occupancy_key(room) for room in previous.value['rooms']}
+		changed = set()
+		for room in current.value['rooms']:
+			if before.pop(room['id'], None) != _occupancy_key(room):
+				changed.add(room['id'])
+		removed = set(before)
+
+		if len(self._changes) == self._changes.maxlen:
+			self._base_version = self._changes[0][0]
+		self._changes.append((current.version, changed, removed))
+
+	def since(self, token: str | None, current: Snapshot) -> dict:
+		"""
+		Get the occupancy of the rooms changed after the version of `token`, up to the `current` snapshot.
+		Asks for a full resync if the token is missing, of another epoch, or too old.
+		"""
+		return self.changes(self.parse(token), current)
+
+	def changes(self, version: int | None, current: Snapshot) -> dict:
+		"""Like `since`, for a snapshot version. Answers are computed once per snapshot and known version."""
+		base = self._base_version
+		if version is None or base is None or version < base or version > current.version:
+			return current.memo('room_changes_resync', lambda value: self._resync(current))
+		return current.memo(f'room_changes_since_{version}', lambda value: self._since(version, current))
+
+	def _resync(self, current: Snapshot) -> dict:
+		return {
+			'version': self.token(current.version),
+			'resync': True,
+			'rooms': [occupancy(room) for room in current.value['rooms']],
+			'removed': [],
+		}
+
+	def _since(self, version: int, current: Snapshot) -> dict:
+		rooms = current.value['rooms']
+		changed: set[str] = set()
+		removed: set[str] = set()
+		for change_version, change_ids, removed_ids in self._changes:
+			if version < change_version <= current.version:
+				changed = (changed | change_ids) - removed_ids
+				removed = (removed | removed_ids) - change_ids
+		return {
+			'version': self.token(current.version),
+			'resync': False,
+			'rooms': [occupancy(room) for room in rooms if room['id'] in changed],
+			'removed': sorted(removed),
+		}
+
+	def clear(self) -> None:
+		self._changes.clear()
+		self._base_version = None
+		self.epoch = secrets.token_hex(4)
+
+
+room_changes = RoomChangeLog(max_versions=ROOM_CHANGES_HISTORY)
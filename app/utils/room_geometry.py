@@ -0,0 +1,64 @@
+import time
+from app.config import GEOMETRY_TTL
+from app.schemas.room_response_schema import RoomModel, RoomOccupancyModel
+
+# Fields of a room that never change between sensor-sim updates.
+GEOMETRY_FIELDS = ('name', 'type', 'area', 'longitude', 'latitude', 'floor', 'borders')
+# Fields of a room that change every few seconds.
+OCCUPANCY_FIELDS = ('crowd_factor', 'popularity_factor', 'occupants')
+
+
+class GeometryCache:
+	"""
+	Long-lived cache of static room geometry keyed by room id.
+	Rooms already in the cache only have their occupancy fields validated on refresh,
+	so the polygon borders are validated once per room instead of on every download.
+	The whole cache is dropped after `ttl` seconds to pick up geometry changes.
+	"""
+
+	def __init__(self, ttl: float):
+		self.ttl = ttl
+		self._rooms: dict[str, dict] = {}
+		self._loaded_at = time.monotonic()
+
+	def merge(self, rooms: list[dict]) -> list[dict]:
+		"""
+		Validate a room list from sensor-sim and return it with cached geometry.
+		Raises a validation error if a room is malformed.
+		"""
+		if time.monotonic() - self._loaded_at > self.ttl:
+			self.clear()
+
+		known: dict[str, dict] = {}
+		merged: list[dict] = []
+		for room in rooms:
+			room_id = RoomOccupancyModel.model_validate(room, strict=True).id
+			static = self._rooms.get(room_id)
+			if static is None:
+				RoomModel.model_validate(room, strict=True)
+				static = geometry(room)
+			known[room_id] = static
+			merged.append({**static, **{field: room[field] for field in OCCUPANCY_FIELDS}})
+
+		self._rooms = known
+		return merged
+
+	def get(self, room_id: str) -> dict | None:
+		return self._rooms.get(room_id)
+
+	def clear(self) -> None:
+		self._rooms = {}
+		self._loaded_at = time.monotonic()
+
+
+def geometry(room: dict) -> dict:
+	"""Project a room onto its id and static geometry fields."""
+	return {'id': room['id'], **{field: room[field] for field in GEOMETRY_FIELDS}}
+
+
+def occupancy(room: dict) -> dict:
+	"""Project a room onto its id and dynamic occupancy fields."""
+	return {'id': room['id'], **{field: room[field] for field in OCCUPANCY_FIELDS}}
+
+
+room_geometry = GeometryCache(ttl=GEOMETRY_TTL)
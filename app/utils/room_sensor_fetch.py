@@ -1,10 +1,14 @@
 from fastapi import HTTPException
 from app.utils.forwarder import forward_request
+from app.utils.snapshot_cache import Snapshot, SnapshotCache
+from app.utils.room_geometry import room_geometry
+from app.utils.room_changes import room_changes
 from app.schemas.room_response_schema import RoomListModel
 from app.schemas.sensor_response_schema import SensorListModel
+from app.config import SNAPSHOT_SETTINGS
 import os
 from dotenv import load_dotenv
-from typing import Type, TypeVar
+from typing import Any, Type, TypeVar
 
 T = TypeVar('T', RoomListModel, SensorListModel)
 
@@ -13,20 +17,119 @@ SENSOR_SIM_PATH = os.getenv('SENSOR_SIM', 'http://localhost:8002')
 if SENSOR_SIM_PATH is None:
 	raise RuntimeError('SENSOR_SIM not found in environment variables')
 
-async def fetch_and_validate(type: Type[T], path: str) -> T:
+
+class SensorSimError(HTTPException):
+	"""
+	Loading a snapshot from sensor-sim failed. The status and detail are the ones the pathfinding
+	endpoints answer with, `upstream` is the error of sensor-sim itself, which the room and sensor
+	endpoints pass on unchanged.
+	"""
+
+	def __init__(self, detail: str, upstream: HTTPException | None = None):
+		super().__init__(status_code=500, detail=detail)
+		self.upstream = upstream
+
+	def passthrough(self) -> HTTPException:
+		return self.upstream if self.upstream is not None else self
+
+
+async def _fetch(path: str) -> tuple[Any, int]:
 	try:
-		room_data, _ = await forward_request(f'{SENSOR_SIM_PATH}/{path}', 'GET')
+		return await forward_request(f'{SENSOR_SIM_PATH}/{path}', 'GET')
 	except Exception as e:
-		raise HTTPException(
-			status_code=500, detail=f'Failed to retrieve {path.removesuffix("s")} data from sensor simulation service'
+		raise SensorSimError(
+			f'Failed to retrieve {path.removesuffix("s")} data from sensor simulation service',
+			e if isinstance(e, HTTPException) else None,
 		) from e
 
+
+def _invalid(path: str, data: Any, status: int) -> SensorSimError:
+	detail = data.get('detail') if isinstance(data, dict) else None
+	return SensorSimError(
+		f'Invalid or empty {path.removesuffix("s")} data received from sensor simulation service',
+		HTTPException(status_code=status, detail=detail or 'Invalid room data received from sensor simulation service'),
+	)
+
+
+async def load_and_validate(type: Type[T], path: str) -> T:
+	"""Fetch a list from the sensor simulation service and validate it, bypassing the cache."""
+	room_data, status = await _fetch(path)
+
 	try:
-		type.model_validate(room_data)
+		type.model_validate(room_data, strict=True)
 	except Exception as e:
-		raise HTTPException(
-			status_code=500,
-			detail=f'Invalid or empty {path.removesuffix("s")} data received from sensor simulation service',
-		) from e
+		raise _invalid(path, room_data, status) from e
+
+	return room_data
+
+
+async def load_rooms() -> RoomListModel:
+	"""
+	Fetch all rooms from the sensor simulation service.
+	The static geometry of rooms seen before comes from the geometry cache,
+	so only the occupancy fields of those rooms are validated.
+	"""
+	room_data, status = await _fetch('rooms')
+
+	try:
+		return {'rooms': room_geometry.merge(room_data['rooms'])}
+	except Exception as e:
+		raise _invalid('rooms', room_data, status) from e
+
+
+rooms_snapshot = SnapshotCache(
+	'rooms',
+	load_rooms,
+	ttl=SNAPSHOT_SETTINGS['ttl'],
+	max_stale=SNAPSHOT_SETTINGS['max_stale'],
+)
+sensors_snapshot = SnapshotCache(
+	'sensors',
+	lambda: load_and_validate(SensorListModel, 'sensors'),
+	ttl=SNAPSHOT_SETTINGS['ttl'],
+	max_stale=SNAPSHOT_SETTINGS['max_stale'],
+)
+
+rooms_snapshot.subscribe(room_changes.record)
+
+snapshots = {
+	'rooms': rooms_snapshot,
+	'sensors': sensors_snapshot,
+}
+
+
+async def fetch_and_validate(type: Type[T], path: str) -> T:
+	"""Get a validated room or sensor list, served from the in-process snapshot cache."""
+	snapshot = snapshots.get(path)
+	if snapshot is None:
+		return await load_and_validate(type, path)
+	return await snapshot.get()
+
+
+def index_by(snapshot: Snapshot, path: str, field: str) -> dict[str, dict]:
+	"""
+	Get a dictionary of the rooms or sensors in a snapshot keyed by a field (e.g. 'id' or 'name').
+	The index is built once per snapshot version.
+	"""
+	return snapshot.memo(f'{path}_by_{field}', lambda value: {item[field]: item for item in value[path]})
+
 
-	return room_data
\ No newline at end of file
+def batch_lookup(
+	snapshot: Snapshot, path: str, ids: list[str], fields: list[str] | None = None
+) -> tuple[list[dict], list[str]]:
+	"""
+	Look up several rooms or sensors by id in a snapshot.
+	Returns the found items (projected onto `fields` plus 'id' when given) in request order,
+	and the ids that were not found. Duplicate ids are returned once.
+	"""
+	by_id = index_by(snapshot, path, 'id')
+	keys = list(dict.fromkeys(['id', *fields])) if fields else None
+	found: list[dict] = []
+	missing: list[str] = []
+	for item_id in dict.fromkeys(ids):
+		item = by_id.get(item_id)
+		if item is None:
+			missing.append(item_id)
+		else:
+			found.append({key: item[key] for key in keys} if keys else item)
+	return found, missing
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+	"""
+	Coalesce concurrent calls that share a key into a single execution.
+	The first caller for a key runs the call, every caller that arrives while it is
+	still in flight awaits the same result (or exception) instead of starting its own.
+	Results are shared between callers and must be treated as read-only.
+	"""
+
+	def __init__(self):
+		self._calls: dict[Hashable, asyncio.Task] = {}
+		self.executed = 0
+		self.coalesced = 0
+
+	async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+		loop = asyncio.get_running_loop()
+		# Tasks are bound to their event loop, so keep in-flight calls separate per loop.
+		key = (id(loop), key)
+		task = self._calls.get(key)
+		if task is None:
+			self.executed += 1
+			task = loop.create_task(fn())
+			self._calls[key] = task
+			task.add_done_callback(lambda done: self._forget(key, done))
+		else:
+			self.coalesced += 1
+		# Shield the shared call so one cancelled caller does not cancel it for the others.
+		return await asyncio.shield(task)
+
+	def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+		if self._calls.get(key) is task:
+			del self._calls[key]
+
+	def in_flight(self) -> int:
+		return len(self._calls)
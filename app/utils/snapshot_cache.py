@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+	"""A versioned copy of an upstream resource. The value is shared and must not be mutated."""
+
+	def __init__(self, value: Any, version: int, fetched_at: float):
+		self.value = value
+		self.version = version
+		self.fetched_at = fetched_at
+		self._memo: dict[str, Any] = {}
+
+	def age(self) -> float:
+		return time.monotonic() - self.fetched_at
+
+	def memo(self, key: str, factory: Callable[[Any], Any]) -> Any:
+		"""Compute data derived from this snapshot once and reuse it until the next version."""
+		if key not in self._memo:
+			self._memo[key] = factory(self.value)
+		return self._memo[key]
+
+
+class SnapshotCache:
+	"""
+	In-process cache for a single upstream resource with stale-while-revalidate semantics.
+
+	- A snapshot younger than `ttl` is served from memory.
+	- A snapshot older than `ttl` but younger than `max_stale` is still served from memory,
+	  while a refresh is started in the background.
+	- Without a usable snapshot the caller waits for the loader. Concurrent loads are coalesced.
+
+	When the refresher task is running (see `start_refresher`), it reloads the snapshot every
+	`ttl` seconds so requests are normally answered from memory without talking to the upstream.
+	"""
+
+	def __init__(
+		self, name: str, loader: Callable[[], Awaitable[Any]], ttl: float, max_stale: float
+	):
+		self.name = name
+		self.ttl = ttl
+		self.max_stale = max(max_stale, ttl)
+		self._loader = loader
+		self._flight = SingleFlight()
+		self._snapshot: Snapshot | None = None
+		self._version = 0
+		self._background: asyncio.Task | None = None
+		self._refresher: asyncio.Task | None = None
+		self._listeners: list[Callable[[Snapshot | None, Snapshot], None]] = []
+		self.hits = 0
+		self.stale_hits = 0
+		self.misses = 0
+		self.refresh_errors = 0
+
+	def set_ttl(self, ttl: float) -> None:
+		"""Change how often the snapshot is refreshed, keeping the window in which stale snapshots are served."""
+		self.max_stale = ttl + (self.max_stale - self.ttl)
+		self.ttl = ttl
+
+	async def get(self) -> Any:
+		"""Get the cached value, loading it if necessary."""
+		return (await self.get_snapshot()).value
+
+	async def get_snapshot(self) -> Snapshot:
+		snapshot = self._snapshot
+		if snapshot is not None:
+			age = snapshot.age()
+			if age <= self.ttl:
+				self.hits += 1
+				return snapshot
+			if age <= self.max_stale:
+				self.stale_hits += 1
+				self._refresh_in_background()
+				return snapshot
+		self.misses += 1
+		return await self.refresh()
+
+	def peek(self) -> Snapshot | None:
+		"""Get the current snapshot without loading, or None if there is no usable snapshot."""
+		snapshot = self._snapshot
+		if snapshot is None or snapshot.age() > self.max_stale:
+			return None
+		return snapshot
+
+	async def refresh(self) -> Snapshot:
+		"""Reload the value from the upstream. Concurrent refreshes share one load."""
+		return await self._flight.do(self.name, self._load)
+
+	async def _load(self) -> Snapshot:
+		return self._publish(await self._loader())
+
+	def apply(self, update: Callable[[Any], Any]) -> Snapshot | None:
+		"""
+		Publish a new version computed from the current value, e.g. from an upstream change event.
+		`update` must return a new value instead of mutating the current one.
+		If `update` returns the current value unchanged, no new version is published.
+		Returns None, without calling `update`, when there is no snapshot to update yet.
+		"""
+		current = self._snapshot
+		if current is None:
+			return None
+		value = update(current.value)
+		if value is current.value:
+			return current
+		return self._publish(value)
+
+	def restore(self, value: Any, age: float) -> Snapshot | None:
+		"""
+		Publish a value loaded `age` seconds ago, e.g. a copy persisted by a previous run, so it is
+		served (and refreshed) like any other snapshot. Ignored when there already is a snapshot.
+		"""
+		if self._snapshot is not None:
+			return None
+		return self._publish(value, fetched_at=time.monotonic() - max(age, 0.0))
+
+	def _publish(self, value: Any, fetched_at: float | None = None) -> Snapshot:
+		self._version += 1
+		snapshot = Snapshot(value, self._version, time.monotonic() if fetched_at is None else fetched_at)
+		previous = self._snapshot
+		self._snapshot = snapshot
+		for listener in self._listeners:
+			try:
+				listener(previous, snapshot)
+			except Exception:
+				logger.exception('Snapshot listener failed for %s', self.name)
+		return snapshot
+
+	def subscribe(self, listener: Callable[[Snapshot | None, Snapshot], None]) -> None:
+		"""
+		Call `listener(previous, current)` every time a new snapshot is loaded.
+		Listeners run synchronously inside the load and must be fast.
+		"""
+		self._listeners.append(listener)
+
+	async def _refresh_quietly(self) -> None:
+		try:
+			await self.refresh()
+		except Exception:
+			self.refresh_errors += 1
+			logger.exception('Failed to refresh %s snapshot, serving stale data', self.name)
+
+	def _refresh_in_background(self) -> None:
+		if self._background is not None and not self._background.done():
+			return
+		self._background = asyncio.get_running_loop().create_task(self._refresh_quietly())
+
+	async def _run_refresher(self) -> None:
+		snapshot = self._snapshot
+		if snapshot is not None and snapshot.age() < self.ttl:
+			# A restored snapshot is only refreshed once it is due
+			await asyncio.sleep(self.ttl - snapshot.age())
+		while True:
+			await self._refresh_quietly()
+			await asyncio.sleep(self.ttl)
+
+	def start_refresher(self) -> None:
+		"""Start a task that keeps the snapshot fresh. Called from the application lifespan."""
+		if self._refresher is None or self._refresher.done():
+			self._refresher = asyncio.get_running_loop().create_task(self._run_refresher())
+
+	async def stop_refresher(self) -> None:
+		for task in (self._refresher, self._background):
+			if task is not None and not task.done():
+				task.cancel()
+				try:
+					await task
+				except asyncio.CancelledError:
+					pass
+		self._refresher = None
+		self._background = None
+
+	def clear(self) -> None:
+		"""Drop the cached snapshot and reset the statistics."""
+		self._snapshot = None
+		self.hits = 0
+		self.stale_hits = 0
+		self.misses = 0
+		self.refresh_errors = 0
+
+	def stats(self) -> dict:
+		snapshot = self._snapshot
+		lookups = self.hits + self.stale_hits + self.misses
+		return {
+			'version': snapshot.version if snapshot else None,
+			'age': round(snapshot.age(), 3) if snapshot else None,
+			'ttl': self.ttl,
+			'max_stale': self.max_stale,
+			'hits': self.hits,
+			'stale_hits': self.stale_hits,
+			'misses': self.misses,
+			'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+			'refresh_errors': self.refresh_errors,
+		}
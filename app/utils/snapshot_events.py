@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+from typing import Any, Protocol, Type
+from pydantic import BaseModel, ValidationError
+from app.config import KAFKA_SETTINGS
+from app.schemas.room_response_schema import RoomModel
+from app.schemas.sensor_response_schema import SensorModel
+from app.utils.room_sensor_fetch import rooms_snapshot, sensors_snapshot
+from app.utils.snapshot_cache import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+
+class EventConsumer(Protocol):
+	"""The part of aiokafka's AIOKafkaConsumer used here, so tests can use an in-process broker."""
+
+	async def start(self) -> None: ...
+
+	async def stop(self) -> None: ...
+
+	async def getmany(self, timeout_ms: int = 0, max_records: int | None = None) -> dict[Any, list]: ...
+
+
+class SnapshotTopic:
+	"""A topic whose events update the items of a snapshot (e.g. the 'rooms' of the rooms snapshot)."""
+
+	def __init__(self, snapshot: SnapshotCache, path: str, model: Type[BaseModel]):
+		self.snapshot = snapshot
+		self.path = path
+		self.model = model
+
+
+def decode_events(raw: bytes | str | None) -> list[dict]:
+	"""Decode a message value into a list of change events. Malformed messages are skipped."""
+	try:
+		events = json.loads(raw) if raw else []
+	except ValueError:
+		logger.warning('Skipping malformed change event: %r', raw)
+		return []
+	if isinstance(events, dict):
+		events = [events]
+	if not isinstance(events, list):
+		return []
+	return [event for event in events if isinstance(event, dict) and isinstance(event.get('id'), str)]
+
+
+def apply_events(
+	value: dict, path: str, model: Type[BaseModel], events: list[dict]
+) -> tuple[dict, list[str], int]:
+	"""
+	Apply change events to a room or sensor list without mutating it.
+	Returns the new value (the same object when nothing changed), the ids of unknown items that
+	only a full download can add, and the number of invalid events that were skipped.
+	"""
+	items = {item['id']: item for item in value[path]}
+	changed = False
+	unknown: list[str] = []
+	skipped = 0
+	for event in events:
+		item_id = event['id']
+		if event.get('deleted'):
+			changed |= items.pop(item_id, None) is not None
+			continue
+		fields = {key: field for key, field in event.items() if key != 'deleted'}
+		current = items.get(item_id)
+		updated = {**current, **fields} if current is not None else fields
+		if updated == current:
+			continue
+		try:
+			model.model_validate(updated)
+		except ValidationError:
+			if current is None:
+				unknown.append(item_id)
+			else:
+				skipped += 1
+			continue
+		items[item_id] = updated
+		changed = True
+	if not changed:
+		return value, unknown, skipped
+	return {**value, path: list(items.values())}, unknown, skipped
+
+
+class SnapshotEventConsumer:
+	"""
+	Keep snapshots up to date from a stream of change events.
+
+	All events received in one poll are applied as a single new snapshot version per topic, so
+	snapshot listeners run once per batch rather than once per event. Events for items that are
+	not in the snapshot, or arriving before the first snapshot, trigger a reconciliation over HTTP.
+	While the consumer is running, the snapshots are refreshed only every `reconcile_interval`
+	seconds; their own refresh interval applies again as soon as it stops.
+	"""
+
+	def __init__(
+		self,
+		consumer: EventConsumer,
+		topics: dict[str, SnapshotTopic],
+		max_batch: int = 500,
+		reconcile_interval: float | None = None,
+	):
+		self._consumer = consumer
+		self._topics = topics
+		self._max_batch = max_batch
+		self._reconcile_interval = reconcile_interval
+		self._task: asyncio.Task | None = None
+		self.running = False
+		self.applied = 0
+		self.skipped = 0
+		self.reconciliations = 0
+
+	async def poll(self, timeout: float = 1.0) -> None:
+		"""Wait up to `timeout` seconds for messages and apply them."""
+		batches = await self._consumer.getmany(timeout_ms=int(timeout * 1000), max_records=self._max_batch)
+		events: dict[str, list[dict]] = {}
+		for records in batches.values():
+			for record in records:
+				if record.topic in self._topics:
+					events.setdefault(record.topic, []).extend(decode_events(record.value))
+		for topic, topic_events in events.items():
+			if topic_events:
+				await self._apply(self._topics[topic], topic_events)
+
+	async def _apply(self, topic: SnapshotTopic, events: list[dict]) -> None:
+		unknown: list[str] = []
+
+		def update(value: dict) -> dict:
+			updated, missing, skipped = apply_events(value, topic.path, topic.model, events)
+			unknown.extend(missing)
+			self.skipped += skipped
+			self.applied += len(events) - len(missing) - skipped
+			return updated
+
+		if topic.snapshot.apply(update) is None or unknown:
+			self.reconciliations += 1
+			try:
+				await topic.snapshot.refresh()
+			except Exception:
+				logger.exception('Failed to reconcile %s snapshot', topic.snapshot.name)
+
+	async def run(self) -> None:
+		await self._consumer.start()
+		snapshots = {topic.snapshot for topic in self._topics.values()}
+		ttls = {snapshot: snapshot.ttl for snapshot in snapshots}
+		if self._reconcile_interval is not None:
+			for snapshot in snapshots:
+				snapshot.set_ttl(self._reconcile_interval)
+		self.running = True
+		try:
+			while True:
+				try:
+					await self.poll()
+				except asyncio.CancelledError:
+					raise
+				except Exception:
+					logger.exception('Failed to consume change events, retrying')
+					await asyncio.sleep(1)
+		finally:
+			self.running = False
+			for snapshot, ttl in ttls.items():
+				snapshot.set_ttl(ttl)
+			await self._consumer.stop()
+
+	def start(self) -> None:
+		if self._task is None or self._task.done():
+			self._task = asyncio.get_running_loop().create_task(self.run())
+
+	async def stop(self) -> None:
+		if self._task is not None and not self._task.done():
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+		self._task = None
+
+	def stats(self) -> dict:
+		return {
+			'running': self.running,
+			'applied': self.applied,
+			'skipped': self.skipped,
+			'reconciliations': self.reconciliations,
+		}
+
+
+def create_kafka_consumer() -> EventConsumer | None:
+	"""Create a Kafka consumer for the room and sensor topics, or None if aiokafka is not installed."""
+	try:
+		from aiokafka import AIOKafkaConsumer
+	except ImportError:
+		logger.warning(
+			'Kafka consumer mode is enabled but the aiokafka package is not installed, '
+			'snapshots are refreshed from sensor-sim every %s seconds',
+			rooms_snapshot.ttl,
+		)
+		return None
+	return AIOKafkaConsumer(
+		KAFKA_SETTINGS['room_topic'],
+		KAFKA_SETTINGS['sensor_topic'],
+		bootstrap_servers=KAFKA_SETTINGS['bootstrap_servers'],
+		group_id=KAFKA_SETTINGS['group_id'],
+		auto_offset_reset='latest',
+	)
+
+
+def snapshot_event_consumer(consumer: EventConsumer) -> SnapshotEventConsumer:
+	"""Apply room and sensor events from the configured topics to the shared snapshots."""
+	return SnapshotEventConsumer(
+		consumer,
+		{
+			KAFKA_SETTINGS['room_topic']: SnapshotTopic(rooms_snapshot, 'rooms', RoomModel),
+			KAFKA_SETTINGS['sensor_topic']: SnapshotTopic(sensors_snapshot, 'sensors', SensorModel),
+		},
+		max_batch=KAFKA_SETTINGS['max_batch'],
+		reconcile_interval=KAFKA_SETTINGS['reconcile_interval'],
+	)
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from app.utils.single_flight import SingleFlight
+
+
+class TTLCache:
+	"""
+	LRU cache of at most `max_size` values that expire `ttl` seconds after they were loaded.
+	Concurrent misses for the same key share one load, and failed loads are not cached.
+	"""
+
+	def __init__(self, max_size: int, ttl: float):
+		self.max_size = max_size
+		self.ttl = ttl
+		# Key -> (monotonic time the value was loaded, value)
+		self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+		self._flight = SingleFlight()
+		self.hits = 0
+		self.misses = 0
+
+	async def get(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+		entry = self._entries.get(key)
+		if entry is not None and time.monotonic() - entry[0] < self.ttl:
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return entry[1]
+		self.misses += 1
+		return await self._flight.do(key, lambda: self._load(key, load))
+
+	async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+		value = await load()
+		if self.max_size > 0:
+			self._entries[key] = (time.monotonic(), value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_size:
+				self._entries.popitem(last=False)
+		return value
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self.hits = 0
+		self.misses = 0
+
+	def stats(self) -> dict:
+		lookups = self.hits + self.misses
+		return {
+			'size': len(self._entries),
+			'max_size': self.max_size,
+			'ttl': self.ttl,
+			'hits': self.hits,
+			'misses': self.misses,
+			'coalesced': self._flight.coalesced,
+			'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+		}